@@ -1,6 +1,12 @@
+from contextlib import contextmanager
 import Cell
 import BoardSolutionCreator
 import Houses
+import BoardSnapshot
+import BoardStatus
+import PuzzleLayout
+import cage_combinations
+import topology
 
 class Board:
     """
@@ -12,27 +18,81 @@ class Board:
             get_solution - returns the solution.
             get_cell - given a place of the cell, returns it.
             get_cell_value - returns the given cell's value.
+            get_cages - returns all the cages of the board.
             set_cells_value - sets the given cell's value
             update_all_cells - updates all the cells in the grid
+            update_peers - updates only the cells that share a row, a column, a nonet or a cage with the given cell
+            batch - groups many changes together and updates the cells once at the end
+            load_values - sets the values of all the cells the player can change at once
             set_cells_guess - sets the cell's guesses
+            delete_cells_guess - deletes the last guess that was inserted to the cell
+            get_layout - returns the immutable solution and cages of the board
+            snapshot - returns an immutable snapshot of the player's state
             find_mistakes - returns all the cells places with mistakes in them
+            is_solved - returns True if every cell has its true value
+            is_filled_correctly - returns True if the values fill every house and cage correctly
+            get_progress - returns the counts of the filled, correct, wrong and empty cells
             reset_board - resets the values the player inserted
             __str__ - returns a string representation of the board.
     """
-    def __init__(self, seed, lvl):
+    def __init__(self, seed, lvl, incremental=True, layout=None, cage_mode='legacy', sum_rules=True, box_shape=(3, 3),
+                 unique=False):
         """
         initializes a new sudoku board.
+        :param seed: integer, the game number.
+        :param lvl: integer between 1 and 10, the difficulty.
+        :param incremental: boolean, if True a change only updates the cells connected to the changed cell,
+                            if False every change updates all the cells in the grid.
+        :param layout: PuzzleLayout or None, a solution and cages that were already generated for (seed, lvl).
+                       if None, they are generated.
+        :param cage_mode: string, how the cages are generated, see Houses.set_cages.
+        :param sum_rules: boolean, if True the virtual cages of the 45 rule also limit the cells' options
+                          (on the 9x9 grid only).
+        :param box_shape: tuple of two integers, the rows and the columns of a box: (2, 2) makes a 4x4 grid,
+                          (2, 3) a 6x6, (3, 3) a 9x9, (3, 4) a 12x12 and (4, 4) a 16x16 (see topology.BOX_SHAPES).
+                          the solvers, the hints and the saves work on the 9x9 grid only.
+        :param unique: boolean, if True and no layout is given, the puzzle is generated with one solution
+                       (see PuzzleLayout.generate), so a correct filling is always the solution. 9x9 grid only.
         """
-        self.solution = BoardSolutionCreator.BoardSolutionCreator(seed)
-        self.solution.fill_board()
-        self.all_houses = Houses.Houses(seed)
-        self.all_houses.set_cages(lvl, self.solution)
-        self.cells = [[Cell.Cell(self.solution.get_cell((row, col)), (row, col), self.all_houses) for col in range(9)] for row in range(9)]
-        self.board = [[self.cells[i][j].players_value for i in range(9)] for j in range(9)]
-        self.places = [(i//9, i % 9) for i in range(81)]
+        self.seed = seed
+        self.lvl = lvl
+        self.shape = topology.get_shape(*box_shape)
+        self.size = self.shape.size
+        self.solution = BoardSolutionCreator.BoardSolutionCreator(seed, box_shape)
+        self.all_houses = Houses.Houses(seed, box_shape)
+        if layout is None and unique:
+            if self.size != 9:
+                raise ValueError("unique puzzles are only generated on the 9x9 grid")
+            layout = PuzzleLayout.PuzzleLayout.generate(seed, lvl, cage_mode, unique=True)
+        if layout is None:
+            self.solution.fill_board()
+            self.all_houses.set_cages(lvl, self.solution, cage_mode)
+        else:
+            self.solution.load_values(layout.solution)
+            self.all_houses.load_cages(layout.cages)
+        if sum_rules and self.size == 9:
+            self.all_houses.set_virtual_cages()
+        size = self.size
+        # the counts of the filled and the correct cells and the wrong cells, updated by every change
+        self.status = BoardStatus.BoardStatus(tuple(self.solution.get_cell(place) for place in self.shape.places),
+                                              self.shape.places)
+        self.cells = [[Cell.Cell(self.solution.get_cell((row, col)), (row, col), self.all_houses) for col in range(size)] for row in range(size)]
+        self.board = [[self.cells[i][j].players_value for i in range(size)] for j in range(size)]
+        self.places = list(self.shape.places)
+        self.incremental = incremental
+        # the places of the cells that share a house with each cell, not including the cell itself
+        self.peers = {place: self.get_cell(place).connected_cells for place in self.places}
+        self.cell_updates = 0  # the number of cell updates all the changes triggered
+        self.last_move_updates = 0  # the number of cell updates the last change triggered
+        self._batch_depth = 0  # the number of open batches
+        self._dirty_places = set()  # the cells that were changed in the open batch
+        self._layout = layout
+        self._snapshot = None  # the last snapshot that was taken
+        self._dirty_rows = set()  # the rows that changed since the last snapshot
         self.known_cells = self.all_houses.known_cells  # all the cells that belong to a cage with only 1 cell
-        for cell in self.known_cells:  # sets the value each one of the known cells as its true value
-            self.set_cells_value(cell, self.get_cell(cell).true_value)
+        with self.batch():
+            for cell in self.known_cells:  # sets the value each one of the known cells as its true value
+                self.set_cells_value(cell, self.get_cell(cell).true_value)
 
 
     def get_board(self):
@@ -65,6 +125,12 @@ class Board:
         """
         return self.get_cell(place).players_value
 
+    def get_cages(self):
+        """
+        returns all the cages of the board.
+        """
+        return list(self.all_houses.reverse_cages.keys())
+
     def set_cells_value(self, place, val=-1):
         """
         sets the given cell's value
@@ -73,11 +139,26 @@ class Board:
         """
         row = place[0]
         col = place[1]
+        cell = self.get_cell(place)
         if val == -1:  # sets the cell's value to be its true value
-            val = self.get_cell(place).true_value
-        self.get_cell(place).set_players_value(val)
-        self.board[row][col] = val
-        self.update_all_cells()
+            val = cell.true_value
+        old = cell.players_value
+        self._dirty_rows.add(row)
+        if self._batch_depth:  # inside a batch, the cells are updated once when it ends
+            cell.set_players_value(val, refresh=False)
+            self.board[row][col] = cell.players_value
+            self.status.record(self.shape.index_of(place), old, cell.players_value)
+            self._dirty_places.add(place)
+            return
+        cell.set_players_value(val)  # also updates the cell itself
+        self.board[row][col] = cell.players_value
+        self.status.record(self.shape.index_of(place), old, cell.players_value)
+        self.last_move_updates = 1
+        if self.incremental:
+            self.update_peers(place)
+        else:
+            self.update_all_cells()
+        self.cell_updates += self.last_move_updates
 
     def update_all_cells(self):
         """
@@ -86,33 +167,155 @@ class Board:
         for row in self.cells:
             for cell in row:
                 cell.update()
+        self.last_move_updates += self.shape.num_cells
+
+    def update_peers(self, place):
+        """
+        updates only the cells that share a row, a column, a nonet or a cage with the given cell,
+        the options of any other cell can't change when the given cell changes.
+        """
+        cells = self.cells
+        for row, col in self.peers[place]:
+            cells[row][col].update()
+        self.last_move_updates += len(self.peers[place])
+
+    @contextmanager
+    def batch(self):
+        """
+        groups many changes together and updates the cells once at the end, instead of after every change.
+        batches can be nested, the cells are updated when the outermost batch ends.
+        usage:
+            with board.batch():
+                board.set_cells_value((0, 0), 5)
+                board.set_cells_value((0, 1), 0)
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._commit_batch()
+
+    def _commit_batch(self):
+        """
+        updates the cells that were changed in the batch and their peers, each one only once.
+        """
+        dirty_places = self._dirty_places
+        if not dirty_places:
+            return
+        self._dirty_places = set()
+        self.last_move_updates = 0
+        to_update = set(dirty_places)
+        if self.incremental:
+            for place in dirty_places:
+                to_update.update(self.peers[place])
+        if not self.incremental or len(to_update) == self.shape.num_cells:
+            self.update_all_cells()
+        else:
+            for row, col in to_update:
+                self.cells[row][col].update()
+            self.last_move_updates = len(to_update)
+        self.cell_updates += self.last_move_updates
+
+    def load_values(self, values):
+        """
+        sets the values of all the cells the player can change at once, and updates the cells once.
+        :param values: a list of a list of integers for every row, 0 is an empty cell.
+        """
+        with self.batch():
+            for place in self.places:
+                if place in self.known_cells:
+                    continue
+                val = values[place[0]][place[1]]
+                if self.get_cell_value(place) != val:
+                    self.set_cells_value(place, val)
 
     def set_cells_guess(self, place, val):
         """
         sets the cell's guesses
         """
         self.get_cell(place).set_guess(val)
+        self._dirty_rows.add(place[0])
+
+    def delete_cells_guess(self, place):
+        """
+        deletes the last guess that was inserted to the cell
+        """
+        self.get_cell(place).delete_guess()
+        self._dirty_rows.add(place[0])
+
+    def get_layout(self):
+        """
+        returns the immutable solution and cages of the board, the layout is created once and shared.
+        """
+        if self._layout is None:
+            self._layout = PuzzleLayout.PuzzleLayout.from_houses(self.seed, self.lvl, self.solution, self.all_houses)
+        return self._layout
+
+    def snapshot(self):
+        """
+        returns an immutable snapshot of the player's values and guesses.
+        it must be taken by the thread that changes the board, the snapshot itself can then be read by any thread.
+        the rows that didn't change since the last snapshot are shared with it instead of copied.
+        """
+        cells = self.cells
+
+        def guess_row(row):
+            return [cage_combinations.values_to_mask(cell.guesses) for cell in cells[row]]
+
+        self._snapshot = BoardSnapshot.take_snapshot(self._snapshot, self.get_layout(), self.board, guess_row,
+                                                     self._dirty_rows)
+        self._dirty_rows = set()
+        return self._snapshot
 
     def find_mistakes(self):
         """
-        returns all the cells places with mistakes in them
+        returns all the cells places with mistakes in them, the status keeps them so no cell is scanned
+        """
+        return self.status.get_mistakes()
+
+    def is_solved(self):
+        """
+        returns True if every cell has its true value
         """
-        cells_with_mistakes = []
-        for place in self.places:
-            curr_cell = self.get_cell(place)
-            if curr_cell.players_value != curr_cell._get_true_value() and curr_cell.players_value != 0:
-                cells_with_mistakes.append(place)
-        return cells_with_mistakes
+        return self.status.is_solved()
+
+    def is_filled_correctly(self):
+        """
+        returns True if every cell is filled, every row, column and nonet holds every digit once, and every cage
+        holds different digits that sum to its killer. a puzzle with more than one solution is won by any of them,
+        not only by the one it was generated from.
+        """
+        if self.status.filled != len(self.places):
+            return False
+        values = [self.get_cell_value(place) for place in self.places]
+        digits = set(range(1, self.size + 1))
+        for house in self.shape.house_indexes:
+            if {values[i] for i in house} != digits:
+                return False
+        for cage in self.get_cages():
+            cage_values = [self.get_cell_value(place) for place in cage.cells]
+            if sum(cage_values) != cage.killer or len(set(cage_values)) != len(cage_values):
+                return False
+        return True
+
+    def get_progress(self):
+        """
+        returns the counts of the filled, correct, wrong and empty cells as a dictionary
+        """
+        return self.status.get_progress()
 
     def reset_board(self):
         """
         resets the values the player inserted
         """
-        for place in self.places:
-            if place not in self.known_cells:
-                self.set_cells_value(place, 0)
-                self.get_cell(place).delete_all_guesses()
-                self.get_cell(place).update()
+        with self.batch():
+            for place in self.places:
+                if place not in self.known_cells:
+                    self.set_cells_value(place, 0)
+                    self.get_cell(place).delete_all_guesses()
+            self._dirty_rows.update(range(self.size))
 
 
     def __str__(self):
@@ -120,12 +323,13 @@ class Board:
         returns a string representation of the board.
         """
         result = ""
-        for i in range(9):
-            if i % 3 == 0 and i != 0:
-                result += "-" * 21 + "\n"
+        box_rows, box_cols = self.shape.box_rows, self.shape.box_cols
+        for i in range(self.size):
+            if i % box_rows == 0 and i != 0:
+                result += "-" * (2 * self.size + 2 * (self.size // box_cols - 1) - 1) + "\n"
 
-            for j in range(9):
-                if j % 3 == 0 and j != 0:
+            for j in range(self.size):
+                if j % box_cols == 0 and j != 0:
                     result += "| "
 
                 result += str(self.get_cell_value((i, j))) + " "
@@ -134,5 +338,14 @@ class Board:
         return result
 
 
-
-
+if __name__ == "__main__":
+    # shows how many cell updates each move triggers with and without the incremental updates
+    for mode in (False, True):
+        board = Board(1, 5, incremental=mode)
+        board.cell_updates = 0
+        moves = 0
+        for place in board.places:
+            if place not in board.known_cells:
+                board.set_cells_value(place)
+                moves += 1
+        print(f"incremental={mode}: {board.cell_updates / moves:.1f} cell updates per move")
@@ -0,0 +1,108 @@
+import cage_combinations
+import topology
+
+
+class BoardSnapshot:
+    """
+        an immutable view of the player's state of a board at one moment.
+
+        a snapshot holds only tuples, so it can be read by another thread (hints, solvers, autosave) while the
+        game keeps changing the live board. the puzzle layout is shared with the board, and every row that didn't
+        change since the previous snapshot is shared with it, so taking a snapshot after a move copies one row.
+
+        Methods:
+            __init__ - initializes a snapshot.
+            get_cell_value - returns the player's value of the given cell.
+            get_guesses_mask - returns a mask of the guesses of the given cell.
+            get_guesses - returns the guesses of the given cell, sorted.
+            get_board - returns the player's values as a new list of 9 lists.
+            get_values - returns the player's values as a flat tuple of 81 values.
+            get_empty_cells - returns the places of the empty cells.
+            find_mistakes - returns the places of the cells with wrong values.
+            is_solved - returns True if every cell has its true value.
+    """
+    __slots__ = ('layout', 'rows', 'guess_rows', 'version')
+
+    def __init__(self, layout, rows, guess_rows, version=0):
+        """
+        initializes a snapshot.
+        :param layout: PuzzleLayout, the solution and the cages of the board.
+        :param rows: tuple of 9 tuples of 9 integers, the player's values.
+        :param guess_rows: tuple of 9 tuples of 9 integers, the guess masks.
+        :param version: integer, the number of snapshots the board took before this one.
+        """
+        self.layout = layout
+        self.rows = rows
+        self.guess_rows = guess_rows
+        self.version = version
+
+    def get_cell_value(self, place):
+        """
+        returns the player's value of the given cell.
+        """
+        return self.rows[place[0]][place[1]]
+
+    def get_guesses_mask(self, place):
+        """
+        returns a mask of the guesses of the given cell.
+        """
+        return self.guess_rows[place[0]][place[1]]
+
+    def get_guesses(self, place):
+        """
+        returns the guesses of the given cell, sorted.
+        """
+        return list(cage_combinations.mask_to_digits(self.guess_rows[place[0]][place[1]]))
+
+    def get_board(self):
+        """
+        returns the player's values as a new list of 9 lists.
+        """
+        return [list(row) for row in self.rows]
+
+    def get_values(self):
+        """
+        returns the player's values as a flat tuple of 81 values, row by row.
+        """
+        return sum(self.rows, ())
+
+    def get_empty_cells(self):
+        """
+        returns the places of the empty cells.
+        """
+        return [place for place in topology.PLACES if not self.rows[place[0]][place[1]]]
+
+    def find_mistakes(self):
+        """
+        returns the places of the cells with wrong values.
+        """
+        solution = self.layout.solution
+        return [place for i, place in enumerate(topology.PLACES)
+                if self.rows[place[0]][place[1]] and self.rows[place[0]][place[1]] != solution[i]]
+
+    def is_solved(self):
+        """
+        returns True if every cell has its true value.
+        """
+        return self.get_values() == self.layout.solution
+
+
+def take_snapshot(previous, layout, rows, guess_rows, dirty_rows):
+    """
+    returns a snapshot of the given rows, that shares the rows that didn't change with the previous snapshot.
+    :param previous: BoardSnapshot or None, the previous snapshot of the same board.
+    :param rows: a list of 9 sequences, the player's values.
+    :param guess_rows: a function that gets a row number and returns the guess masks of the row.
+    :param dirty_rows: set of the rows that changed since the previous snapshot (ignored if there isn't one).
+    """
+    if previous is None:
+        return BoardSnapshot(layout, tuple(tuple(row) for row in rows),
+                             tuple(tuple(guess_rows(row)) for row in range(9)))
+    if not dirty_rows:
+        return previous
+    new_rows = list(previous.rows)
+    new_guess_rows = list(previous.guess_rows)
+    for row in dirty_rows:
+        new_rows[row] = tuple(rows[row])
+        new_guess_rows[row] = tuple(guess_rows(row))
+    return BoardSnapshot(layout, tuple(new_rows), tuple(new_guess_rows), previous.version + 1)
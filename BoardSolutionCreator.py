@@ -1,4 +1,6 @@
 import random
+import time
+import topology
 
 class BoardSolutionCreator:
     """
@@ -9,19 +11,28 @@ class BoardSolutionCreator:
             is_valid - checks if the given cell can have the given number.
             set_cell - sets the cell's value.
             get_cell - returns the cell.
+            load_values - fills the board with values that were already generated.
             find_empty_cell - returns if True if there is an empty cell, else returns false.
+            get_order - returns the order the numbers are tried in for the given cell.
             fill_board - fills the board using the backtracking algorithm.
+            _fill_fewest_options - fills a board of another size than 9x9, the cell with the fewest options first.
             _get_board - returns the board.
             __str__ - returns a string representation of the solution.
     """
 
-    def __init__(self, seed):
+    def __init__(self, seed, box_shape=(3, 3)):
         """
         initializes a board for the solution.
+        :param box_shape: tuple of two integers, the rows and the columns of a box (see topology.GridShape).
         """
-        self.board = [[0 for _ in range(9)] for _ in range(9)]
+        self.shape = topology.get_shape(*box_shape)
+        self.size = self.shape.size
+        self.board = [[0 for _ in range(self.size)] for _ in range(self.size)]
         self.seed = seed
-        self.all_cells = [(i//9, i % 9) for i in range(81)]
+        self.all_cells = self.shape.places
+        self.random = random.Random()  # a private random stream, so boards can be created in parallel threads
+        self.orders = {}  # the order the numbers are tried in for each cell
+        self.backtracks = 0  # how many times the fill went back to an earlier cell
 
     def is_valid(self, place, val):
         """
@@ -30,12 +41,9 @@ class BoardSolutionCreator:
         :param val: integer between 1 and 9, the number we want to insert into the cell.
         :return: boolean, true if we can insert the number, false if not
         """
-        row = place[0]
-        col = place[1]
-        for j in range(9):
-            if (self.board[row][j] == val or
-                    self.board[j][col] == val or
-                    self.board[row - row % 3 + j // 3][col - col % 3 + j % 3] == val):
+        board = self.board
+        for row, col in self.shape.peer_places[self.shape.index_of(place)]:  # the cells in the same row, col and box
+            if board[row][col] == val:
                 return False
         return True
 
@@ -58,6 +66,14 @@ class BoardSolutionCreator:
         col = place[1]
         return self.board[row][col]
 
+    def load_values(self, values):
+        """
+        fills the board with values that were already generated
+        :param values: a sequence of the values of all the cells, row by row.
+        """
+        for i, place in enumerate(self.all_cells):
+            self.set_cell(place, values[i])
+
     def find_empty_cell(self):
         """
         returns if True if there is an empty cell, else returns false
@@ -68,24 +84,140 @@ class BoardSolutionCreator:
                     return True
         return False
 
+    def get_order(self, i):
+        """
+        returns the order the numbers are tried in for the given cell, the same order for every seed and cell.
+        :param i: integer, the index of the cell.
+        """
+        order = self.orders.get(i)
+        if order is None:
+            order = list(range(1, self.size + 1))
+            self.random.seed(self.seed*(i+1))
+            self.random.shuffle(order)
+            self.orders[i] = order
+        return order
+
     def fill_board(self):
         """
-        fills the board using the backtracking algorithm
+        fills the board using the backtracking algorithm.
+        the empty cells are filled one after the other, and the numbers that are already in each row, column and
+        nonet are kept as masks, so checking a number is one operation and nothing is rescanned.
+        grids of other sizes than 9x9 are filled by _fill_fewest_options, the cells of a 16x16 grid one after the
+        other can backtrack for seconds.
+        :return: boolean, True if the board was filled.
         """
-        for i, place in enumerate(self.all_cells):
-            if self.get_cell(place) == 0:  # if the cells is empty, insert a random number
-                numbers = [1, 2, 3, 4, 5, 6, 7, 8, 9]
-                random.seed(self.seed*(i+1))
-                random.shuffle(numbers)
-                for num in numbers:
-                    if self.is_valid(place, num):  # insert the selected number if it's valid
-                        self.set_cell(place, num)
-                        if self.fill_board():
-                            return True
-                        # backtrack if the current number is not valid
-                        self.set_cell(place, 0)
+        if self.size != 9:
+            return self._fill_fewest_options()
+        board = self.board
+        size = self.size
+        row_of, col_of, nonet_of = self.shape.row_of, self.shape.col_of, self.shape.box_of_index
+        row_masks, col_masks, nonet_masks = [0] * size, [0] * size, [0] * size
+        empty_cells = []
+        for i, (row, col) in enumerate(self.all_cells):
+            val = board[row][col]
+            if val == 0:
+                empty_cells.append(i)
+            else:
+                bit = 1 << (val - 1)
+                row_masks[row] |= bit
+                col_masks[col] |= bit
+                nonet_masks[nonet_of[i]] |= bit
+        orders = [self.get_order(i) for i in empty_cells]
+        tried = [0] * len(empty_cells)  # how many numbers of its order each empty cell already tried
+        k = 0
+        while 0 <= k < len(empty_cells):
+            i = empty_cells[k]
+            row, col, nonet = row_of[i], col_of[i], nonet_of[i]
+            val = board[row][col]
+            if val:  # backtracking into the cell, remove its number
+                bit = ~(1 << (val - 1))
+                row_masks[row] &= bit
+                col_masks[col] &= bit
+                nonet_masks[nonet] &= bit
+                board[row][col] = 0
+            used = row_masks[row] | col_masks[col] | nonet_masks[nonet]
+            order = orders[k]
+            j = tried[k]
+            while j < size and used >> (order[j] - 1) & 1:
+                j += 1
+            if j == size:  # no number fits, backtrack to the previous cell
+                tried[k] = 0
+                k -= 1
+                self.backtracks += 1
+                continue
+            val = order[j]
+            tried[k] = j + 1
+            bit = 1 << (val - 1)
+            row_masks[row] |= bit
+            col_masks[col] |= bit
+            nonet_masks[nonet] |= bit
+            board[row][col] = val
+            k += 1
+        return k == len(empty_cells)
+
+    def _fill_fewest_options(self):
+        """
+        fills the board by backtracking, each time on the empty cell with the fewest numbers that fit (the first one
+        on ties), trying its numbers in the order of get_order, so every seed fills its own grid.
+        :return: boolean, True if the board was filled.
+        """
+        board = self.board
+        shape = self.shape
+        size = self.size
+        all_numbers = (1 << size) - 1
+        row_masks, col_masks, box_masks = [0] * size, [0] * size, [0] * size
+        empty_cells = []
+        for i, (row, col) in enumerate(self.all_cells):
+            val = board[row][col]
+            if val == 0:
+                empty_cells.append(i)
+            else:
+                bit = 1 << (val - 1)
+                row_masks[row] |= bit
+                col_masks[col] |= bit
+                box_masks[shape.box_of_index[i]] |= bit
+
+        def options(i):
+            return all_numbers & ~(row_masks[shape.row_of[i]] | col_masks[shape.col_of[i]] |
+                                   box_masks[shape.box_of_index[i]])
+
+        def fill():
+            if not empty_cells:
+                return True
+            best, best_options, best_count = 0, 0, size + 1
+            for k, i in enumerate(empty_cells):
+                opts = options(i)
+                count = opts.bit_count()
+                if count < best_count:
+                    best, best_options, best_count = k, opts, count
+                    if count <= 1:
+                        break
+            if best_count == 0:
                 return False
-        return True
+            i = empty_cells[best]
+            empty_cells[best] = empty_cells[-1]
+            empty_cells.pop()
+            row, col, box = shape.row_of[i], shape.col_of[i], shape.box_of_index[i]
+            for val in self.get_order(i):
+                bit = 1 << (val - 1)
+                if not best_options & bit:
+                    continue
+                row_masks[row] |= bit
+                col_masks[col] |= bit
+                box_masks[box] |= bit
+                board[row][col] = val
+                if fill():
+                    return True
+                row_masks[row] &= ~bit
+                col_masks[col] &= ~bit
+                box_masks[box] &= ~bit
+                board[row][col] = 0
+            empty_cells.append(i)
+            empty_cells[best], empty_cells[-1] = empty_cells[-1], empty_cells[best]
+            self.backtracks += 1
+            return False
+
+        return fill()
 
     def _get_board(self):
         """
@@ -98,15 +230,96 @@ class BoardSolutionCreator:
         returns a string representation of the solution.
         """
         result = ""
-        for i in range(9):
-            if i % 3 == 0 and i != 0:
-                result += "-" * 21 + "\n"
+        box_rows, box_cols = self.shape.box_rows, self.shape.box_cols
+        for i in range(self.size):
+            if i % box_rows == 0 and i != 0:
+                result += "-" * (2 * self.size + 2 * (self.size // box_cols - 1) - 1) + "\n"
 
-            for j in range(9):
-                if j % 3 == 0 and j != 0:
+            for j in range(self.size):
+                if j % box_cols == 0 and j != 0:
                     result += "| "
 
                 result += str(self.board[i][j]) + " "
             result += "\n"
 
         return result
+
+
+def _legacy_fill_board(creator):
+    """
+    the recursive fill the class used before the masks, kept for the benchmark.
+    it rescans the board for the next empty cell and reseeds the global random generator at every level.
+    """
+    for i, place in enumerate(creator.all_cells):
+        if creator.get_cell(place) == 0:
+            numbers = [1, 2, 3, 4, 5, 6, 7, 8, 9]
+            random.seed(creator.seed*(i+1))
+            random.shuffle(numbers)
+            for num in numbers:
+                if creator.is_valid(place, num):
+                    creator.set_cell(place, num)
+                    if _legacy_fill_board(creator):
+                        return True
+                    creator.set_cell(place, 0)
+            return False
+    return True
+
+
+def benchmark(seeds=range(1, 201)):
+    """
+    compares the grids per second of the masks fill against the legacy recursive fill,
+    and checks both fill the same grid for every seed.
+    """
+    start = time.perf_counter()
+    legacy = []
+    for seed in seeds:
+        creator = BoardSolutionCreator(seed)
+        _legacy_fill_board(creator)
+        legacy.append(creator._get_board())
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fast = []
+    for seed in seeds:
+        creator = BoardSolutionCreator(seed)
+        creator.fill_board()
+        fast.append(creator._get_board())
+    fast_time = time.perf_counter() - start
+
+    assert legacy == fast
+    print(f"legacy: {len(seeds) / legacy_time:.0f} grids/s, masks: {len(seeds) / fast_time:.0f} grids/s, "
+          f"x{legacy_time / fast_time:.1f}")
+    return len(seeds) / legacy_time, len(seeds) / fast_time
+
+
+
+def benchmark_sizes(seeds=range(1, 51), lvl=6, generate_budget=0.25, frame_budget=0.004):
+    """
+    measures how long generating a board of every grid size takes, and how long one frame of the game spends
+    reading the board (the values, the guesses and the cages of every cell), against the budgets.
+    the drawing itself isn't measured, it needs a display.
+    :param generate_budget: the most seconds generating a board may take.
+    :param frame_budget: the most seconds the reads of one frame may take.
+    """
+    import statistics
+    import Board
+    for size, box_shape in sorted(topology.BOX_SHAPES.items()):
+        generate_times, frame_times = [], []
+        for seed in seeds:
+            start = time.perf_counter()
+            board = Board.Board(seed, lvl, box_shape=box_shape)
+            generate_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            for place in board.shape.places:
+                board.get_cell_value(place)
+                cell = board.get_cell(place)
+                cell.get_guesses()
+                cell.get_cage()
+            frame_times.append(time.perf_counter() - start)
+        print(f"{size}x{size}: generated in {statistics.median(generate_times) * 1000:.1f}ms median, "
+              f"{max(generate_times) * 1000:.1f}ms at most (budget {generate_budget * 1000:.0f}ms), "
+              f"frame reads {max(frame_times) * 1000:.2f}ms at most (budget {frame_budget * 1000:.0f}ms)")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,73 @@
+import topology
+
+
+class BoardStatus:
+    """
+        counts the player's progress as the values change, so the board never scans its cells to find it.
+
+        the board tells the status about every change of a value (record), and the status keeps the number of
+        filled cells, the number of correct cells and the cells with wrong values. Board and CompactBoard both keep
+        one, and the game and a server read the counts from it.
+
+        Methods:
+            __init__ - initializes the status of an empty board.
+            record - updates the counts after a cell's value changed.
+            is_solved - returns True if every cell has its true value.
+            get_mistakes - returns the places of the cells with wrong values.
+            get_progress - returns the counts as a dictionary.
+    """
+    __slots__ = ('solution', 'places', 'filled', 'correct', 'incorrect')
+
+    def __init__(self, solution, places=topology.PLACES):
+        """
+        initializes the status of an empty board.
+        :param solution: a sequence of the true values of all the cells, row by row.
+        :param places: the places of the cells by index, the PLACES table of the grid.
+        """
+        self.solution = solution
+        self.places = places
+        self.filled = 0  # the number of cells with a value
+        self.correct = 0  # the number of cells with their true value
+        self.incorrect = set()  # the indexes of the cells with a wrong value
+
+    def record(self, index, old, new):
+        """
+        updates the counts after a cell's value changed.
+        :param index: the index of the cell.
+        :param old: the cell's value before the change, 0 if it was empty.
+        :param new: the cell's value after the change, 0 if it is empty.
+        """
+        if old == new:
+            return
+        true_value = self.solution[index]
+        if old:
+            self.filled -= 1
+            if old == true_value:
+                self.correct -= 1
+            else:
+                self.incorrect.discard(index)
+        if new:
+            self.filled += 1
+            if new == true_value:
+                self.correct += 1
+            else:
+                self.incorrect.add(index)
+
+    def is_solved(self):
+        """
+        returns True if every cell has its true value.
+        """
+        return self.correct == len(self.solution)
+
+    def get_mistakes(self):
+        """
+        returns the places of the cells with wrong values, row by row.
+        """
+        return [self.places[index] for index in sorted(self.incorrect)]
+
+    def get_progress(self):
+        """
+        returns the counts as a dictionary: the filled, the correct, the wrong and the empty cells.
+        """
+        return {'filled': self.filled, 'correct': self.correct, 'mistakes': len(self.incorrect),
+                'empty': len(self.solution) - self.filled}
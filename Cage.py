@@ -1,4 +1,5 @@
 from House import House
+import cage_combinations
 
 class Cage(House):
     """
@@ -11,24 +12,30 @@ class Cage(House):
                             the first one is the row and the second one if the column of the selected cell.
                             all the house's cells places.
             get_all_values - returns a list of integers between 1 and 9, that are the house's cell values.
+            values_mask - returns a mask of the digits in the house.
             set_killer - sets the killer number of the cage.
             get_killer - returns the killer number of the cage.
             set_options - creates a list of lists.
                           each list contains amount of integers as the size of the cage.
                           each integer is between 1 and 9, and can be used only once in a list.
             get_options - returns the current cage options.
+            get_options_mask - returns a mask of all the digits that appear in the current cage options.
     """
-    def __init__(self, size):
+    def __init__(self, size, max_digit=9):
         """
         initializes a cage.
+        :param size: the number of cells in the cage.
+        :param max_digit: the largest digit of the grid, the size of the grid.
         """
-        super().__init__()
-        self.values = []
+        super().__init__(max(size, 9), max_digit)  # at least 9 slots, as the cages always had
+        self.table = cage_combinations.get_table(max_digit)  # the combinations of the grid's digits
         self.cells = []
         self.size = size
         self.killer = 0
         self.curr_cage_options = []
         self.all_cage_options = []
+        self.must_contain = 0  # a mask of the digits every option has
+        self.can_contain = 0  # a mask of the digits at least one option has
         self.color = (0,0,0)
         self.killer_cell = None
 
@@ -52,52 +59,22 @@ class Cage(House):
         creates a list of lists.
         each list contains amount of integers as the size of the cage.
         each integer is between 1 and 9, and can be used only once in a list.
+        the options are taken from the precomputed combinations table.
         """
-        killer = self.killer
-        size = self.size
-        cage_options = []
-
-        def rec_helper(temp_result, i):
-            """
-            a recursive function that goes over all the combinations for each cage and saves the ones that are valid
-            """
-            if sum(temp_result) == killer and len(temp_result) == size:
-                cage_options.append(temp_result)
-                return
-            if sum(temp_result) > killer or len(temp_result) > size:
-                return
-            if len(temp_result) == size:
-                return
-            if i == 10:
-                return
-            rec_helper(temp_result + [i], i+1)
-            rec_helper(temp_result, i + 1)
-
-        rec_helper([], 1)
-
-        self.all_cage_options = cage_options
-        self.curr_cage_options = cage_options
+        self.all_cage_options = self.table.get_options(self.killer, self.size)
+        self.curr_cage_options = self.all_cage_options
+        self.must_contain = self.table.must_contain(self.killer, self.size)
+        self.can_contain = self.table.can_contain(self.killer, self.size)
 
     def get_options(self):
         """
         returns the current cage options
         """
-        if 0 in self.values:
-            self.values.remove(0)
-        if len(self.values) == 0:  # if the cells are empty, return the original options
-            self.curr_cage_options = self.all_cage_options
-
-        else:
-            new_options = []
-            for option in self.all_cage_options:
-                all_values = True
-                for val in self.values:  # if there is an option without the value of the cell, drop this option
-                    # if val not in option or val not in cells_options:
-                    if val not in option:
-                        all_values = False
-                        break
-                if all_values:
-                    new_options.append(option)
-            self.curr_cage_options = new_options
+        self.curr_cage_options = self.table.get_options(self.killer, self.size, self.mask)
         return self.curr_cage_options
 
+    def get_options_mask(self):
+        """
+        returns a mask of all the digits that appear in the current cage options.
+        """
+        return self.table.options_mask(self.killer, self.size, self.mask)
@@ -1,4 +1,3 @@
-
 class Cell:
     """
         creates a cell.
@@ -15,7 +14,8 @@ class Cell:
             delete_players_value - deletes the player's value of the selected cell
             check_val - returns boolean, true if the player's value is true, or false if not.
             update_houses - updates the cell's houses.
-            update - updates the selected cell's connected_cells, connected cell's values, cage options and the cells options.
+            update - updates the selected cell's connected cell's values, cage options and the cells options.
+                     the virtual cages of the 45 rule the cell is in also limit its options.
             set_guess - add an integer between 1 and 9 to the list of guesses of the selected cell.
                         if the value is already in the list, removes it.
             get_guesses - returns the selected cell's list of guesses.
@@ -23,6 +23,7 @@ class Cell:
             delete_all_guesses - deletes the last guess that was inserted to the guesses list.
             get_options - returns the selected cell's options.
             get_cage_options - returns the selected cage's options.
+            get_virtual_cages - returns the virtual cages of the 45 rule the selected cell is in.
             set_row - sets the selected cell's row.
             get_row - returns the selected cell's row.
             set_col - sets the selected cell's col.
@@ -45,14 +46,16 @@ class Cell:
         self.col = all_houses.get_col(self.place)
         self.cage = all_houses.get_cage(self.place)
         self.nonet = all_houses.get_nonet(self.place)
-        self.connected_cells = list(set(self.row.get_all_cells() + self.col.get_all_cells() +
-                                         self.nonet.get_all_cells() + self.cage.get_all_cells()))
-        self.connected_cells_values = list(set(self.row.get_all_values() + self.col.get_all_values() +
-                                               self.nonet.get_all_values() + self.cage.get_all_values()))
-        self.cage_options = self.cage.get_options()
-        self.flattened_cage_options = set([num for sublist in self.cage_options for num in sublist])
-        # set the cell options to be number that aren't already in the cell's houses and not in the cage options
-        self.cell_options = [num for num in range(1, 10) if (num not in self.connected_cells_values and num in self.flattened_cage_options)]
+        self.virtual_cages = all_houses.get_virtual_cages(self.place)
+        self.table = all_houses.table  # the cage combinations of the grid's digits
+        # the places of the cells that share a row, a column, a nonet or a cage with the cell
+        peers = all_houses.shape.peer_places[all_houses.shape.index_of(place)]
+        self.connected_cells = peers + tuple(other for other in self.cage.cells if other != place and other not in peers)
+        self.connected_mask = 0  # a mask of the digits already in the cell's houses
+        self.cage_options = []
+        self.cage_options_mask = 0  # a mask of the digits in the cage options
+        self.cell_options = []
+        self.update()
 
     def get_cell(self):
         """
@@ -78,11 +81,12 @@ class Cell:
         """
         return self.true_value
 
-    def set_players_value(self, value):
+    def set_players_value(self, value, refresh=True):
         """
         sets the value the player inserted to the selected cell.
         if the value is already the cell's value, removes it.
         :param value: integer between 1 and 9.
+        :param refresh: boolean, if False the cell's options aren't updated (the board updates them later).
         """
         # if the player's value is the same value that is already in the cell, remove the value
         if self.players_value == value:
@@ -91,7 +95,8 @@ class Cell:
             self.players_value = value
         # update all the cells and houses
         self.update_houses()
-        self.update()
+        if refresh:
+            self.update()
 
     def delete_players_value(self):
         """
@@ -113,23 +118,26 @@ class Cell:
         self.col.update_cell(self.get_place(), self.players_value)
         self.nonet.update_cell(self.get_place(), self.players_value)
         self.cage.update_cell(self.get_place(), self.players_value)
+        for virtual_cage in self.virtual_cages:
+            virtual_cage.update_cell(self.get_place(), self.players_value)
     def update(self):
         """
-        updates the selected cell's connected_cells, connected cell's values, cage options and the cells options
+        updates the selected cell's connected cell's values, cage options and the cells options
         """
-        # update the connected cells
-        self.connected_cells = list(
-            set(self.row.get_all_cells() + self.col.get_all_cells() + self.nonet.get_all_cells() + self.cage.get_all_cells()))
-        self.connected_cells_values = list(
-            set(self.row.get_all_values() + self.col.get_all_values() + self.nonet.get_all_values() + self.cage.get_all_values()))
+        # update the values of the connected cells
+        self.connected_mask = (self.row.values_mask() | self.col.values_mask() |
+                               self.nonet.values_mask() | self.cage.values_mask())
         # update the cage options and the cell options
         self.cage_options = self.cage.get_options()
-        self.flattened_cage_options = set([num for sublist in self.cage_options for num in sublist])
+        self.cage_options_mask = self.cage.get_options_mask()
+        options_mask = self.cage_options_mask
+        for virtual_cage in self.virtual_cages:  # the cells of a virtual cage are connected, so they update it
+            options_mask &= virtual_cage.get_options_mask()
         if self.players_value != 0:  # if the player inserted a value, delete the options
-            self.cell_options = []
+            self.cell_options = self.table.mask_to_list(0)
         else:
             # set the cell options to be number that aren't already in the cell's houses and not in the cage options
-            self.cell_options = [num for num in range(1, 10) if (num not in self.connected_cells_values and num in self.flattened_cage_options)]
+            self.cell_options = self.table.mask_to_list(options_mask & ~self.connected_mask)
 
     def set_guess(self, val):
         """
@@ -172,6 +180,12 @@ class Cell:
         """
         return self.cage_options
 
+    def get_virtual_cages(self):
+        """
+        returns the virtual cages of the 45 rule the selected cell is in.
+        """
+        return self.virtual_cages
+
     def set_row(self, row):
         """
         sets the selected cell's row.
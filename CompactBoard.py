@@ -0,0 +1,603 @@
+from array import array
+from contextlib import contextmanager
+import sys
+import Board
+import BoardSnapshot
+import BoardStatus
+import PuzzleLayout
+import BoardSolutionCreator
+import Houses
+import cage_combinations
+import innies_outies
+import topology
+
+# the most memory a compact board may use, in bytes (see CompactBoard.memory_usage)
+MEMORY_BUDGET = 16 * 1024
+
+
+class CompactCage:
+    """
+        a cage of a compact board, or a view of a virtual cage of the 45 rule, that has no color.
+
+        Methods:
+            __init__ - initializes a cage.
+            get_killer - returns the killer number of the cage.
+            get_options - returns the current cage options.
+            get_options_mask - returns a mask of all the digits that appear in the current cage options.
+    """
+    __slots__ = ('board', 'number', 'cells', 'indexes', 'size', 'killer', 'color', 'killer_cell')
+
+    def __init__(self, board, number, cells, killer, color):
+        """
+        initializes a cage.
+        :param board: the compact board the cage belongs to.
+        :param number: integer, the number of the cage in the board.
+        :param cells: tuple of the places of the cage's cells.
+        """
+        self.board = board
+        self.number = number
+        self.cells = cells
+        self.indexes = tuple(topology.index_of(place) for place in cells)
+        self.size = len(cells)
+        self.killer = killer
+        self.color = color
+        self.killer_cell = min(cells)
+
+    def get_killer(self):
+        """
+        returns the killer number of the cage.
+        """
+        return self.killer
+
+    def get_options(self):
+        """
+        returns the current cage options
+        """
+        return cage_combinations.get_options(self.killer, self.size, self.board.cage_masks[self.number])
+
+    def get_options_mask(self):
+        """
+        returns a mask of all the digits that appear in the current cage options.
+        """
+        return cage_combinations.options_mask(self.killer, self.size, self.board.cage_masks[self.number])
+
+
+class CompactCell:
+    """
+        a light view of one cell of a compact board, created when it is asked for and holding no state of its own.
+
+        Methods:
+            __init__ - initializes the view.
+            get_place - returns the place of the cell.
+            get_options - returns the cell's options.
+            get_cage_options - returns the cell's cage options.
+            get_cage - returns the cell's cage.
+            get_virtual_cages - returns the virtual cages of the 45 rule the cell is in.
+            get_guesses - returns the cell's guesses, sorted.
+            set_guess - adds a guess to the cell, if the guess is already there, removes it.
+            delete_guess - deletes the last guess that was inserted.
+            delete_all_guesses - deletes all the cell's guesses.
+    """
+    __slots__ = ('board', 'index')
+
+    def __init__(self, board, index):
+        """
+        initializes the view.
+        """
+        self.board = board
+        self.index = index
+
+    @property
+    def place(self):
+        return topology.PLACES[self.index]
+
+    @property
+    def players_value(self):
+        return self.board.values[self.index]
+
+    @property
+    def true_value(self):
+        return self.board.solution[self.index]
+
+    @property
+    def cage(self):
+        return self.board.cages[self.board.cage_of[self.index]]
+
+    def get_place(self):
+        """
+        returns the place of the cell.
+        """
+        return self.place
+
+    def _get_true_value(self):
+        """
+        returns the true_value.
+        """
+        return self.true_value
+
+    def get_options(self):
+        """
+        returns the cell's options.
+        """
+        return cage_combinations.mask_to_list(self.board.candidates[self.index])
+
+    def get_cage_options(self):
+        """
+        returns the cell's cage options.
+        """
+        return self.cage.get_options()
+
+    def get_cage(self):
+        """
+        returns the cell's cage.
+        """
+        return self.cage
+
+    def get_virtual_cages(self):
+        """
+        returns the virtual cages of the 45 rule the cell is in.
+        """
+        return tuple(self.board.get_virtual_cage(number) for number in self.board.virtual_numbers(self.index))
+
+    def get_guesses(self):
+        """
+        returns the cell's guesses, sorted.
+        """
+        return list(cage_combinations.mask_to_digits(self.board.guesses[self.index]))
+
+    def set_guess(self, val):
+        """
+        adds a guess to the cell, if the guess is already there, removes it.
+        """
+        self.board.set_cells_guess(self.place, val)
+
+    def delete_guess(self):
+        """
+        deletes the last guess that was inserted.
+        """
+        self.board.delete_cells_guess(self.place)
+
+    def delete_all_guesses(self):
+        """
+        deletes all the cell's guesses.
+        """
+        board = self.board
+        board.guesses[self.index] = 0
+        board.guess_order[self.index] = 0
+
+
+class CompactSolution:
+    """
+        the solution of a compact board, with the same reading methods as BoardSolutionCreator.
+
+        Methods:
+            __init__ - initializes the solution.
+            get_cell - returns the value of the given cell.
+            _get_board - returns the solution as a list of 9 lists.
+    """
+    __slots__ = ('values',)
+
+    def __init__(self, values):
+        """
+        initializes the solution.
+        :param values: bytearray of the 81 solution values.
+        """
+        self.values = values
+
+    def get_cell(self, place):
+        """
+        returns the value of the given cell.
+        """
+        return self.values[topology.index_of(place)]
+
+    def _get_board(self):
+        """
+        returns the solution as a list of 9 lists.
+        """
+        return [list(self.values[row * 9:row * 9 + 9]) for row in range(9)]
+
+
+class CompactBoard:
+    """
+        a sudoku board with the same methods as Board, that keeps its state in flat arrays instead of
+        81 Cell objects and their houses, for servers that hold many boards at once.
+
+        the values and the solution are bytearrays, the cell options, the guesses and the digits in each
+        row, column, nonet and cage are arrays of 9-bit masks (bit d - 1 stands for digit d).
+        the virtual cages of the 45 rule limit the options as in Board, they are kept as flat arrays too and
+        their masks come after the real cages' masks.
+
+        Methods:
+            __init__ - initializes a new compact board.
+            get_board - returns the player's values as a list of 9 lists.
+            get_solution - returns the solution.
+            get_cell - returns a view of the cell in the given place.
+            get_cell_value - returns the given cell's value.
+            get_cages - returns all the cages of the board.
+            get_virtual_cage - returns a view of a virtual cage of the 45 rule.
+            virtual_numbers - returns the numbers of the virtual cages of a cell.
+            set_cells_value - sets the given cell's value.
+            batch - groups many changes together and updates the options once at the end.
+            load_values - sets the values of all the cells the player can change at once.
+            set_cells_guess - sets the cell's guesses.
+            delete_cells_guess - deletes the last guess that was inserted to the cell.
+            get_layout - returns the immutable solution and cages of the board.
+            snapshot - returns an immutable snapshot of the player's state.
+            find_mistakes - returns all the cells places with mistakes in them.
+            is_solved - returns True if every cell has its true value.
+            is_filled_correctly - returns True if the values fill every house and cage correctly.
+            get_progress - returns the counts of the filled, correct, wrong and empty cells.
+            reset_board - resets the values the player inserted.
+            memory_usage - returns the number of bytes the board uses.
+            __str__ - returns a string representation of the board.
+    """
+    __slots__ = ('seed', 'lvl', 'solution', 'values', 'candidates', 'guesses', 'guess_order', 'house_masks',
+                 'cage_masks', 'cage_of', 'cages', 'virtual_cells', 'virtual_starts', 'virtual_killers',
+                 'virtual_of', 'virtual_of_starts', 'known_cells', 'status', '_batch_depth', '_snapshot')
+    shape = topology.NINE  # a compact board is always 9x9
+
+    def __init__(self, seed, lvl, layout=None, sum_rules=True):
+        """
+        initializes a new compact board.
+        the puzzle is generated the same way as in Board, only the result is kept.
+        :param layout: PuzzleLayout or None, a solution and cages that were already generated for (seed, lvl).
+                       if None, they are generated.
+        :param sum_rules: boolean, if True the virtual cages of the 45 rule also limit the cells' options, as in Board.
+        """
+        if layout is None:
+            solution = BoardSolutionCreator.BoardSolutionCreator(seed)
+            solution.fill_board()
+            all_houses = Houses.Houses(seed)
+            all_houses.set_cages(lvl, solution)
+            layout = PuzzleLayout.PuzzleLayout.from_houses(seed, lvl, solution, all_houses)
+
+        self.seed = seed
+        self.lvl = lvl
+        self.solution = bytearray(layout.solution)
+        self.values = bytearray(81)
+        self.status = BoardStatus.BoardStatus(self.solution)  # the counts of the filled, correct and wrong cells
+        self.candidates = array('H', bytes(2 * 81))  # the options of each cell
+        self.guesses = array('H', bytes(2 * 81))  # the guesses of each cell
+        self.guess_order = array('Q', bytes(8 * 81))  # the guesses in the order they were added, 4 bits each
+        self.house_masks = array('H', bytes(2 * 27))  # the digits in each house, in topology.HOUSE_INDEXES order
+        self.cage_of = bytearray(81)  # the number of the cage of each cell
+        cages = []
+        for number, (cells, killer, color) in enumerate(layout.cages):
+            cells = tuple(topology.PLACES[topology.index_of(place)] for place in cells)
+            cages.append(CompactCage(self, number, cells, killer, color))
+            for place in cells:
+                self.cage_of[topology.index_of(place)] = number
+        self.cages = tuple(cages)
+        # the cells of virtual cage v are virtual_cells[virtual_starts[v]:virtual_starts[v + 1]]
+        derived = innies_outies.derive([(cage.indexes, cage.killer) for cage in cages]) if sum_rules else []
+        self.virtual_cells = bytes(index for indexes, _ in derived for index in indexes)
+        self.virtual_starts = array('H', [0])
+        for indexes, _ in derived:
+            self.virtual_starts.append(self.virtual_starts[-1] + len(indexes))
+        self.virtual_killers = bytes(total for _, total in derived)
+        # the virtual cages of cell i are virtual_of[virtual_of_starts[i]:virtual_of_starts[i + 1]]
+        numbers_of = [[] for _ in range(81)]
+        for number, (indexes, _) in enumerate(derived):
+            for index in indexes:
+                numbers_of[index].append(number)
+        self.virtual_of = bytes(number for numbers in numbers_of for number in numbers)
+        self.virtual_of_starts = array('H', [0])
+        for numbers in numbers_of:
+            self.virtual_of_starts.append(self.virtual_of_starts[-1] + len(numbers))
+        self.cage_masks = array('H', bytes(2 * (len(cages) + len(derived))))  # the digits in each cage
+        self.known_cells = layout.get_known_cells()  # all the cells that belong to a cage with only 1 cell
+        self._batch_depth = 0
+        self._snapshot = None  # the last snapshot that was taken
+        with self.batch():
+            for place in self.known_cells:
+                self.set_cells_value(place, -1)
+
+    def get_board(self):
+        """
+        returns the player's values as a list of 9 lists.
+        """
+        return [list(self.values[row * 9:row * 9 + 9]) for row in range(9)]
+
+    def get_solution(self):
+        """
+        returns the solution.
+        """
+        return CompactSolution(self.solution)
+
+    def get_cell(self, place):
+        """
+        returns a view of the cell in the given place.
+        :param place: tuple of two integers, the first one is the row of the cell and the second one is the column.
+        """
+        return CompactCell(self, topology.index_of(place))
+
+    def get_cell_value(self, place):
+        """
+        returns the given cell's value.
+        """
+        return self.values[topology.index_of(place)]
+
+    def get_cages(self):
+        """
+        returns all the cages of the board.
+        """
+        return self.cages
+
+    def get_virtual_cage(self, number):
+        """
+        returns a view of a virtual cage of the 45 rule, it isn't drawn and isn't part of the layout.
+        :param number: integer, the number of the virtual cage, from 0 to len(virtual_killers) - 1.
+        """
+        cells = self.virtual_cells[self.virtual_starts[number]:self.virtual_starts[number + 1]]
+        return CompactCage(self, len(self.cages) + number, tuple(topology.PLACES[index] for index in cells),
+                           self.virtual_killers[number], None)
+
+    def virtual_numbers(self, index):
+        """
+        returns the numbers of the virtual cages of the cell in the given index.
+        """
+        return self.virtual_of[self.virtual_of_starts[index]:self.virtual_of_starts[index + 1]]
+
+    def set_cells_value(self, place, val=-1):
+        """
+        sets the given cell's value, if the value is already the cell's value, removes it.
+        :param place: tuple of two integers, the first one is the row of the cell and the second one is the column.
+        :param val: integer, value between 1 and 9. if the value is -1, it sets the cell's value to be its true value.
+        """
+        index = topology.index_of(place)
+        if val == -1:  # sets the cell's value to be its true value
+            val = self.solution[index]
+        if self.values[index] == val:
+            val = 0
+        self.status.record(index, self.values[index], val)
+        self.values[index] = val
+        self._update_masks(index)
+        if not self._batch_depth:
+            self._update_candidates(topology.PEERS[index] + self.cages[self.cage_of[index]].indexes)
+
+    def _update_masks(self, index):
+        """
+        updates the masks of the houses and the cage of the given cell.
+        """
+        values = self.values
+        for house in topology.HOUSES_OF[index]:
+            mask = 0
+            for other in topology.HOUSE_INDEXES[house]:
+                if values[other]:
+                    mask |= 1 << (values[other] - 1)
+            self.house_masks[house] = mask
+        cage = self.cages[self.cage_of[index]]
+        mask = 0
+        for other in cage.indexes:
+            if values[other]:
+                mask |= 1 << (values[other] - 1)
+        self.cage_masks[cage.number] = mask
+        starts = self.virtual_starts
+        for number in self.virtual_numbers(index):
+            mask = 0
+            for other in self.virtual_cells[starts[number]:starts[number + 1]]:
+                if values[other]:
+                    mask |= 1 << (values[other] - 1)
+            self.cage_masks[len(self.cages) + number] = mask
+
+    def _update_candidates(self, indexes):
+        """
+        updates the options of the given cells.
+        """
+        values, house_masks, cage_masks = self.values, self.house_masks, self.cage_masks
+        starts, first_virtual = self.virtual_starts, len(self.cages)
+        for index in indexes:
+            if values[index]:
+                self.candidates[index] = 0
+                continue
+            cage = self.cages[self.cage_of[index]]
+            row, col, nonet = topology.HOUSES_OF[index]
+            seen = house_masks[row] | house_masks[col] | house_masks[nonet] | cage_masks[cage.number]
+            options_mask = cage.get_options_mask()
+            for number in self.virtual_numbers(index):  # the cells of a virtual cage are connected
+                options_mask &= cage_combinations.options_mask(self.virtual_killers[number],
+                                                               starts[number + 1] - starts[number],
+                                                               cage_masks[first_virtual + number])
+            self.candidates[index] = options_mask & ~seen
+
+    @contextmanager
+    def batch(self):
+        """
+        groups many changes together and updates the options once at the end, instead of after every change.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._update_candidates(range(81))
+
+    def load_values(self, values):
+        """
+        sets the values of all the cells the player can change at once, and updates the options once.
+        :param values: a list of 9 lists of 9 integers between 0 and 9, 0 is an empty cell.
+        """
+        with self.batch():
+            for place in topology.PLACES:
+                if place in self.known_cells:
+                    continue
+                val = values[place[0]][place[1]]
+                if self.get_cell_value(place) != val:
+                    self.set_cells_value(place, val)
+
+    def set_cells_guess(self, place, val):
+        """
+        sets the cell's guesses, if the guess is already there, removes it.
+        """
+        index = topology.index_of(place)
+        bit = 1 << (val - 1)
+        order = self.guess_order[index]
+        if self.guesses[index] & bit:  # remove the guess from the order
+            kept = 0
+            shift = 0
+            while order:
+                digit = order & 0xF
+                order >>= 4
+                if digit != val:
+                    kept |= digit << shift
+                    shift += 4
+            self.guess_order[index] = kept
+        else:
+            self.guess_order[index] = order | val << (4 * cage_combinations.BIT_COUNT[self.guesses[index]])
+        self.guesses[index] ^= bit
+
+    def delete_cells_guess(self, place):
+        """
+        deletes the last guess that was inserted to the cell.
+        """
+        index = topology.index_of(place)
+        count = cage_combinations.BIT_COUNT[self.guesses[index]]
+        if count:
+            last = self.guess_order[index] >> (4 * (count - 1)) & 0xF
+            self.set_cells_guess(place, last)
+
+    def get_layout(self):
+        """
+        returns the immutable solution and cages of the board.
+        """
+        cages = [(cage.cells, cage.killer, cage.color) for cage in self.cages]
+        return PuzzleLayout.PuzzleLayout(self.seed, self.lvl, self.solution, cages)
+
+    def snapshot(self):
+        """
+        returns an immutable snapshot of the player's values and guesses.
+        the rows that didn't change since the last snapshot are shared with it instead of copied.
+        """
+        previous = self._snapshot
+        layout = previous.layout if previous is not None else self.get_layout()
+        rows = [self.values[row * 9:row * 9 + 9] for row in range(9)]
+        if previous is None:
+            dirty_rows = set(range(9))
+        else:  # the compact board doesn't track changes, compare the rows instead
+            dirty_rows = {row for row in range(9) if tuple(rows[row]) != previous.rows[row] or
+                          tuple(self.guesses[row * 9:row * 9 + 9]) != previous.guess_rows[row]}
+        self._snapshot = BoardSnapshot.take_snapshot(previous, layout, rows,
+                                                     lambda row: self.guesses[row * 9:row * 9 + 9], dirty_rows)
+        return self._snapshot
+
+    def find_mistakes(self):
+        """
+        returns all the cells places with mistakes in them, the status keeps them so no cell is scanned.
+        """
+        return self.status.get_mistakes()
+
+    def is_solved(self):
+        """
+        returns True if every cell has its true value.
+        """
+        return self.status.is_solved()
+
+    def is_filled_correctly(self):
+        """
+        returns True if every cell is filled and the values fill every house and cage correctly, see
+        Board.is_filled_correctly.
+        """
+        if self.status.filled != 81:
+            return False
+        values = self.values
+        for house in topology.HOUSE_INDEXES:
+            if {values[i] for i in house} != set(range(1, 10)):
+                return False
+        for cage in self.cages:
+            cage_values = [values[i] for i in cage.indexes]
+            if sum(cage_values) != cage.killer or len(set(cage_values)) != len(cage_values):
+                return False
+        return True
+
+    def get_progress(self):
+        """
+        returns the counts of the filled, correct, wrong and empty cells as a dictionary.
+        """
+        return self.status.get_progress()
+
+    def reset_board(self):
+        """
+        resets the values the player inserted
+        """
+        with self.batch():
+            for index, place in enumerate(topology.PLACES):
+                if place not in self.known_cells:
+                    self.status.record(index, self.values[index], 0)
+                    self.values[index] = 0
+                    self.guesses[index] = 0
+                    self.guess_order[index] = 0
+            for index in range(81):
+                self._update_masks(index)
+
+    def memory_usage(self):
+        """
+        returns the number of bytes the board uses: the board, its arrays and its cages.
+        the topology tables, the combination tables and the colors are shared by all the boards and aren't counted.
+        """
+        total = sys.getsizeof(self)
+        for name in ('solution', 'values', 'candidates', 'guesses', 'guess_order', 'house_masks', 'cage_masks',
+                     'cage_of', 'cages', 'virtual_cells', 'virtual_starts', 'virtual_killers', 'virtual_of',
+                     'virtual_of_starts', 'known_cells'):
+            total += sys.getsizeof(getattr(self, name))
+        for cage in self.cages:
+            total += sys.getsizeof(cage) + sys.getsizeof(cage.cells) + sys.getsizeof(cage.indexes)
+        total += sys.getsizeof(self.status) + sys.getsizeof(self.status.incorrect)  # it shares the solution
+        return total
+
+    def __str__(self):
+        """
+        returns a string representation of the board.
+        """
+        result = ""
+        for i in range(9):
+            if i % 3 == 0 and i != 0:
+                result += "-" * 21 + "\n"
+
+            for j in range(9):
+                if j % 3 == 0 and j != 0:
+                    result += "| "
+
+                result += str(self.get_cell_value((i, j))) + " "
+            result += "\n"
+
+        return result
+
+
+def _deep_size(obj, seen):
+    """
+    returns the number of bytes of an object and everything it references, counting each object once.
+    """
+    if id(obj) in seen or isinstance(obj, type) or callable(obj):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_size(key, seen) + _deep_size(val, seen) for key, val in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_size(item, seen) for item in obj)
+    if hasattr(obj, '__dict__'):
+        size += _deep_size(vars(obj), seen)
+    return size
+
+
+def report_memory(seeds=range(1, 21), levels=range(1, 11)):
+    """
+    prints the memory a compact board uses against a Board, and checks every compact board is within the budget.
+    """
+    shared = set()  # objects every board shares, like the small ints and the topology places
+    _deep_size(topology.PLACES, shared)
+    _deep_size(list(range(-5, 257)), shared)
+    worst = 0
+    for lvl in levels:
+        for seed in seeds:
+            size = CompactBoard(seed, lvl).memory_usage()
+            assert size <= MEMORY_BUDGET, (seed, lvl, size)
+            worst = max(worst, size)
+    board_size = _deep_size(Board.Board(seeds[0], levels[-1]), set(shared))
+    print(f"Board: {board_size} bytes, CompactBoard: at most {worst} bytes (budget {MEMORY_BUDGET})")
+    return worst
+
+
+if __name__ == "__main__":
+    report_memory()
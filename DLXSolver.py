@@ -0,0 +1,372 @@
+import statistics
+import sys
+import time
+import cage_combinations
+import topology
+from KillerSolver import KillerSolver, SolveResult, SolverStopped
+
+
+class DLXSolver:
+    """
+        solves a killer sudoku as an exact cover problem, with algorithm X on dancing links.
+
+        the columns that must be covered exactly once are:
+            every cell, every (row, digit), every (column, digit), every (nonet, digit) - the sudoku rules.
+            every cage - the cage picks one of its digit combinations (the options of Cage.set_options).
+            every (cage, digit) - covered by the cell of the cage that holds the digit if the digit is in the
+                                  picked combination, or by the combination itself if it isn't.
+        so there are two kinds of option rows: a digit in a cell, which covers its cell, row, column, nonet and
+        (cage, digit) columns, and a combination of a cage, which covers the cage's column and the (cage, digit)
+        columns of the digits it doesn't have. a cover then fills every cage with exactly the digits of one of its
+        combinations, which is the killer rule.
+
+        Methods:
+            __init__ - initializes a solver.
+            from_layout - creates a solver for a PuzzleLayout.
+            from_board - creates a solver for the cages of a Board (or a CompactBoard).
+            from_houses - creates a solver for the cages of a Houses.
+            solve - finds one solution.
+            count_solutions - counts the solutions, up to a limit.
+    """
+
+    def __init__(self, cages, givens=None, timeout=None, cancel_event=None):
+        """
+        initializes a solver.
+        :param cages: an iterable of (list of the cage's places, killer).
+        :param givens: a sequence of 81 values (0 is empty) the solution must keep, or None.
+        :param timeout: the most seconds a run may take, or None.
+        :param cancel_event: a threading.Event (or anything with is_set), the run stops when it is set.
+        """
+        cages = [([topology.index_of(place) for place in cells], killer) for cells, killer in cages]
+        cage_of = [0] * 81
+        for number, (indexes, _) in enumerate(cages):
+            for index in indexes:
+                cage_of[index] = number
+        self.givens = givens
+        self.timeout = timeout
+        self.cancel_event = cancel_event
+        self.nodes = 0
+        self._deadline = None
+
+        cage_column = 324  # the first cage column, after the 4 * 81 sudoku columns
+        cage_digit_column = cage_column + len(cages)
+        num_columns = cage_digit_column + 9 * len(cages)
+        # node 0 is the root, nodes 1 to num_columns are the column headers, column c is node c + 1
+        self.left = list(range(-1, num_columns))
+        self.left[0] = num_columns
+        self.right = list(range(1, num_columns + 1)) + [0]
+        self.up = list(range(num_columns + 1))
+        self.down = list(range(num_columns + 1))
+        self.column = list(range(num_columns + 1))
+        self.size = [0] * (num_columns + 1)
+        self.row_of = [None] * (num_columns + 1)  # the option each node belongs to
+        self.first_node = {}  # option -> its first node
+
+        for index in range(81):
+            row, col = topology.PLACES[index]
+            number = cage_of[index]
+            indexes, killer = cages[number]
+            allowed = cage_combinations.can_contain(killer, len(indexes))
+            for digit in cage_combinations.mask_to_digits(allowed):
+                self._add_option(('cell', index, digit),
+                                 (index, 81 + row * 9 + digit - 1, 162 + col * 9 + digit - 1,
+                                  243 + topology.NONET_OF[index] * 9 + digit - 1,
+                                  cage_digit_column + number * 9 + digit - 1))
+        for number, (indexes, killer) in enumerate(cages):
+            for combo in cage_combinations.get_combinations(killer, len(indexes)):
+                self._add_option(('cage', number, combo),
+                                 (cage_column + number,) + tuple(cage_digit_column + number * 9 + digit - 1
+                                                                 for digit in range(1, 10)
+                                                                 if not combo >> (digit - 1) & 1))
+
+    def _add_option(self, option, columns):
+        """
+        adds an option row that covers the given columns.
+        """
+        first = len(self.column)
+        for i, col in enumerate(columns):
+            node = first + i
+            header = col + 1
+            self.column.append(header)
+            self.row_of.append(option)
+            self.left.append(node - 1 if i else first + len(columns) - 1)
+            self.right.append(node + 1 if i < len(columns) - 1 else first)
+            # links the node at the bottom of its column
+            self.up.append(self.up[header])
+            self.down.append(header)
+            self.down[self.up[header]] = node
+            self.up[header] = node
+            self.size[header] += 1
+        self.first_node[option] = first
+
+    @classmethod
+    def from_layout(cls, layout, **kwargs):
+        """
+        creates a solver for a PuzzleLayout.
+        """
+        return cls([(cells, killer) for cells, killer, _ in layout.cages], **kwargs)
+
+    @classmethod
+    def from_board(cls, board, **kwargs):
+        """
+        creates a solver for the cages of a Board (or a CompactBoard).
+        """
+        return cls([(cage.cells, cage.killer) for cage in board.get_cages()], **kwargs)
+
+    @classmethod
+    def from_houses(cls, all_houses, **kwargs):
+        """
+        creates a solver for the cages of a Houses, after set_cages.
+        """
+        return cls([(cage.cells, cage.killer) for cage in all_houses.reverse_cages], **kwargs)
+
+    def _cover(self, header):
+        """
+        removes a column and every option that covers it.
+        """
+        left, right, up, down, column, size = self.left, self.right, self.up, self.down, self.column, self.size
+        right[left[header]] = right[header]
+        left[right[header]] = left[header]
+        i = down[header]
+        while i != header:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                size[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def _uncover(self, header):
+        """
+        puts back a column and its options, in the opposite order of _cover.
+        """
+        left, right, up, down, column, size = self.left, self.right, self.up, self.down, self.column, self.size
+        i = up[header]
+        while i != header:
+            j = left[i]
+            while j != i:
+                size[column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[header]] = header
+        left[right[header]] = header
+
+    def _select(self, node):
+        """
+        covers every column of the option of the given node.
+        """
+        j = node
+        while True:
+            self._cover(self.column[j])
+            j = self.right[j]
+            if j == node:
+                return
+
+    def _unselect(self, node):
+        """
+        puts back the columns _select covered, in the opposite order.
+        """
+        j = self.left[node]
+        while True:
+            self._uncover(self.column[j])
+            if j == node:
+                return
+            j = self.left[j]
+
+    def _check_stop(self):
+        """
+        raises SolverStopped if the time limit passed or the run was cancelled.
+        """
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise SolverStopped('timeout')
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise SolverStopped('cancelled')
+
+    def _search(self, chosen, limit, found):
+        """
+        searches for covers of the remaining columns, and adds the solutions to found until it has limit solutions.
+        :param chosen: list of the options chosen so far.
+        """
+        self.nodes += 1
+        if self.nodes & 255 == 0:
+            self._check_stop()
+        right, size = self.right, self.size
+        header = right[0]
+        if header == 0:
+            solution = [0] * 81
+            for option in chosen:
+                if option[0] == 'cell':
+                    solution[option[1]] = option[2]
+            found.append(tuple(solution))
+            return
+        # the column with the fewest options left
+        best = header
+        best_size = size[header]
+        while header != 0 and best_size > 1:
+            if size[header] < best_size:
+                best = header
+                best_size = size[header]
+            header = right[header]
+        if best_size == 0:
+            return
+        down, left, column, row_of = self.down, self.left, self.column, self.row_of
+        self._cover(best)
+        i = down[best]
+        try:
+            while i != best and len(found) < limit:
+                chosen.append(row_of[i])
+                j = right[i]
+                while j != i:
+                    self._cover(column[j])
+                    j = right[j]
+                try:
+                    self._search(chosen, limit, found)
+                finally:
+                    # puts the links back even when the run stops, so the solver can be run again
+                    j = left[i]
+                    while j != i:
+                        self._uncover(column[j])
+                        j = left[j]
+                    chosen.pop()
+                i = down[i]
+        finally:
+            self._uncover(best)
+
+    def _run(self, limit):
+        """
+        runs the search until limit solutions were found or every cover was found.
+        the links are back as they were when the run ends, so a solver can be run again.
+        """
+        start = time.perf_counter()
+        self.nodes = 0
+        self._deadline = start + self.timeout if self.timeout is not None else None
+        found = []
+        chosen = []
+        selected = []
+        status = None
+        try:
+            self._check_stop()
+            consistent = True
+            if self.givens is not None:
+                for index, val in enumerate(self.givens):
+                    if not val:
+                        continue
+                    node = self.first_node.get(('cell', index, val))
+                    # a given that can't be used, or that covers a column an earlier given already covered
+                    if node is None or any(self.right[self.left[n]] != n for n in self._option_headers(node)):
+                        consistent = False
+                        break
+                    self._select(node)
+                    selected.append(node)
+                    chosen.append(self.row_of[node])
+            if consistent:
+                self._search(chosen, limit, found)
+        except SolverStopped as stop:
+            status = str(stop)
+        finally:
+            for node in reversed(selected):
+                self._unselect(node)
+        if status is None:
+            status = 'solved' if found else 'unsolvable'
+        return SolveResult(status, found, self.nodes, time.perf_counter() - start)
+
+    def _option_headers(self, node):
+        """
+        returns the column headers of the option of the given node.
+        """
+        headers = [self.column[node]]
+        j = self.right[node]
+        while j != node:
+            headers.append(self.column[j])
+            j = self.right[j]
+        return headers
+
+    def solve(self):
+        """
+        finds one solution.
+        :return: SolveResult.
+        """
+        return self._run(1)
+
+    def count_solutions(self, limit=2):
+        """
+        counts the solutions, and stops as soon as limit solutions were found.
+        :return: SolveResult, its count is the number of solutions (at most limit).
+        """
+        return self._run(limit)
+
+
+def benchmark(seeds=None, levels=range(1, 11), timeout=5):
+    """
+    solves the layouts of the golden corpus with DLX and with the propagation solver, checks that every solution
+    is valid, and prints the median and the 99th percentile solve times of each
+    level and how many runs timed out.
+    :param seeds: the seeds to solve, or None for every seed of the corpus.
+    """
+    import golden_corpus
+    import PuzzleLayout
+    seeds = golden_corpus.SEEDS if seeds is None else seeds
+    results = {}
+    for lvl in levels:
+        times = {'dlx': [], 'propagation': []}
+        timeouts = {'dlx': 0, 'propagation': 0}
+        for seed in seeds:
+            layout = PuzzleLayout.PuzzleLayout.generate(seed, lvl)
+            for name, solver_class in (('dlx', DLXSolver), ('propagation', KillerSolver)):
+                result = solver_class.from_layout(layout, timeout=timeout).solve()
+                if result.status == 'timeout':
+                    timeouts[name] += 1
+                else:
+                    # the legacy layouts may have more than one solution, so check the found one is valid
+                    assert result.status == 'solved', (name, seed, lvl, result)
+                    assert KillerSolver.from_layout(layout).is_solution(result.solution), (name, seed, lvl)
+                times[name].append(result.elapsed)
+        line = []
+        for name in times:
+            ordered = sorted(times[name])
+            median = statistics.median(ordered)
+            p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+            results[(lvl, name)] = (median, p99, timeouts[name])
+            line.append(f"{name} median {median * 1000:.1f}ms, p99 {p99 * 1000:.1f}ms, {timeouts[name]} timeouts")
+        print(f"level {lvl}: " + "; ".join(line))
+    return results
+
+
+def cross_check(seeds=None, levels=range(1, 11), timeout=5):
+    """
+    checks every layout of the golden corpus against the solution BoardSolutionCreator stored in it: the stored
+    solution must be a cover when it's given, and a layout DLX finds unique must have the stored solution.
+    the solution counts (up to two) must also be the same as the propagation solver's.
+    :param seeds: the seeds to check, or None for every seed of the corpus.
+    :return: a list of the (seed, lvl) pairs that disagree.
+    """
+    import golden_corpus
+    import PuzzleLayout
+    seeds = golden_corpus.SEEDS if seeds is None else seeds
+    mismatches = []
+    for lvl in levels:
+        for seed in seeds:
+            layout = PuzzleLayout.PuzzleLayout.generate(seed, lvl)
+            solver = DLXSolver.from_layout(layout, timeout=timeout)
+            dlx = solver.count_solutions(2)
+            solver.givens = layout.solution
+            stored = solver.solve()
+            if stored.status != 'solved' or stored.solution != layout.solution:
+                mismatches.append((seed, lvl))
+            elif dlx.status == 'solved' and dlx.count == 1 and dlx.solution != layout.solution:
+                mismatches.append((seed, lvl))
+            elif dlx.status == 'solved':
+                propagation = KillerSolver.from_layout(layout, timeout=timeout).count_solutions(2)
+                if propagation.status == 'solved' and propagation.count != dlx.count:
+                    mismatches.append((seed, lvl))
+    return mismatches
+
+
+if __name__ == "__main__":
+    # python DLXSolver.py [first_seed last_seed], the whole corpus takes hours
+    seed_range = range(int(sys.argv[1]), int(sys.argv[2]) + 1) if len(sys.argv) > 2 else None
+    print(f"{len(cross_check(seed_range))} layouts disagree with the stored solutions")
+    benchmark(seed_range)
@@ -0,0 +1,207 @@
+import os
+import threading
+import time
+import zlib
+import PuzzleLayout
+import save_game
+from resource_path import user_data_path
+
+CACHE_DIR = user_data_path("cache")  # written while the game runs, so not in the frozen build's bundle
+DEADLINE = 0.5  # the seconds the game waits for a fresh puzzle before it falls back
+FALLBACKS = ('cache', 'substitute', 'wait')
+CRC_BYTES = 4
+
+
+class GeneratedPuzzle:
+    """
+        the puzzle a DeadlineGenerator served, and where it came from.
+
+        source is one of:
+            'fresh' - the puzzle was generated before the deadline.
+            'cache' - the same puzzle, read from the cache after the deadline passed.
+            'substitute' - another game number of the same level from the cache, the player must be told.
+            'late' - the puzzle was generated after the deadline, nothing could be served in time.
+    """
+    __slots__ = ('layout', 'source', 'seed', 'lvl', 'seconds')
+
+    def __init__(self, layout, source, seed, lvl, seconds):
+        self.layout = layout  # PuzzleLayout, its seed is the substitute's game number if source is 'substitute'
+        self.source = source
+        self.seed = seed  # the game number that was asked for
+        self.lvl = lvl
+        self.seconds = seconds  # the seconds the caller waited
+
+    def is_substitute(self):
+        """
+        returns True if the puzzle isn't the one that was asked for.
+        """
+        return self.source == 'substitute'
+
+    def __repr__(self):
+        return f"GeneratedPuzzle({self.seed}-{self.lvl}, {self.source}, {self.seconds * 1000:.1f}ms)"
+
+
+class DeadlineGenerator:
+    """
+        serves puzzles within a deadline.
+
+        the puzzle is generated on a background thread, and the caller waits for it until the deadline. if it isn't
+        ready by then, the fallbacks are tried in order:
+            'cache' - the same puzzle from the cache of the puzzles generated before.
+            'substitute' - a cached puzzle of another game number of the same level.
+            'wait' - waits for the generation to finish, however long it takes.
+        if none of them serves a puzzle, TimeoutError is raised. every puzzle that is generated, even after its
+        deadline passed, is written to the cache, so a slow seed is only slow once. the misses are kept in a list
+        and appended to a file in the cache.
+
+        Methods:
+            __init__ - initializes a generator.
+            get - returns the puzzle of (seed, lvl), or its fallback.
+            read_cached - returns a layout from the cache.
+            write_cached - writes a layout to the cache.
+            cached_seeds - returns the game numbers of a level that are in the cache.
+    """
+
+    def __init__(self, deadline=DEADLINE, fallbacks=FALLBACKS, cache_dir=CACHE_DIR, generate=None):
+        """
+        initializes a generator.
+        :param deadline: the seconds get waits for the generation before it falls back.
+        :param fallbacks: a sequence of 'cache', 'substitute' and 'wait', tried in this order after the deadline.
+        :param cache_dir: the directory of the cached layouts.
+        :param generate: function that gets (seed, lvl) and returns a PuzzleLayout, a slow one can simulate slow seeds.
+                         None for PuzzleLayout.generate, the legacy layouts the game plays: every (seed, lvl) gets
+                         the same puzzle on every machine, so only a seed that is really slow falls back.
+        """
+        for fallback in fallbacks:
+            if fallback not in FALLBACKS:
+                raise ValueError(f"unknown fallback: {fallback}")
+        self.deadline = deadline
+        self.fallbacks = tuple(fallbacks)
+        self.cache_dir = cache_dir
+        self.generate = generate or PuzzleLayout.PuzzleLayout.generate
+        self.misses = []  # the puzzles that weren't generated in time, (seed, lvl, source)
+
+    def get(self, seed, lvl):
+        """
+        returns the puzzle of (seed, lvl), or its fallback if it isn't generated within the deadline.
+        :return: GeneratedPuzzle.
+        :raise TimeoutError: if the deadline passed and no fallback served a puzzle.
+        """
+        start = time.perf_counter()
+        result = {}
+        done = threading.Event()
+        thread = threading.Thread(target=self._generate, args=(seed, lvl, result, done), daemon=True)
+        thread.start()
+        if done.wait(self.deadline):
+            return self._served(result, 'fresh', seed, lvl, start)
+        for fallback in self.fallbacks:
+            if fallback == 'cache':
+                layout = self.read_cached(seed, lvl)
+                if layout is not None:
+                    return self._missed(layout, 'cache', seed, lvl, start)
+            elif fallback == 'substitute':
+                for other in self.cached_seeds(lvl):
+                    if other == int(seed):
+                        continue
+                    layout = self.read_cached(other, lvl)
+                    if layout is not None:
+                        return self._missed(layout, 'substitute', seed, lvl, start)
+            else:
+                done.wait()
+                self._record_miss(seed, lvl, 'late', start)
+                return self._served(result, 'late', seed, lvl, start)
+        self._record_miss(seed, lvl, 'timeout', start)
+        raise TimeoutError(f"game {seed}-{lvl} wasn't generated within {self.deadline}s")
+
+    def read_cached(self, seed, lvl):
+        """
+        returns a layout from the cache, or None if it isn't there or can't be read.
+        """
+        try:
+            with open(self._path(seed, lvl), "rb") as file:
+                data = file.read()
+            if len(data) < CRC_BYTES or int.from_bytes(data[:CRC_BYTES], "little") != zlib.crc32(data[CRC_BYTES:]):
+                return None
+            return PuzzleLayout.PuzzleLayout.from_bytes(data[CRC_BYTES:])
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def write_cached(self, layout):
+        """
+        writes a layout to the cache, replacing the old one at once (see save_game.write).
+        """
+        data = layout.to_bytes()
+        try:
+            save_game.write(self._path(layout.seed, layout.lvl), zlib.crc32(data).to_bytes(CRC_BYTES, "little") + data)
+        except OSError:
+            pass  # a puzzle that isn't cached is only generated again
+
+    def cached_seeds(self, lvl):
+        """
+        returns the game numbers of a level that are in the cache, sorted.
+        """
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return []
+        suffix = f"_{lvl}.layout"
+        return sorted(int(name[:-len(suffix)]) for name in names
+                      if name.endswith(suffix) and name[:-len(suffix)].isdigit())
+
+    def _path(self, seed, lvl):
+        """
+        returns the path of the cached layout of (seed, lvl).
+        """
+        return os.path.join(self.cache_dir, f"{int(seed)}_{int(lvl)}.layout")
+
+    def _generate(self, seed, lvl, result, done):
+        """
+        the work of the background thread: generates the layout and caches it.
+        an error is kept in the result and raised by the caller.
+        """
+        try:
+            layout = self.generate(seed, lvl)
+            result['layout'] = layout
+            self.write_cached(layout)
+        except Exception as error:
+            result['error'] = error
+        done.set()
+
+    def _served(self, result, source, seed, lvl, start):
+        """
+        returns the puzzle the background thread generated.
+        """
+        if 'error' in result:
+            raise result['error']
+        return GeneratedPuzzle(result['layout'], source, seed, lvl, time.perf_counter() - start)
+
+    def _missed(self, layout, source, seed, lvl, start):
+        """
+        records a miss and returns the puzzle the fallback served.
+        """
+        self._record_miss(seed, lvl, source, start)
+        return GeneratedPuzzle(layout, source, seed, lvl, time.perf_counter() - start)
+
+    def _record_miss(self, seed, lvl, source, start):
+        """
+        adds a miss to the list and to the misses file of the cache, a line of "seed lvl source milliseconds".
+        """
+        self.misses.append((seed, lvl, source))
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(os.path.join(self.cache_dir, "misses.txt"), "a") as file:
+                file.write(f"{seed} {lvl} {source} {(time.perf_counter() - start) * 1000:.0f}\n")
+        except OSError:
+            pass
+
+
+def slow_generate(slow_seeds, delay, generate=PuzzleLayout.PuzzleLayout.generate):
+    """
+    returns a generate function that takes delay more seconds on the given seeds, to simulate slow seeds.
+    """
+    def generate_slowly(seed, lvl):
+        if int(seed) in slow_seeds:
+            time.sleep(delay)
+        return generate(seed, lvl)
+    return generate_slowly
+
@@ -0,0 +1,375 @@
+import os
+import statistics
+import sys
+import time
+import cage_combinations
+import KillerSolver
+import PuzzleLayout
+import topology
+from resource_path import resource_path
+
+BIT_COUNT = cage_combinations.BIT_COUNT
+GRADES_PATH = resource_path(os.path.join("corpus", "difficulty_grades.txt"))
+# the techniques in the order a player tries them, and the points every use of each one adds to the score
+TECHNIQUES = (
+    ('naked_single', 1),
+    ('hidden_single', 2),
+    ('cage_combination', 3),
+    ('locked_candidates', 5),
+    ('innie_outie', 6),
+    ('naked_pair', 8),
+    ('hidden_pair', 10),
+    ('guess', 30),
+)
+
+
+class DifficultyGrader:
+    """
+        grades a puzzle by solving it the way a player would.
+
+        the grader keeps the candidates of every cell, and in every step it uses the easiest technique that
+        changes something, starting again from the easiest one after each step. the steps each technique took are
+        counted, and the score adds the technique's points for every step. when no technique helps, the grader
+        guesses, so every puzzle is graded in at most 81 guesses.
+
+        the techniques:
+            naked_single - a cell with one candidate is placed, and the digit is removed from its peers.
+            hidden_single - a digit that only one cell of a row, a column or a nonet can hold is placed there.
+            cage_combination - a cell keeps only the digits it holds in some filling of its cage.
+            locked_candidates - a digit of a nonet that is only in one row or column is removed from the rest of
+                                that row or column, and the other way around. a digit a cage must have is removed
+                                from the rest of a house that holds the whole cage.
+            innie_outie - a cell keeps only the digits it holds in some filling of its 45 rule's virtual cages.
+            naked_pair - two cells of a house or a cage with the same two candidates remove them from the others.
+            hidden_pair - two digits that only two cells of a house can hold remove the other candidates of the two.
+            guess - the cell with the fewest candidates is given its digit from the layout's solution. the legacy
+                    layouts may have more than one solution, and then only guessing can finish them.
+
+        Methods:
+            __init__ - initializes a grader.
+            grade - grades a layout.
+            grade_seed - grades the layout of (seed, lvl).
+            steps - returns the steps a player can take from the given values, in order.
+    """
+
+    def __init__(self):
+        """
+        initializes a grader.
+        """
+        self.solver = None
+        self.solution = None
+        self.cand = None
+        self.placed = None
+        self.note = ''  # where the last technique found its step, for the steps' explanations
+        # the techniques' functions, in order
+        self.techniques = tuple((name, points, getattr(self, '_' + name)) for name, points in TECHNIQUES)
+
+    def grade(self, layout):
+        """
+        grades a layout.
+        :return: a dictionary with:
+                 'score' - the points of all the steps.
+                 'steps' - a dictionary from a technique's name to the steps it took.
+                 'hardest' - the name of the hardest technique that was needed.
+                 'seconds' - the time the grading took.
+        """
+        start = time.perf_counter()
+        self._start(layout)
+        steps = {name: 0 for name, _ in TECHNIQUES}
+        score = 0
+        hardest = 0
+        while not all(self.placed):
+            for level, (name, points, technique) in enumerate(self.techniques):
+                used = technique()
+                if used:
+                    steps[name] += used
+                    score += points * used
+                    hardest = max(hardest, level)
+                    break
+        return {'score': score, 'steps': steps, 'hardest': TECHNIQUES[hardest][0],
+                'seconds': time.perf_counter() - start}
+
+    def grade_seed(self, seed, lvl):
+        """
+        grades the layout of (seed, lvl).
+        :return: see grade.
+        """
+        return self.grade(PuzzleLayout.PuzzleLayout.generate(seed, lvl))
+
+    def steps(self, layout, values):
+        """
+        returns the steps a player can take from the given values, in order, until the puzzle is solved.
+        :param values: a sequence of 81 values, row by row, 0 is empty. every value must be the solution's.
+        :return: a list of (technique name, list of the (index, digit) it placed,
+                 list of the (index, mask of the digits) it removed, note). a step that places digits doesn't list
+                 the digits it removed from the peers.
+        """
+        self._start(layout)
+        for index, val in enumerate(values):
+            if val:
+                self._place(index, 1 << (val - 1))
+        result = []
+        while not all(self.placed):
+            for name, _, technique in self.techniques:
+                before = self.cand[:]
+                placed_before = self.placed[:]
+                self.note = ''
+                if technique():
+                    placed = [(i, BIT_COUNT[self.cand[i] - 1 & ~self.cand[i]] + 1)
+                              for i in range(81) if self.placed[i] and not placed_before[i]]
+                    removed = [] if placed else [(i, before[i] & ~self.cand[i])
+                                                 for i in range(81) if before[i] & ~self.cand[i]]
+                    result.append((name, placed, removed, self.note))
+                    break
+        return result
+
+    def _start(self, layout):
+        """
+        sets the candidates of a layout before any step.
+        """
+        self.solver = KillerSolver.KillerSolver.from_layout(layout, sum_rules=True)
+        self.solution = layout.solution
+        self.cand = self.solver.initial_candidates()
+        self.placed = [False] * 81
+
+    def _place(self, index, bit):
+        """
+        places a digit in a cell and removes it from the cell's peers.
+        """
+        cand = self.cand
+        cand[index] = bit
+        self.placed[index] = True
+        for j in self.solver.peers[index]:
+            cand[j] &= ~bit
+
+    def _naked_single(self):
+        """
+        places every cell with one candidate.
+        :return: the number of cells that were placed.
+        """
+        used = 0
+        for i in range(81):
+            m = self.cand[i]
+            if not self.placed[i] and m & (m - 1) == 0:
+                self._place(i, m)
+                used += 1
+        return used
+
+    def _hidden_single(self):
+        """
+        places the first digit that only one cell of a house can hold.
+        :return: 1 if a digit was placed, 0 if not.
+        """
+        cand, placed = self.cand, self.placed
+        for house in topology.HOUSE_INDEXES:
+            once = twice = 0
+            for i in house:
+                m = cand[i]
+                twice |= once & m
+                once |= m
+            hidden = once & ~twice
+            for i in house:
+                if not placed[i] and cand[i] & hidden:
+                    self._place(i, cand[i] & hidden & -(cand[i] & hidden))
+                    self.note = _house_name(house)
+                    return 1
+        return 0
+
+    def _prune_cages(self, numbers):
+        """
+        prunes the candidates by the combinations of the given cages.
+        :return: the number of cages that removed a candidate.
+        """
+        used = 0
+        for number in numbers:
+            if self.solver.prune_cage(self.cand, number):
+                used += 1
+        return used
+
+    def _cage_combination(self):
+        """
+        prunes the candidates by the combinations of the real cages.
+        """
+        return self._prune_cages(range(self.solver.num_real_cages))
+
+    def _innie_outie(self):
+        """
+        prunes the candidates by the combinations of the 45 rule's virtual cages.
+        """
+        return self._prune_cages(range(self.solver.num_real_cages, len(self.solver.cages)))
+
+    def _remove(self, indexes, bits, keep=()):
+        """
+        removes the given digits from the candidates of the given cells, except the cells in keep.
+        :return: True if a candidate was removed.
+        """
+        cand = self.cand
+        removed = False
+        for i in indexes:
+            if i not in keep and not self.placed[i] and cand[i] & bits:
+                cand[i] &= ~bits
+                removed = True
+        return removed
+
+    def _locked_candidates(self):
+        """
+        removes the digits that are locked in a part of a house or in a cage from the rest of the other houses
+        that part is in.
+        :return: 1 if a candidate was removed, 0 if not.
+        """
+        cand, placed = self.cand, self.placed
+        lines = topology.ROW_INDEXES + topology.COL_INDEXES
+        for nonet in topology.NONET_INDEXES:
+            for line in lines:
+                inside = [i for i in nonet if i in line]
+                if not inside:
+                    continue
+                in_part = 0
+                for i in inside:
+                    if not placed[i]:
+                        in_part |= cand[i]
+                outside_nonet = 0
+                outside_line = 0
+                for i in nonet:
+                    if i not in inside:
+                        outside_nonet |= cand[i]
+                for i in line:
+                    if i not in inside:
+                        outside_line |= cand[i]
+                # a digit of the nonet only in this line, or a digit of the line only in this nonet
+                if self._remove(line, in_part & ~outside_nonet, inside):
+                    self.note = _house_name(nonet)
+                    return 1
+                if self._remove(nonet, in_part & ~outside_line, inside):
+                    self.note = _house_name(line)
+                    return 1
+        for number in range(self.solver.num_real_cages):
+            indexes, killer, combos = self.solver.cages[number]
+            open_cells = [i for i in indexes if not placed[i]]
+            if len(open_cells) < 2:
+                continue
+            available = 0
+            for i in indexes:
+                available |= cand[i]
+            must = cage_combinations.ALL_DIGITS
+            for combo in combos:
+                if combo & ~available == 0:
+                    must &= combo
+            placed_digits = 0
+            for i in indexes:
+                if placed[i]:
+                    placed_digits |= cand[i]
+            must &= ~placed_digits
+            if not must:
+                continue
+            for house in topology.HOUSE_INDEXES:
+                if all(i in house for i in open_cells) and self._remove(house, must, indexes):
+                    self.note = f"the cage of {_cell_name(indexes[0])}"
+                    return 1
+        return 0
+
+    def _groups(self):
+        """
+        returns the houses and the cages with more than 2 cells, as lists of the indexes of their open cells.
+        """
+        groups = list(topology.HOUSE_INDEXES) + [indexes for indexes, _, _ in
+                                                 self.solver.cages[:self.solver.num_real_cages] if len(indexes) > 2]
+        return [[i for i in group if not self.placed[i]] for group in groups]
+
+    def _naked_pair(self):
+        """
+        removes the digits of two cells with the same two candidates from the rest of their house or cage.
+        :return: 1 if a candidate was removed, 0 if not.
+        """
+        cand = self.cand
+        for group in self._groups():
+            seen = {}
+            for i in group:
+                if BIT_COUNT[cand[i]] == 2:
+                    other = seen.get(cand[i])
+                    if other is not None and self._remove(group, cand[i], (i, other)):
+                        self.note = f"{_cell_name(other)} and {_cell_name(i)}"
+                        return 1
+                    seen[cand[i]] = i
+        return 0
+
+    def _hidden_pair(self):
+        """
+        keeps only two digits in the only two cells of a house that can hold them.
+        :return: 1 if a candidate was removed, 0 if not.
+        """
+        cand = self.cand
+        for house in topology.HOUSE_INDEXES:
+            places = {}
+            for digit in range(9):
+                bit = 1 << digit
+                cells = tuple(i for i in house if cand[i] & bit and not self.placed[i])
+                if len(cells) == 2:
+                    places.setdefault(cells, []).append(bit)
+            for cells, bits in places.items():
+                if len(bits) == 2:
+                    pair = bits[0] | bits[1]
+                    if any(cand[i] & ~pair for i in cells):
+                        for i in cells:
+                            cand[i] &= pair
+                        self.note = _house_name(house)
+                        return 1
+        return 0
+
+
+    def _guess(self):
+        """
+        places the solution's digit in the open cell with the fewest candidates.
+        :return: 1.
+        """
+        best = min((i for i in range(81) if not self.placed[i]), key=lambda i: BIT_COUNT[self.cand[i]])
+        self._place(best, 1 << (self.solution[best] - 1))
+        return 1
+
+
+def _cell_name(index):
+    """
+    returns the name of a cell the way the player sees it, "r3c5" for row 3 and column 5.
+    """
+    return f"r{topology.ROW_OF[index] + 1}c{topology.COL_OF[index] + 1}"
+
+
+def _house_name(house):
+    """
+    returns the name of a house the way the player sees it, "row 3", "column 5" or "nonet 2".
+    """
+    number = topology.HOUSE_INDEXES.index(tuple(house))
+    kind = ('row', 'column', 'nonet')[number // 9]
+    return f"{kind} {number % 9 + 1}"
+
+
+def grade_corpus(seeds=range(1, 1001), levels=range(1, 11), path=GRADES_PATH):
+    """
+    grades the layouts of the menu's seeds at every level, writes a "seed level score hardest" line for each one
+    and prints the median and the range of the scores and the hardest techniques of each level.
+    """
+    grader = DifficultyGrader()
+    lines = ["# seed level score hardest-technique\n"]
+    for lvl in levels:
+        scores = []
+        times = []
+        hardest = {}
+        for seed in seeds:
+            grade = grader.grade_seed(seed, lvl)
+            scores.append(grade['score'])
+            times.append(grade['seconds'])
+            hardest[grade['hardest']] = hardest.get(grade['hardest'], 0) + 1
+            lines.append(f"{seed} {lvl} {grade['score']} {grade['hardest']}\n")
+        print(f"level {lvl}: score median {statistics.median(scores):.0f} ({min(scores)}-{max(scores)}), "
+              f"{statistics.mean(times) * 1000:.0f}ms each (max {max(times) * 1000:.0f}ms), hardest "
+              + ", ".join(f"{name} {count}" for name, count in sorted(hardest.items(), key=lambda item: -item[1])))
+    if path is not None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.writelines(lines)
+
+
+if __name__ == "__main__":
+    # python DifficultyGrader.py [first_seed last_seed]
+    seed_range = range(int(sys.argv[1]), int(sys.argv[2]) + 1) if len(sys.argv) > 2 else range(1, 1001)
+    grade_corpus(seed_range)
@@ -15,14 +15,16 @@ class EndGame:
             draw_winning_message - shows a winning message in case the player won.
             run - runs the program.
     """
-    def __init__(self, finish_time, user, log_id, score):
+    def __init__(self, finish_time, user, log_id, score, box_shape=(3, 3)):
         """
         initializes display.
+        :param box_shape: tuple of two integers, the box shape of the game that was won, the next game keeps it.
         """
         self.finish_time = finish_time
         self.user = user
         self.log_id = log_id
         self.score = score
+        self.box_shape = box_shape
         self.screen = pygame.display.set_mode((700, 500))
         pygame.display.set_caption("Killer Sudoku")
         icon = pygame.image.load(resource_path("icon.png"))
@@ -116,7 +118,7 @@ class EndGame:
                     if event.key == pygame.K_RETURN:
                         setup = GameSetup.GameSetup(self.user)
                         game_number, level, path = setup.run()
-                        game = Game.Game(game_number, level,path)
+                        game = Game.Game(game_number, level, path, box_shape=self.box_shape)
                         game.run()
 
             self.draw_winning_message()
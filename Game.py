@@ -1,12 +1,21 @@
+import math
 import Board
+import CompactBoard
+import DeadlineGenerator
 import pygame
 import sys
 import time
 import EndGame
+import HintEngine
+import MoveHistory
+import SmartCandidates
 import KillerSudoku
 import LogSheet
+import save_game
 from resource_path import resource_path
 
+AUTOSAVE_SECONDS = 5  # how often an unfinished game is saved
+
 class Game:
     """
         runs the game window.
@@ -21,24 +30,43 @@ class Game:
             draw_highlight - takes in the row and the col numbers of the selected cell and highlights it.
             handle_arrow_keys - takes in an arrow key and saves the selected cell.
             handle_key_input - activates an action based on the pressed key.
+            refresh_hints - sends the board's state to the hint engine and the smart candidates.
+            toggle_smart_candidates - turns smart candidates mode on and off.
+            give_hint - answers the hint key with the next logical step.
+            undo_move - undoes the last move, or redoes the last move that was undone.
             draw_grid - draws vertical and horizontal lines.
             draw_cages - draws the cages and their killer numbers.
             draw_timer - draws the timer.
             draw_title - draws the title.
             draw_level - draws the level (game number - difficulty).
-            draw_cell_options - draws cell options.
+            draw_hint - draws the explanation of the last hint.
+            draw_cell_options - draws cell options, the smart candidates if their mode is on.
             draw_cage_options - draws cage options.
+            draw_virtual_cage_options - draws the options of the 45 rule's virtual cages of the selected cell.
             draw_guesses_in_cell - draws guesses in the selected cell.
+            get_font - returns a font, each font is loaded once.
+            scaled - returns a size of the 9x9 grid scaled to the cells of this grid.
             draw_number - insert a number into a chosen cell.
             draw_pause - turns the screen into white and pauses the game.
             check_win_condition - checks if the player filled all the right numbers.
             calculate_points - calculates the score.
             save_log - sets the time, score and outcome and adds the game's log to the global log.
+            save_game - saves the unfinished game, so it is resumed the next time the user starts it.
+            autosave - saves the game every AUTOSAVE_SECONDS.
+            close - stops the hint engine's thread.
+            draw_board - draws one frame of the board.
             run - runs the program.
     """
-    def __init__(self, seed, lvl, user):
+    def __init__(self, seed, lvl, user, compact=False, box_shape=(3, 3), generator=None):
         """
         initializes display.
+        if the user has a saved game of the same game number and difficulty, it is resumed.
+        :param compact: boolean, if True the board is kept as a CompactBoard, that uses much less memory.
+        :param box_shape: tuple of two integers, the rows and the columns of a box, (4, 4) plays on a 16x16 grid
+                          (see topology.BOX_SHAPES). the hints, the smart candidates, the saves and the compact board
+                          are only used on the 9x9 grid.
+        :param generator: DeadlineGenerator that serves a new 9x9 puzzle within its deadline, None for the default
+                          deadline and fallbacks. if it serves another game number instead, that game is played.
         """
         pygame.init()
         self.screen = pygame.display.set_mode((630, 740))
@@ -49,19 +77,44 @@ class Game:
         self.top_grid = (0, 0, self.screen.get_width(), 40)  # start weight, start height, end weight, end height
         self.sudoku_grid = (0, 40, 630, 670)
         self.bottom_grid = (0, 630, self.screen.get_width(), self.screen.get_height())
-        self.cell_size = self.sudoku_grid[2] // 9
-        self.grid_size = 9
+        self.box_shape = tuple(box_shape)
+        self.grid_size = box_shape[0] * box_shape[1]
+        self.cell_size = self.sudoku_grid[2] // self.grid_size
+        self.nine = self.grid_size == 9  # the 9x9 grid, the only one the solvers and the saves know
+        self.fonts = {}  # the fonts by their name and size, loading a font for every cell in every frame is slow
         # modes
         self.guess_mode = False
         self.paused = False
         self.cell_options_mode = True
         self.cage_options_mode = True
+        self.smart_candidates_mode = False
         self.mistakes_found = []
 
         self.seed = seed  # game number
+        self.requested_seed = seed  # the game number the player asked for, the save of a substitute keeps it
         self.lvl = lvl  # difficulty
 
-        self.board = Board.Board(seed, self.lvl)
+        self.save_path = save_game.save_path(user) if self.nine else None
+        saved = save_game.read(self.save_path) if self.nine else None
+        if saved is not None and (str(seed) not in (str(saved['seed']), str(saved['requested']))
+                                  or saved['lvl'] != int(lvl)):
+            saved = None  # the save is of another game
+        if saved is not None:
+            self.board = save_game.restore(saved, compact)
+            if saved['seed'] != saved['requested']:  # a substitute, the requested game took too long to generate
+                seed = saved['seed']
+        elif not self.nine:
+            self.board = Board.Board(seed, self.lvl, box_shape=self.box_shape)
+        else:
+            generator = generator or DeadlineGenerator.DeadlineGenerator()
+            generated = generator.get(seed, self.lvl)
+            layout = generated.layout
+            if compact:
+                self.board = CompactBoard.CompactBoard(layout.seed, self.lvl, layout=layout)
+            else:
+                self.board = Board.Board(layout.seed, self.lvl, layout=layout)
+            if generated.is_substitute():
+                seed = layout.seed  # the game that is played, self.seed is changed once the player is told
         self.grid_values = self.board.get_board()
         self.solution = self.board.get_solution()._get_board()
 
@@ -69,8 +122,22 @@ class Game:
         self.selected_cell_options = self.board.get_cell(self.selected_cell).get_options()
         self.selected_cell_guesses = self.board.get_cell(self.selected_cell).get_guesses()
         self.selected_cage_options = self.board.get_cell(self.selected_cell).get_cage_options()
+        # the hints are computed on a background thread, from snapshots of the board
+        self.hint_engine = None
+        if self.nine:
+            self.hint_engine = HintEngine.HintEngine(self.board.get_layout())
+            self.hint_engine.update(self.board.snapshot())
+        self.hint_message = ''
+        self.hint_time = 0  # the time the last hint was given
+        if self.seed != seed:  # a substitute, the game number the player asked for took too long to generate
+            self.hint_message = f"game {self.seed} took too long to generate, this is game {seed}"
+            self.hint_time = time.time()
+            self.seed = seed
+        self.smart_candidates = None  # the stronger candidates, kept only while smart candidates mode is on
+        self.history = MoveHistory.MoveHistory()  # the moves that can be undone and redone
 
         self.last_start_time = time.time()
+        self.last_save_time = time.time()
         self.last_pause_time = 0
         self.paused_total_time = 0
         self.total_time = 0
@@ -88,6 +155,9 @@ class Game:
             'Score': 0,
             'Outcome': 'loss'
         }
+        if saved is not None:  # continue the saved game's counters and timer
+            self.log.update(saved['log'])
+            self.last_start_time -= saved['elapsed']
 
     def get_ms(self, start):
         """
@@ -203,22 +273,26 @@ class Game:
                     key_val = int(key_name[1])
                 else:
                     key_val = int(key_name)
+                if pygame.key.get_mods() & pygame.KMOD_SHIFT:  # on the larger grids, shift and 1 to 7 are 10 to 16
+                    key_val += 9
+                if key_val > self.grid_size:
+                    return
                 # if guess mode is active, insert value as a guess
                 if self.guess_mode:
-                    self.board.set_cells_guess(self.selected_cell, key_val)
+                    with self.history.record(self.board, [self.selected_cell]):
+                        self.board.set_cells_guess(self.selected_cell, key_val)
                 # if guess mode isn't active, insert value as player's value
                 else:
                     self.log["Moves"] = self.log["Moves"] + 1
-                    self.board.set_cells_value(self.selected_cell, key_val)
+                    with self.history.record(self.board, [self.selected_cell]):
+                        self.board.set_cells_value(self.selected_cell, key_val)
                     if self.selected_cell in self.mistakes_found:
                         self.mistakes_found.remove(self.selected_cell)  # removes the cell from the mistake found list
                     self.grid_values = self.board.get_board()  # updates the cell's options
-            # if the player pressed 'h' (for hint), set the cell's value for its true value
-            elif key == pygame.K_h and self.selected_cell not in self.board.known_cells:
-                self.log["Moves"] = self.log["Moves"] + 1
-                self.log["Hints"] = self.log["Hints"] + 1
-                self.board.set_cells_value(self.selected_cell, -1)
-                self.grid_values = self.board.get_board()
+                    self.refresh_hints()
+            # if the player pressed 'h' (for hint), show the next logical step
+            elif key == pygame.K_h:
+                self.give_hint()
             # if the player pressed 'f' (for find mistakes), highlight the cells with mistakes
             elif key == pygame.K_f:
                 self.mistakes_found = self.board.find_mistakes()
@@ -227,10 +301,13 @@ class Game:
             # deletes the number in the selected cell using backspace
             elif key == pygame.K_BACKSPACE and self.selected_cell not in self.board.known_cells:
                 if self.guess_mode:  # if in guess mode, deletes the last guess that was added
-                    self.board.get_cell(self.selected_cell).delete_guess()
+                    with self.history.record(self.board, [self.selected_cell]):
+                        self.board.delete_cells_guess(self.selected_cell)
                 else:
-                    self.board.set_cells_value(self.selected_cell, 0)
+                    with self.history.record(self.board, [self.selected_cell]):
+                        self.board.set_cells_value(self.selected_cell, 0)
                     self.grid_values = self.board.get_board()  # updates the cell's options
+                    self.refresh_hints()
                 if self.selected_cell in self.mistakes_found:
                     self.mistakes_found.remove(self.selected_cell)  # removes the cell from the mistake found list
             # if the player press an arrow, move the selected cell
@@ -240,11 +317,20 @@ class Game:
             elif key == pygame.K_p:  # pauses the game
                 self.paused = not self.paused
             elif key == pygame.K_r:  # resets the board
-                self.board.reset_board()
+                with self.history.record(self.board):
+                    self.board.reset_board()
+                self.grid_values = self.board.get_board()
+                self.refresh_hints()
+            elif key == pygame.K_z:  # undoes the last move
+                self.undo_move(redo=False)
+            elif key == pygame.K_y:  # redoes the last move that was undone
+                self.undo_move(redo=True)
             # elif key == pygame.K_c:  # cell options mode
             #     self.cell_options_mode = not self.cell_options_mode
             elif key == pygame.K_c:  # cage options mode
                 self.cage_options_mode = not self.cage_options_mode
+            elif key == pygame.K_v:  # smart candidates mode
+                self.toggle_smart_candidates()
             elif key in (pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT,
                          pygame.K_w, pygame.K_d, pygame.K_s, pygame.K_a):
                 self.handle_arrow_keys(key)
@@ -253,6 +339,74 @@ class Game:
                 self.paused = not self.paused
 
 
+    def refresh_hints(self):
+        """
+        sends the board's state to the hint engine, it computes new steps in the background only if it has to,
+        and to the smart candidates if their mode is on.
+        """
+        if self.hint_engine is None:
+            return
+        snapshot = self.board.snapshot()
+        self.hint_engine.update(snapshot)
+        if self.smart_candidates is not None:
+            self.smart_candidates.update(snapshot.get_values())
+
+    def toggle_smart_candidates(self):
+        """
+        turns smart candidates mode on and off. the smart candidates are created from the board when it turns on,
+        and dropped when it turns off. they are only computed on the 9x9 grid.
+        """
+        if not self.nine:
+            return
+        self.smart_candidates_mode = not self.smart_candidates_mode
+        if self.smart_candidates_mode:
+            self.smart_candidates = SmartCandidates.SmartCandidates(self.board.get_layout())
+            self.smart_candidates.update(self.board.snapshot().get_values())
+        else:
+            self.smart_candidates = None
+
+    def give_hint(self):
+        """
+        answers the hint key with the next logical step: a digit is placed in its cell, a wrong value is selected,
+        or the digits a step rules out are explained. if the steps aren't ready yet, the selected cell's true value
+        is revealed, the way hints always worked.
+        """
+        step = self.hint_engine.get_hint(self.board.snapshot()) if self.hint_engine is not None else None
+        if step is None:
+            if self.selected_cell in self.board.known_cells:
+                return
+            place, val, self.hint_message = self.selected_cell, -1, 'the selected cell was revealed'
+        else:
+            place = step.cells[0]
+            val = step.digits[0] if step.kind == 'place' else None
+            self.hint_message = step.reason
+            self.selected_cell = place
+        self.log["Hints"] = self.log["Hints"] + 1
+        self.hint_time = time.time()
+        if val is not None:
+            self.log["Moves"] = self.log["Moves"] + 1
+            with self.history.record(self.board, [place]):
+                self.board.set_cells_value(place, val)
+            self.grid_values = self.board.get_board()
+            self.refresh_hints()
+
+    def undo_move(self, redo=False):
+        """
+        undoes the last move (a value, a guess, a hint or a reset), or redoes the last move that was undone.
+        only the cells the move changed and their peers are updated.
+        :param redo: boolean, True to redo instead of undo.
+        """
+        if redo:
+            places = self.history.redo(self.board)
+        else:
+            places = self.history.undo(self.board)
+        if not places:
+            return
+        self.selected_cell = places[-1]
+        self.mistakes_found = [place for place in self.mistakes_found if place not in places]
+        self.grid_values = self.board.get_board()
+        self.refresh_hints()
+
     def draw_grid(self):
         """
         draws vertical and horizontal lines.
@@ -260,9 +414,10 @@ class Game:
 
         grid_height_start, grid_width_end, grid_height_end = self.sudoku_grid[1], self.sudoku_grid[2], self.sudoku_grid[3]
         grid_height_end = self.sudoku_grid[3]
+        box_rows, box_cols = self.box_shape
         for i in range(self.grid_size + 1):
             # draws vertical lines
-            if i == 0 or i % 3 == 0:
+            if i == 0 or i % box_cols == 0:
                 pygame.draw.line(self.screen, (0, 0, 0), (i * self.cell_size, grid_height_start),
                                  (i * self.cell_size, grid_height_end),
                                  4)
@@ -271,7 +426,7 @@ class Game:
                                  (i * self.cell_size, grid_height_end), 2)
 
             # draws horizontal lines
-            if i == 0 or i % 3 == 0:
+            if i == 0 or i % box_rows == 0:
                 pygame.draw.line(self.screen, (0, 0, 0), (0, i * self.cell_size + grid_height_start),
                                  (grid_width_end, i * self.cell_size + grid_height_start),
                                  4)
@@ -285,9 +440,9 @@ class Game:
         """
         draws the cages and their killer numbers
         """
-        text_font = pygame.font.SysFont("Gisha", 14)
+        text_font = self.get_font("Gisha", self.scaled(14))
         grid_height_start = self.sudoku_grid[1]
-        for cage in self.board.all_houses.reverse_cages.keys():
+        for cage in self.board.get_cages():
             if cage.size == 1:
                 pass
             else:
@@ -320,6 +475,17 @@ class Game:
         timer_rect = timer_text.get_rect(topleft=(x, y))
         self.screen.blit(timer_text, timer_rect)
 
+    def draw_hint(self, seconds=6):
+        """
+        draws the explanation of the last hint at the bottom of the screen, for a few seconds.
+        """
+        if not self.hint_message or time.time() - self.hint_time > seconds:
+            return
+        text_font = pygame.font.SysFont("Gisha", 15)
+        text_render = text_font.render(self.hint_message, True, (30, 90, 200))
+        text_rect = text_render.get_rect(center=(self.screen.get_width() // 2, self.screen.get_height() - 12))
+        self.screen.blit(text_render, text_rect)
+
     def draw_title(self):
         """
         draws the title.
@@ -349,9 +515,12 @@ class Game:
 
     def draw_cell_options(self):
         """
-        draws cell options
+        draws cell options, the smart candidates if their mode is on.
         """
         self.selected_cell_options = self.board.get_cell(self.selected_cell).get_options()
+        if self.smart_candidates is not None:
+            smart_options = self.smart_candidates.get_options(self.selected_cell)
+            self.selected_cell_options = [opt for opt in self.selected_cell_options if opt in smart_options]
         x = self.screen.get_width() // 2
         y = self.screen.get_height() - 85
         text_font = pygame.font.SysFont("Gisha", 18)
@@ -405,6 +574,24 @@ class Game:
             text_render = text_font.render(f"{temp_row[:-2]}", True, (0, 0, 0))
             text_rect = text_render.get_rect(center=(x, y))
             self.screen.blit(text_render, text_rect)
+            self.draw_virtual_cage_options(x, y + 20, text_font)
+
+    def draw_virtual_cage_options(self, x, y, text_font, max_lines=2):
+        """
+        draws the options of the virtual cages of the 45 rule the selected cell is in, one line each,
+        the ones with the fewest options first.
+        """
+        virtual_cages = self.board.get_cell(self.selected_cell).get_virtual_cages()
+        virtual_options = sorted(((cage.get_options(), cage) for cage in virtual_cages),
+                                 key=lambda item: len(item[0]))
+        for options, cage in virtual_options[:max_lines]:
+            if y > self.screen.get_height() - 10:  # no room left under the cage options
+                break
+            shown = ', '.join(str(opt) for opt in options[:4]) + (', ...' if len(options) > 4 else '')
+            text_render = text_font.render(f"45 rule, {cage.size} cells = {cage.killer}: {shown}", True, (90, 90, 90))
+            text_rect = text_render.get_rect(center=(x, y))
+            self.screen.blit(text_render, text_rect)
+            y += 20
 
     def draw_guesses_in_cell(self, place):
         """
@@ -412,28 +599,45 @@ class Game:
         """
         cell_guesses = self.board.get_cell(place).get_guesses()
         cell_size = self.screen.get_width() // self.grid_size
-        text_font = pygame.font.SysFont("Gisha", 12)
+        text_font = self.get_font("Gisha", self.scaled(12))
+        line = self.scaled(15)  # the height of a line of guesses
 
-        row1, row2, row3 = ['  ', '  ', '  '], ['  ', '  ', '  '], ['  ', '  ', '  ']
-        rows = [row1, row2, row3]
+        per_row = math.isqrt(self.grid_size - 1) + 1  # 3 guesses in a line on the 9x9 grid, 4 on the 16x16 grid
+        rows = [['  '] * per_row for _ in range(-(-self.grid_size // per_row))]
         for i, num in enumerate(cell_guesses):
-            if num <= 3:
-                row1[num-1] = num
-            elif num <= 6:
-                row2[num-4] = num
-            else:
-                row3[num - 7] = num
+            rows[(num - 1) // per_row][(num - 1) % per_row] = num
 
         for j, row in enumerate(rows):
-            curr_row = f'{row[0]}   {row[1]}   {row[2]}'
+            curr_row = '   '.join(str(num) for num in row)
             # curr_row = str(row).replace(', ', "   ")
 
             # x and y are the coordinates of the center of the cell
-            x, y = place[1] * cell_size + cell_size // 2, place[0] * cell_size + cell_size//2 + 15 + 15*(j+1)
+            x, y = place[1] * cell_size + cell_size // 2, place[0] * cell_size + cell_size//2 + line + line*(j+1)
             text_render = text_font.render(curr_row, True, (0, 0, 0))
             text_rect = text_render.get_rect(center=(x, y))
             self.screen.blit(text_render, text_rect)
 
+    def get_font(self, name, size):
+        """
+        returns a font, each font is loaded once.
+        :param name: the name of a system font, or the path of a font file.
+        :param size: int, the size of the font.
+        """
+        font = self.fonts.get((name, size))
+        if font is None:
+            if name.endswith(".ttf"):
+                font = pygame.font.Font(name, size)
+            else:
+                font = pygame.font.SysFont(name, size)
+            self.fonts[(name, size)] = font
+        return font
+
+    def scaled(self, size):
+        """
+        returns a size of the 9x9 grid (of a font or a line) scaled to the cells of this grid.
+        """
+        return max(size * self.cell_size // 70, 8)
+
     def draw_number(self, number, place):
         """
         insert a number into a chosen cell
@@ -454,7 +658,7 @@ class Game:
 
         if place == killer_cell and cage_size > 1:
             # text_font = pygame.font.SysFont(resource_path("GrinchedRegular.ttf"), 14)
-            text_font = pygame.font.SysFont("Gisha", 14)
+            text_font = self.get_font("Gisha", self.scaled(14))
             text = text_font.render(str(killer), True, (0, 0, 0))
             text_rect = text.get_rect(topleft=(x + 7, y + 5 + grid_height_start))
             self.screen.blit(text, text_rect)
@@ -464,7 +668,7 @@ class Game:
         y = place[0] * self.cell_size + self.cell_size // 2 + grid_height_start
 
         # text_font = pygame.font.SysFont("couriernew", 32)
-        text_font = pygame.font.Font(resource_path("GrinchedRegular.ttf"),32)
+        text_font = self.get_font(resource_path("GrinchedRegular.ttf"), self.scaled(32))
         # text_font = pygame.font.SysFont("Gisha",32)
         text = text_font.render(str(number), True, (0, 0, 0))
         text_rect = text.get_rect(center=(x, y))
@@ -483,10 +687,12 @@ class Game:
 
     def check_win_condition(self):
         """
-        checks if the player filled all the right numbers
+        checks if the player filled all the right numbers, the board counts its correct cells as they change.
+        a filling that isn't the puzzle's solution wins too if it fills every house and cage correctly, a puzzle
+        may have more than one solution.
         :return: Boolean.
         """
-        return self.grid_values == self.solution
+        return self.board.is_solved() or self.board.is_filled_correctly()
 
     def calculate_points(self):
         """
@@ -540,7 +746,63 @@ class Game:
 
         return logsheet.insert_row(self.log)
 
+    def save_game(self):
+        """
+        saves the unfinished game, so it is resumed the next time the user starts it. only 9x9 games are saved.
+        """
+        if self.save_path is None:
+            return
+        save_game.write(self.save_path, save_game.encode(self.board, self.log, self.total_time, self.requested_seed))
+        self.last_save_time = time.time()
+
+    def autosave(self):
+        """
+        saves the game every AUTOSAVE_SECONDS, a save takes well under a millisecond.
+        """
+        if time.time() - self.last_save_time >= AUTOSAVE_SECONDS:
+            self.save_game()
+
+    def close(self):
+        """
+        stops the hint engine's thread, when the game hands the window back to the menu or to the end window.
+        otherwise every game of a session would leave a thread waiting for updates that never come.
+        """
+        if self.hint_engine is not None:
+            self.hint_engine.close()
+            self.hint_engine = None
+
+
+
+    def draw_board(self):
+        """
+        draws one frame of the board: the grid, the cages, the options, the hint, the title, the level, the numbers,
+        the guesses and the selected cell.
+        """
+        self.draw_grid()
+        self.draw_cages()
+        if self.cage_options_mode:
+            self.draw_cage_options()
+        if self.smart_candidates is not None:
+            self.smart_candidates.step()  # finishes the propagation the last keystroke left, within the budget
+            self.draw_cell_options()
+        self.highlight_mistakes((255, 0, 0))
+        self.draw_hint()
+        self.draw_title()
+        self.draw_level()
+
+        # updates all cells
+        for row in range(self.grid_size):
+            for col in range(self.grid_size):
+                place = (row, col)
+                number = self.board.get_cell_value(place)
+                if self.board.get_cell(place).cage.size == 1:
+                    number = self.board.get_cell(place).true_value
+                self.draw_guesses_in_cell(place)
+                if number != 0:
+                    self.draw_number(number, place)
 
+        # highlights the selected cell
+        self.draw_highlight(self.selected_cell)
 
     def run(self):
         """
@@ -548,9 +810,10 @@ class Game:
         """
         while True:
             for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.save_log()
-                    KillerSudoku.main(self.user)
+                if event.type == pygame.QUIT:  # the game isn't over, it's saved to be resumed
+                    self.save_game()
+                    self.close()
+                    KillerSudoku.main(self.user, box_shape=self.box_shape)
                     pygame.quit()
                     sys.exit()
                 elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and not self.paused:
@@ -572,34 +835,60 @@ class Game:
                 # save the total time of the game minus the time it was paused for
                 self.total_time = time.time() - self.last_start_time - self.paused_total_time
                 self.draw_timer(self.get_ms(self.total_time))
+                self.autosave()
 
-            self.draw_grid()
-            self.draw_cages()
-            if self.cage_options_mode:
-                self.draw_cage_options()
-            self.highlight_mistakes((255, 0, 0))
-            self.draw_title()
-            self.draw_level()
-
-            # updates all cells
-            for row in range(9):
-                for col in range(9):
-                    place = (row, col)
-                    number = self.board.get_cell_value(place)
-                    if self.board.get_cell(place).cage.size == 1:
-                        number = self.board.get_cell(place).true_value
-                    self.draw_guesses_in_cell(place)
-                    if number != 0:
-                        self.draw_number(number, place)
-
-            # highlights the selected cell
-            self.draw_highlight(self.selected_cell)
+            self.draw_board()
 
             if self.check_win_condition():
+                if self.save_path is not None:
+                    save_game.delete(self.save_path)
                 log_id = self.save_log(win=True)
-                end_window = EndGame.EndGame(self.log['Time'], self.user, log_id, self.log['Score'])
+                self.close()
+                end_window = EndGame.EndGame(self.log['Time'], self.user, log_id, self.log['Score'],
+                                             box_shape=self.box_shape)
                 end_window.run()
                 pygame.quit()
                 sys.exit()
             else:
                 pygame.display.flip()
+
+
+def benchmark_frames(box_shapes=((3, 3), (4, 4)), seeds=range(1, 6), lvl=6, frames=20, frame_budget=1 / 30):
+    """
+    measures how long one frame of run takes to draw on every grid size: the screen is cleared, the timer and the
+    board are drawn and the display is flipped. the window is created on SDL's dummy video driver, so it runs
+    without a display. half of the empty cells are filled and the others get guesses, like a game in progress.
+    :param frame_budget: the most seconds drawing a frame may take, 1/30 keeps the game at 30 frames a second.
+    """
+    import gc
+    import os
+    import statistics
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    for box_shape in box_shapes:
+        size = box_shape[0] * box_shape[1]
+        frame_times = []
+        for seed in seeds:
+            game = Game(seed, lvl, "benchmark", box_shape=box_shape)
+            for place in game.board.shape.places:
+                if game.board.get_cell_value(place) == 0:
+                    if sum(place) % 2:
+                        game.board.set_cells_value(place)
+                    else:
+                        for val in range(1, size + 1, 3):
+                            game.board.set_cells_guess(place, val)
+            gc.collect()  # the boards of the seeds before are garbage a game doesn't make, don't time their collection
+            for _ in range(frames):
+                start = time.perf_counter()
+                game.screen.fill((255, 255, 255))
+                game.draw_timer(game.get_ms(game.total_time))
+                game.draw_board()
+                pygame.display.flip()
+                frame_times.append(time.perf_counter() - start)
+            game.close()
+        print(f"{size}x{size}: a frame is drawn in {statistics.median(frame_times) * 1000:.1f}ms median, "
+              f"{max(frame_times) * 1000:.1f}ms at most (budget {frame_budget * 1000:.0f}ms)")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    benchmark_frames()
@@ -0,0 +1,246 @@
+import threading
+import time
+import cage_combinations
+import DifficultyGrader
+import topology
+
+REBASE_AFTER = 10  # the correct values the player adds before the steps are computed again from the new values
+
+
+class HintStep:
+    """
+        one logical step of a hint.
+
+        kind is one of:
+            'place' - the digit goes in the cell.
+            'eliminate' - the digits can't be in the cells.
+            'mistake' - the player's value in the cell is wrong.
+    """
+    __slots__ = ('kind', 'technique', 'cells', 'digits', 'reason')
+
+    def __init__(self, kind, technique, cells, digits, reason):
+        self.kind = kind
+        self.technique = technique  # the name of the technique (see DifficultyGrader.TECHNIQUES), or 'mistake'
+        self.cells = cells  # tuple of the cells' places
+        self.digits = digits  # tuple of the digits
+        self.reason = reason  # a sentence that explains the step to the player
+
+    def __repr__(self):
+        return f"HintStep({self.kind}, {self.technique}, {self.reason!r})"
+
+
+class HintEngine:
+    """
+        answers hints with the next logical step, from a list of steps computed ahead on a background thread.
+
+        the game sends a snapshot of the board after every change (update). the steps were computed from the
+        player's correct values at some moment, and they stay true as long as the player only adds correct values,
+        so those changes only skip the steps that are done (after REBASE_AFTER new values the thread computes
+        the steps again in the background, and the old ones answer until the new ones are ready). when the player
+        erases or changes a value the steps were computed from, the list is dropped and the thread computes a new
+        one from the latest snapshot. a wrong value doesn't need new steps: the hint points at it first.
+
+        Methods:
+            __init__ - initializes an engine and starts its thread.
+            update - tells the engine the player's values changed.
+            get_hint - returns the next step for the given snapshot, at once.
+            wait - waits until the steps of the latest update are ready.
+            close - stops the thread.
+    """
+
+    def __init__(self, layout):
+        """
+        initializes an engine and starts its thread.
+        :param layout: PuzzleLayout, the puzzle of the board.
+        """
+        self.layout = layout
+        self.grader = DifficultyGrader.DifficultyGrader()
+        self.recomputes = 0  # how many times the steps were computed
+        self.last_compute_seconds = 0
+        self._condition = threading.Condition()
+        self._pending = None  # the values the thread should compute the steps from next
+        self._steps = ()  # the precomputed steps
+        self._base = None  # the values the steps were computed from
+        self._shown = set()  # the numbers of the eliminate steps that were already shown
+        self._closed = False
+        self._thread = threading.Thread(target=self._work, daemon=True)
+        self._thread.start()
+
+    def update(self, snapshot):
+        """
+        tells the engine the player's values changed.
+        the steps are only computed again if the player erased or changed a value they were computed from,
+        or added REBASE_AFTER correct values since.
+        :param snapshot: BoardSnapshot of the board.
+        """
+        values = self._correct_values(snapshot.get_values())
+        with self._condition:
+            if self._base is not None and self._follows(values, self._base):
+                added = sum(1 for new, old in zip(values, self._base) if new and not old)
+                if added < REBASE_AFTER or self._pending is not None:
+                    return
+            self._pending = values
+            self._condition.notify_all()
+
+    def get_hint(self, snapshot):
+        """
+        returns the next step for the given snapshot, at once.
+        :param snapshot: BoardSnapshot of the board.
+        :return: HintStep, or None if the steps for the player's values aren't ready yet.
+        """
+        values = snapshot.get_values()
+        solution = self.layout.solution
+        for index, val in enumerate(values):
+            if val and val != solution[index]:
+                place = topology.PLACES[index]
+                return HintStep('mistake', 'mistake', (place,), (val,),
+                                f"{_cell_name(index)} can't be {val}, it breaks the solution")
+        with self._condition:
+            steps, base = self._steps, self._base
+            if base is None or not self._follows(values, base):
+                return None
+            for number, step in enumerate(steps):
+                if step.kind == 'place':
+                    if values[topology.index_of(step.cells[0])]:
+                        continue  # the player already filled the cell
+                    return step
+                if number not in self._shown:
+                    self._shown.add(number)
+                    return step
+        return None
+
+    def wait(self, timeout=None):
+        """
+        waits until the steps of the latest update are ready.
+        :return: boolean, False if the timeout passed first.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._pending is None and self._base is not None, timeout)
+
+    def close(self):
+        """
+        stops the thread.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def _correct_values(self, values):
+        """
+        returns the values without the wrong ones.
+        """
+        solution = self.layout.solution
+        return tuple(val if val == solution[index] else 0 for index, val in enumerate(values))
+
+    @staticmethod
+    def _follows(values, base):
+        """
+        returns True if every value the steps were computed from is still in the given values.
+        """
+        return all(not old or new == old for new, old in zip(values, base))
+
+    def _work(self):
+        """
+        the loop of the thread: computes the steps of the latest values it was given.
+        """
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending is not None or self._closed)
+                if self._closed:
+                    return
+                values = self._pending
+            start = time.perf_counter()
+            steps = tuple(_hint_steps(self.grader.steps(self.layout, values)))
+            with self._condition:
+                self.last_compute_seconds = time.perf_counter() - start
+                self.recomputes += 1
+                if self._pending == values:  # newer values wait for the next round
+                    self._pending = None
+                    self._steps = steps
+                    self._base = values
+                    self._shown = set()
+                self._condition.notify_all()
+
+
+def _cell_name(index):
+    """
+    returns the name of a cell the way the player sees it, "r3c5" for row 3 and column 5.
+    """
+    return f"r{topology.ROW_OF[index] + 1}c{topology.COL_OF[index] + 1}"
+
+
+def _hint_steps(grader_steps):
+    """
+    turns the steps of DifficultyGrader.steps into hint steps: one for every placed digit, and one for the digits
+    every other step removed.
+    """
+    for technique, placed, removed, note in grader_steps:
+        for index, digit in placed:
+            place = topology.PLACES[index]
+            cell = _cell_name(index)
+            if technique == 'naked_single':
+                reason = f"{cell} can only be {digit}, its houses and its cage rule out every other digit"
+            elif technique == 'hidden_single':
+                reason = f"{digit} can only go in {cell} in {note}"
+            else:
+                reason = f"no logical step is left, so guess: {cell} is {digit}"
+            yield HintStep('place', technique, (place,), (digit,), reason)
+        if removed:
+            cells = tuple(topology.PLACES[index] for index, _ in removed)
+            mask = 0
+            for _, bits in removed:
+                mask |= bits
+            digits = cage_combinations.mask_to_digits(mask)
+            digits_text = ', '.join(str(digit) for digit in digits)
+            cells_text = ', '.join(_cell_name(index) for index, _ in removed)
+            if technique == 'cage_combination':
+                reason = f"no combination of their cages puts {digits_text} in {cells_text}"
+            elif technique == 'innie_outie':
+                reason = f"by the 45 rule, {digits_text} can't be in {cells_text}"
+            elif technique == 'locked_candidates':
+                reason = f"{note} must keep {digits_text} in the cells it shares with another house, " \
+                         f"so they can't be in {cells_text}"
+            elif technique == 'naked_pair':
+                reason = f"{note} hold a pair of {digits_text}, so those digits can't be in {cells_text}"
+            else:
+                reason = f"two digits can only go in two cells of {note}, so {digits_text} can't be in {cells_text}"
+            yield HintStep('eliminate', technique, cells, digits, reason)
+
+
+def benchmark(seeds=range(1, 6), levels=(3, 6, 9), moves=30):
+    """
+    plays the hints on boards, sometimes erasing a value, measures how long the thread takes to compute the steps
+    and how long get_hint takes, and checks every placed digit is the solution's.
+    """
+    import random
+    import Board
+    for lvl in levels:
+        compute, answer, recomputes = [], [], 0
+        for seed in seeds:
+            board = Board.Board(seed, lvl)
+            engine = HintEngine(board.get_layout())
+            engine.update(board.snapshot())
+            rng = random.Random(seed)
+            for move in range(moves):
+                engine.wait()
+                compute.append(engine.last_compute_seconds)
+                start = time.perf_counter()
+                step = engine.get_hint(board.snapshot())
+                answer.append(time.perf_counter() - start)
+                if move % 5 == 4:  # sometimes the player erases a value, and the steps are computed again
+                    filled = [place for place in topology.PLACES
+                              if board.get_cell_value(place) and place not in board.known_cells]
+                    if filled:
+                        board.set_cells_value(rng.choice(filled), 0)
+                elif step is not None and step.kind == 'place':
+                    assert step.digits[0] == board.get_cell(step.cells[0]).true_value, (seed, lvl, step)
+                    board.set_cells_value(step.cells[0], step.digits[0])
+                engine.update(board.snapshot())
+            recomputes += engine.recomputes
+            engine.close()
+        print(f"level {lvl}: steps computed {recomputes} times in {sum(compute) / len(compute) * 1000:.1f}ms on "
+              f"average, get_hint {max(answer) * 1e6:.0f}us at most")
+
+
+if __name__ == "__main__":
+    benchmark()
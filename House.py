@@ -9,24 +9,45 @@ class House:
                             the first one is the row and the second one if the column of the selected cell.
                             all the house's cells places.
             get_all_values - returns a list of integers between 1 and 9, that are the house's cell values.
+            values_mask - returns a mask of the digits in the house, bit (d - 1) stands for digit d.
+            count - returns how many cells in the house have the given digit.
+            contains - returns True if the given digit is in the house.
     """
-    def __init__(self):
+    def __init__(self, size=9, max_digit=9):
         """
         initializes a house
+        :param size: the number of cells in the house.
+        :param max_digit: the largest digit of the grid, the size of the grid.
         """
         # a dictionary of the house's cells.
-        # the keys are the cells' places, and the values are the cells' values.
+        # the keys are the cells' places, and the values are the cells' slots in the values array.
         self.cells_dictionary = {}
-        self.cells_indexes = list(self.cells_dictionary.keys())  # a list of all the house's cells places
-        self.values = list(self.cells_dictionary.values())  # a list of all the house's cells values
+        self.cells_indexes = []  # a list of all the house's cells places, in the order of their slots
+        self.values = [0] * size  # a fixed array of the house's cells values, empty slots are 0
+        self.counts = [0] * (max_digit + 1)  # counts[d] is the number of cells with the digit d
+        self.mask = 0  # a mask of the digits in the house
 
     def update_cell(self, place, value):
         """
         updates a cell value in the selected house and the house itself.
         """
-        self.cells_dictionary[place] = value
-        self.cells_indexes = list(self.cells_dictionary.keys())
-        self.values = list(self.cells_dictionary.values())
+        slot = self.cells_dictionary.get(place)
+        if slot is None:  # the first time the cell is updated, give it the next free slot
+            slot = len(self.cells_indexes)
+            self.cells_dictionary[place] = slot
+            self.cells_indexes.append(place)
+        old_value = self.values[slot]
+        if old_value == value:
+            return
+        counts = self.counts
+        if old_value:
+            counts[old_value] -= 1
+            if counts[old_value] == 0:
+                self.mask &= ~(1 << (old_value - 1))
+        if value:
+            counts[value] += 1
+            self.mask |= 1 << (value - 1)
+        self.values[slot] = value
 
     def get_all_cells(self):
         """
@@ -39,7 +60,26 @@ class House:
     def get_all_values(self):
         """
         returns a list of integers between 1 and 9, that are the house's cell values.
+        empty cells and unused slots are 0.
         """
         return self.values
 
+    def values_mask(self):
+        """
+        returns a mask of the digits in the house, bit (d - 1) stands for digit d.
+        """
+        return self.mask
+
+    def count(self, digit):
+        """
+        returns how many cells in the house have the given digit.
+        """
+        return self.counts[digit]
+
+    def contains(self, digit):
+        """
+        returns True if the given digit is in the house.
+        """
+        return self.counts[digit] > 0
+
 
@@ -1,8 +1,58 @@
 import Row, Nonet, Cage
+import cage_combinations
 import BoardSolutionCreator
+import bisect
 import random
+import time
+import innies_outies
+import topology
 import numpy as np
 
+# the number of cages of each size (1 to 9) the cage sizes are drawn from, for each level.
+# on grids smaller than 9x9 the sizes larger than the grid are left out
+LVL_CAGES_DICT = {
+    1: [2, 5, 2, 0, 0, 0, 0, 0, 0],
+    2: [3, 4, 5, 1, 0, 0, 0, 0, 0],
+    3: [3, 2, 5, 6, 1, 0, 0, 0, 0],
+    4: [1, 3, 4, 5, 2, 0, 0, 0, 0],
+    5: [1, 3, 3, 6, 4, 2, 0, 0, 0],
+    6: [1, 3, 3, 5, 6, 3, 1, 0, 0],
+    7: [0, 3, 3, 6, 7, 6, 3, 1, 0],
+    8: [0, 3, 3, 3, 7, 8, 5, 4, 1],
+    9: [0, 3, 3, 3, 6, 8, 7, 6, 2],
+    10: [0, 2, 2, 2, 2, 6, 8, 8, 4]
+}
+
+ALL_COLORS = [(188, 143, 143),
+              (107,142,35),
+              (218, 165, 32),
+              (70,130,180),
+              (205, 133, 63),
+              (222, 184, 135),
+              (143,188,143),
+              (221, 160, 221),
+              (102, 221, 170),
+              (255, 99, 71),
+              (255, 165, 0), #t
+              (255, 192, 203),
+              (255, 159, 83),
+              (255, 209, 113),
+              (178, 201, 101),
+              (144, 223, 98),
+              (51, 204, 153),
+              (0, 206, 200),
+              (172, 223, 200),
+              (172, 187, 244),
+              (152, 152, 255),
+              (175, 137, 255),
+              (210, 137, 255),
+              (255, 186, 249),
+              (255, 101, 115),
+              (198, 181, 148),
+              (148, 174, 198),
+              (199, 218, 198)
+              ]
+
 class Houses:
     """
         Sets a dictionary of houses and link their cells.
@@ -13,131 +63,34 @@ class Houses:
             get_col - returns the col of the given cell.
             get_nonet - returns the nonet of the given cell.
             set_cages - assign each cell to a cage with a random number of cells depending on the level
+            load_cages - creates the cages of a layout that was already generated
             get_cage - returns the cage of the given cell
+            set_virtual_cages - creates the virtual cages the 45 rule derives from the cages
+            get_virtual_cages - returns the virtual cages of the given cell
     """
-    def __init__(self, seed):
+    def __init__(self, seed, box_shape=(3, 3)):
         """
         initializes the dictionaries
+        :param box_shape: tuple of two integers, the rows and the columns of a box (see topology.GridShape).
         """
-        self.rows = {
-                    0: Row.Row(),
-                    1: Row.Row(),
-                    2: Row.Row(),
-                    3: Row.Row(),
-                    4: Row.Row(),
-                    5: Row.Row(),
-                    6: Row.Row(),
-                    7: Row.Row(),
-                    8: Row.Row()
-                }
-        self.cols = {
-                    0: Row.Row(),
-                    1: Row.Row(),
-                    2: Row.Row(),
-                    3: Row.Row(),
-                    4: Row.Row(),
-                    5: Row.Row(),
-                    6: Row.Row(),
-                    7: Row.Row(),
-                    8: Row.Row()
-                }
-        self.nonets = {
-                    0: Nonet.Nonet(),
-                    1: Nonet.Nonet(),
-                    2: Nonet.Nonet(),
-                    3: Nonet.Nonet(),
-                    4: Nonet.Nonet(),
-                    5: Nonet.Nonet(),
-                    6: Nonet.Nonet(),
-                    7: Nonet.Nonet(),
-                    8: Nonet.Nonet()
-                }
+        self.shape = topology.get_shape(*box_shape)
+        self.size = self.shape.size
+        self.table = cage_combinations.get_table(self.size)  # the cage combinations of the grid's digits
+        self.rows = {row: Row.Row(self.size) for row in range(self.size)}
+        self.cols = {col: Row.Row(self.size) for col in range(self.size)}
+        self.nonets = {nonet: Nonet.Nonet(self.size) for nonet in range(self.size)}
         self.cages = {}
         self.reverse_cages = {}
-        self.houses = {
-            (0, 0): [self.rows[0], self.cols[0], self.nonets[0]],
-            (0, 1): [self.rows[0], self.cols[1], self.nonets[0]],
-            (0, 2): [self.rows[0], self.cols[2], self.nonets[0]],
-            (0, 3): [self.rows[0], self.cols[3], self.nonets[1]],
-            (0, 4): [self.rows[0], self.cols[4], self.nonets[1]],
-            (0, 5): [self.rows[0], self.cols[5], self.nonets[1]],
-            (0, 6): [self.rows[0], self.cols[6], self.nonets[2]],
-            (0, 7): [self.rows[0], self.cols[7], self.nonets[2]],
-            (0, 8): [self.rows[0], self.cols[8], self.nonets[2]],
-            (1, 0): [self.rows[1], self.cols[0], self.nonets[0]],
-            (1, 1): [self.rows[1], self.cols[1], self.nonets[0]],
-            (1, 2): [self.rows[1], self.cols[2], self.nonets[0]],
-            (1, 3): [self.rows[1], self.cols[3], self.nonets[1]],
-            (1, 4): [self.rows[1], self.cols[4], self.nonets[1]],
-            (1, 5): [self.rows[1], self.cols[5], self.nonets[1]],
-            (1, 6): [self.rows[1], self.cols[6], self.nonets[2]],
-            (1, 7): [self.rows[1], self.cols[7], self.nonets[2]],
-            (1, 8): [self.rows[1], self.cols[8], self.nonets[2]],
-            (2, 0): [self.rows[2], self.cols[0], self.nonets[0]],
-            (2, 1): [self.rows[2], self.cols[1], self.nonets[0]],
-            (2, 2): [self.rows[2], self.cols[2], self.nonets[0]],
-            (2, 3): [self.rows[2], self.cols[3], self.nonets[1]],
-            (2, 4): [self.rows[2], self.cols[4], self.nonets[1]],
-            (2, 5): [self.rows[2], self.cols[5], self.nonets[1]],
-            (2, 6): [self.rows[2], self.cols[6], self.nonets[2]],
-            (2, 7): [self.rows[2], self.cols[7], self.nonets[2]],
-            (2, 8): [self.rows[2], self.cols[8], self.nonets[2]],
-            (3, 0): [self.rows[3], self.cols[0], self.nonets[3]],
-            (3, 1): [self.rows[3], self.cols[1], self.nonets[3]],
-            (3, 2): [self.rows[3], self.cols[2], self.nonets[3]],
-            (3, 3): [self.rows[3], self.cols[3], self.nonets[4]],
-            (3, 4): [self.rows[3], self.cols[4], self.nonets[4]],
-            (3, 5): [self.rows[3], self.cols[5], self.nonets[4]],
-            (3, 6): [self.rows[3], self.cols[6], self.nonets[5]],
-            (3, 7): [self.rows[3], self.cols[7], self.nonets[5]],
-            (3, 8): [self.rows[3], self.cols[8], self.nonets[5]],
-            (4, 0): [self.rows[4], self.cols[0], self.nonets[3]],
-            (4, 1): [self.rows[4], self.cols[1], self.nonets[3]],
-            (4, 2): [self.rows[4], self.cols[2], self.nonets[3]],
-            (4, 3): [self.rows[4], self.cols[3], self.nonets[4]],
-            (4, 4): [self.rows[4], self.cols[4], self.nonets[4]],
-            (4, 5): [self.rows[4], self.cols[5], self.nonets[4]],
-            (4, 6): [self.rows[4], self.cols[6], self.nonets[5]],
-            (4, 7): [self.rows[4], self.cols[7], self.nonets[5]],
-            (4, 8): [self.rows[4], self.cols[8], self.nonets[5]],
-            (5, 0): [self.rows[5], self.cols[0], self.nonets[3]],
-            (5, 1): [self.rows[5], self.cols[1], self.nonets[3]],
-            (5, 2): [self.rows[5], self.cols[2], self.nonets[3]],
-            (5, 3): [self.rows[5], self.cols[3], self.nonets[4]],
-            (5, 4): [self.rows[5], self.cols[4], self.nonets[4]],
-            (5, 5): [self.rows[5], self.cols[5], self.nonets[4]],
-            (5, 6): [self.rows[5], self.cols[6], self.nonets[5]],
-            (5, 7): [self.rows[5], self.cols[7], self.nonets[5]],
-            (5, 8): [self.rows[5], self.cols[8], self.nonets[5]],
-            (6, 0): [self.rows[6], self.cols[0], self.nonets[6]],
-            (6, 1): [self.rows[6], self.cols[1], self.nonets[6]],
-            (6, 2): [self.rows[6], self.cols[2], self.nonets[6]],
-            (6, 3): [self.rows[6], self.cols[3], self.nonets[7]],
-            (6, 4): [self.rows[6], self.cols[4], self.nonets[7]],
-            (6, 5): [self.rows[6], self.cols[5], self.nonets[7]],
-            (6, 6): [self.rows[6], self.cols[6], self.nonets[8]],
-            (6, 7): [self.rows[6], self.cols[7], self.nonets[8]],
-            (6, 8): [self.rows[6], self.cols[8], self.nonets[8]],
-            (7, 0): [self.rows[7], self.cols[0], self.nonets[6]],
-            (7, 1): [self.rows[7], self.cols[1], self.nonets[6]],
-            (7, 2): [self.rows[7], self.cols[2], self.nonets[6]],
-            (7, 3): [self.rows[7], self.cols[3], self.nonets[7]],
-            (7, 4): [self.rows[7], self.cols[4], self.nonets[7]],
-            (7, 5): [self.rows[7], self.cols[5], self.nonets[7]],
-            (7, 6): [self.rows[7], self.cols[6], self.nonets[8]],
-            (7, 7): [self.rows[7], self.cols[7], self.nonets[8]],
-            (7, 8): [self.rows[7], self.cols[8], self.nonets[8]],
-            (8, 0): [self.rows[8], self.cols[0], self.nonets[6]],
-            (8, 1): [self.rows[8], self.cols[1], self.nonets[6]],
-            (8, 2): [self.rows[8], self.cols[2], self.nonets[6]],
-            (8, 3): [self.rows[8], self.cols[3], self.nonets[7]],
-            (8, 4): [self.rows[8], self.cols[4], self.nonets[7]],
-            (8, 5): [self.rows[8], self.cols[5], self.nonets[7]],
-            (8, 6): [self.rows[8], self.cols[6], self.nonets[8]],
-            (8, 7): [self.rows[8], self.cols[7], self.nonets[8]],
-            (8, 8): [self.rows[8], self.cols[8], self.nonets[8]]}
+        # the row, column and nonet of each cell, read from the shared topology tables. set_cages adds the cage.
+        self.houses = {place: [self.rows[self.shape.row_of[i]], self.cols[self.shape.col_of[i]],
+                               self.nonets[self.shape.box_of_index[i]]]
+                       for i, place in enumerate(self.shape.places)}
         self.seed = seed
         self.known_cells = []
+        self.partition_time = 0  # the seconds set_cages took
+        self.truncated_cages = 0  # the cages set_cages closed before they reached the size it drew for them
+        self.virtual_cages = []  # the cages of the 45 rule, see set_virtual_cages
+        self.virtual_cages_of = {}  # a dictionary from a cell's place to the list of its virtual cages
 
     def get_row(self, place):
         """
@@ -157,131 +110,171 @@ class Houses:
         """
         return self.houses[place][2]
 
-    def set_cages(self, level, solution):
+    def set_cages(self, level, solution, mode='legacy'):
         """
         assign each cell to a cage with a random number of cells depending on the level
-        :param lvl: an integer, the max size of a cage
+        each cage grows from a random free cell to random free neighbor cells, without repeating a value.
+        the free cells are kept in an index and the neighbors of the growing cage in a frontier,
+        so growing a cage doesn't scan the list of free cells.
+        :param level: an integer between 1 and 10, the difficulty
         :param solution: the solution grid
+        :param mode: 'legacy' - makes the same random choices the original generator made,
+                                so every (seed, level) keeps its cages.
+                     'frontier' - picks uniformly from the frontier of the cage, kept as a list with O(1) removal,
+                                  the cages are different from the legacy ones.
         """
-
-        lvl_cages_dict = {
-            1: [2, 5, 2, 0, 0, 0, 0, 0, 0],
-            2: [3, 4, 5, 1, 0, 0, 0, 0, 0],
-            3: [3, 2, 5, 6, 1, 0, 0, 0, 0],
-            4: [1, 3, 4, 5, 2, 0, 0, 0, 0],
-            5: [1, 3, 3, 6, 4, 2, 0, 0, 0],
-            6: [1, 3, 3, 5, 6, 3, 1, 0, 0],
-            7: [0, 3, 3, 6, 7, 6, 3, 1, 0],
-            8: [0, 3, 3, 3, 7, 8, 5, 4, 1],
-            9: [0, 3, 3, 3, 6, 8, 7, 6, 2],
-            10: [0, 2, 2, 2, 2, 6, 8, 8, 4]
-        }
-
+        if mode not in ('legacy', 'frontier'):
+            raise ValueError(f"unknown cage mode: {mode}")
+        start = time.perf_counter()
         lvl_choices = []
 
-        for i, num in enumerate(lvl_cages_dict[level]):
+        for i, num in enumerate(LVL_CAGES_DICT[level]):
             cage_lvl = i + 1
+            if cage_lvl > self.size:
+                break
             for _ in range(num):
                 lvl_choices.append(cage_lvl)
 
-        def neighbor_cells(empty_cells, curr_cells, curr_values):
-            """
-            finds the neighbor cells that don't belong to a cage yet of the cells in curr_cells
-            :param empty_cells: a list of tuples, cells that don't belong to any cage yet
-            :param curr_cells: a list of tuples, cells we want to find their neighbor cells
-            :return: list of the neighbor cells
-            """
-            neighbors = []
-            for curr_cell in curr_cells:
-                for i, j in [[-1, 0], [1, 0], [0, 1], [0, -1]]: # checks the cells above, below, and next to the current cell
-                    temp_cell = (curr_cell[0] + i, curr_cell[1] + j)
-                    if temp_cell in empty_cells:  # if the cell exists or doesn't belong to another cage
-                        if solution.get_cell(temp_cell) not in curr_values:  # if there is already the same value in the cage
-                            neighbors.append(temp_cell)
-            return neighbors
-
-        def get_sum(cage_cells):
-            """
-            :param cage_cells: tuples with int values, the cage's cells locations
-            :return: sum of the cage's cells
-            """
-            result = 0
-            for cage_cell in cage_cells:
-                result += solution.get_cell(cage_cell)
-            return result
-
-        cells = list(self.houses.keys())
-        all_colors = [(188, 143, 143),
-                      (107,142,35),
-                      (218, 165, 32),
-                      (70,130,180),
-                      (205, 133, 63),
-                      (222, 184, 135),
-                      (143,188,143),
-                      (221, 160, 221),
-                      (102, 221, 170),
-                      (255, 99, 71),
-                      (255, 165, 0), #t
-                      (255, 192, 203),
-                      (255, 159, 83),
-                      (255, 209, 113),
-                      (178, 201, 101),
-                      (144, 223, 98),
-                      (51, 204, 153),
-                      (0, 206, 200),
-                      (172, 223, 200),
-                      (172, 187, 244),
-                      (152, 152, 255),
-                      (175, 137, 255),
-                      (210, 137, 255),
-                      (255, 186, 249),
-                      (255, 101, 115),
-                      (198, 181, 148),
-                      (148, 174, 198),
-                      (199, 218, 198)
-                      ]
+        rng = random.Random(self.seed)  # the same stream as random.seed(self.seed), without the global state
+        shape = self.shape
+        values = [solution.get_cell(place) for place in shape.places]
+        free = bytearray(b'\x01' * shape.num_cells)  # free[i] is 1 if the cell doesn't belong to a cage yet
+        free_cells = list(range(shape.num_cells))  # the free cells, sorted, in the order the original list had
+        # the frontier mode keeps the free neighbors of the cage in a list, with each cell's position in it, so a
+        # cell is added, removed and drawn in O(1). a cell whose value joined the cage after it was added is only
+        # removed when it is drawn, each cell is removed once.
+        frontier = []
+        position = [-1] * shape.num_cells  # the position of each cell in frontier, -1 if it isn't there
 
-        colors = all_colors.copy()
-        random.seed(self.seed)
-        while cells:  # while there are still cells that aren't assigned to any cage
-            random_lvl = random.choice(lvl_choices)  # chooses a random number of cells the cage will contain
-            curr_cage = Cage.Cage(random_lvl)  # creates a new cage
-            curr_cage_cells = []  # the cells in the current cage
-            curr_values = []  # the values of the cells in our current cage
+        colors = ALL_COLORS.copy()
+        while free_cells:  # while there are still cells that aren't assigned to any cage
+            random_lvl = rng.choice(lvl_choices)  # chooses a random number of cells the cage will contain
+            curr_cage_cells = []  # the indexes of the cells in the current cage
+            curr_values = 0  # a mask of the values of the cells in our current cage
             for i in range(random_lvl):
-                if i != 0:
-                    neighbor_cells_list = neighbor_cells(cells, curr_cage_cells, curr_values)
-                    if neighbor_cells_list:  # if there are neighbor cells pick one of them randomly
-                        random_cell = random.choice(neighbor_cells(cells, curr_cage_cells, curr_values))
-                    else:  # if the neighbor cells list is empty, break the loop and create a cage
-                        size = len(curr_cage_cells)
-                        curr_cage.size = size  # updates the size
+                if i == 0:  # choose the first cell in random
+                    random_cell = rng.choice(free_cells)
+                elif mode == 'legacy':
+                    neighbor_cells_list = self._legacy_neighbors(curr_cage_cells, free, curr_values, values,
+                                                                 shape.orthogonal_neighbors)
+                    if not neighbor_cells_list:  # if the neighbor cells list is empty, close the cage
                         break
-                else:  # choose the first cell in random
-                    random_cell = random.choice(cells)
-                curr_values.append(solution.get_cell(random_cell))
-                self.cages[random_cell] = curr_cage  # adds to cages dictionary the selected cell with the curr cage as its value
-                self.houses[random_cell].append(curr_cage)  # adds to houses dictionary the cell's cage
+                    random_cell = rng.choice(neighbor_cells_list)
+                else:
+                    random_cell = -1
+                    while frontier:
+                        cell = rng.choice(frontier)
+                        # removes the cell from the frontier: the last cell takes its position
+                        last = frontier.pop()
+                        if last != cell:
+                            frontier[position[cell]] = last
+                            position[last] = position[cell]
+                        position[cell] = -1
+                        if not curr_values >> (values[cell] - 1) & 1:
+                            random_cell = cell
+                            break
+                    if random_cell < 0:  # no neighbor without a repeated value is left, close the cage
+                        break
+                curr_values |= 1 << (values[random_cell] - 1)
                 curr_cage_cells.append(random_cell)
-                cells.remove(random_cell)
-                self.reverse_cages[curr_cage] = curr_cage_cells
+                free[random_cell] = 0
+                del free_cells[bisect.bisect_left(free_cells, random_cell)]
+                if mode == 'frontier' and i < random_lvl - 1:  # the last cell's neighbors are never drawn
+                    for neighbor in shape.orthogonal_neighbors[random_cell]:
+                        if free[neighbor] and position[neighbor] < 0 and not curr_values >> (values[neighbor] - 1) & 1:
+                            position[neighbor] = len(frontier)
+                            frontier.append(neighbor)
+            if frontier:
+                for cell in frontier:
+                    position[cell] = -1
+                frontier.clear()
+            if len(curr_cage_cells) < random_lvl:  # no free neighbor without a repeated value was left
+                self.truncated_cages += 1
             if len(curr_cage_cells) == 1:
                 random_color = (255, 255, 255)
-                self.known_cells.append(curr_cage_cells[0])
             else:
-                random_color = random.choice(colors)  # picks a color for the background of the current cage
+                random_color = rng.choice(colors)  # picks a color for the background of the current cage
                 colors.remove(random_color)   # removes it from the colors list so we won't use it again for another cage
                 if len(colors) == 0:
-                    colors = all_colors.copy()
-            killer = get_sum(curr_cage_cells)
-            curr_cage.set_killer(killer)  # sets the killer number
-            curr_cage.set_options()
-            curr_cage.color = random_color
-            curr_cage.cells = curr_cage_cells
-            curr_cage.killer_cell = sorted(curr_cage_cells, key=lambda x: (x[0], x[1]))[0]
+                    colors = ALL_COLORS.copy()
+            killer = sum(values[cell] for cell in curr_cage_cells)
+            self._add_cage([shape.places[cell] for cell in curr_cage_cells], killer, random_color)
+        self.partition_time = time.perf_counter() - start
+
+    @staticmethod
+    def _legacy_neighbors(curr_cells, free, curr_values, values, orthogonal_neighbors=topology.ORTHOGONAL_NEIGHBORS):
+        """
+        finds the neighbor cells that don't belong to a cage yet of the cells in curr_cells,
+        in the same order and with the same repetitions as the original generator, so the random choices match.
+        :param curr_cells: a list of the indexes of the cells we want to find their neighbor cells
+        :param curr_values: a mask of the values already in the cage
+        :param orthogonal_neighbors: the ORTHOGONAL_NEIGHBORS table of the grid
+        :return: list of the indexes of the neighbor cells
+        """
+        neighbors = []
+        for curr_cell in curr_cells:
+            for neighbor in orthogonal_neighbors[curr_cell]:  # the cells above, below, and next to it
+                # if the cell doesn't belong to another cage and its value isn't in the cage already
+                if free[neighbor] and not curr_values >> (values[neighbor] - 1) & 1:
+                    neighbors.append(neighbor)
+        return neighbors
+
+    def _add_cage(self, curr_cage_cells, killer, color):
+        """
+        creates a cage of the given cells and links it to them
+        :param curr_cage_cells: a list of the places of the cage's cells, in the order they were added
+        """
+        curr_cage = Cage.Cage(len(curr_cage_cells), self.size)
+        for cell in curr_cage_cells:
+            self.cages[cell] = curr_cage  # adds to cages dictionary the cell with the cage as its value
+            self.houses[cell].append(curr_cage)  # adds to houses dictionary the cell's cage
+        self.reverse_cages[curr_cage] = curr_cage_cells
+        if len(curr_cage_cells) == 1:
+            self.known_cells.append(curr_cage_cells[0])
+        curr_cage.set_killer(killer)  # sets the killer number
+        curr_cage.set_options()
+        curr_cage.color = color
+        curr_cage.cells = curr_cage_cells
+        curr_cage.killer_cell = min(curr_cage_cells)
+
+    def load_cages(self, cages):
+        """
+        creates the cages of a layout that was already generated, instead of choosing them randomly
+        :param cages: a list of the cages in the order they were created,
+                      each cage is a tuple of (list of its cells' places, killer, color).
+        """
+        for cells, killer, color in cages:
+            self._add_cage(list(cells), killer, color)
 
     def get_cage(self, place):
         """
         returns the cage of the given cell
         """
         return self.houses[place][3]
+
+    def set_virtual_cages(self):
+        """
+        creates the virtual cages the 45 rule derives from the cages (see innies_outies), after set_cages or load_cages.
+        a virtual cage is a Cage whose cells sum to its killer without repeating a digit, but it isn't drawn
+        and isn't one of the cells' houses. the 45 rule is only derived on the 9x9 grid.
+        """
+        if self.size != 9:
+            return
+        cages = [([topology.index_of(place) for place in cells], cage.killer)
+                 for cage, cells in self.reverse_cages.items()]
+        for indexes, total in innies_outies.derive(cages):
+            cells = [topology.PLACES[i] for i in indexes]
+            virtual_cage = Cage.Cage(len(cells))
+            virtual_cage.set_killer(total)
+            virtual_cage.set_options()
+            virtual_cage.cells = cells
+            virtual_cage.killer_cell = min(cells)
+            self.virtual_cages.append(virtual_cage)
+            for cell in cells:
+                self.virtual_cages_of.setdefault(cell, []).append(virtual_cage)
+
+    def get_virtual_cages(self, place):
+        """
+        returns the virtual cages of the given cell, the list is empty if set_virtual_cages wasn't called.
+        """
+        return self.virtual_cages_of.get(place, [])
@@ -0,0 +1,515 @@
+import statistics
+import time
+import cage_combinations
+import innies_outies
+import topology
+from TranspositionTable import ZOBRIST
+
+ALL_DIGITS = cage_combinations.ALL_DIGITS
+BIT_COUNT = cage_combinations.BIT_COUNT
+
+
+class SolverStopped(Exception):
+    """
+    raised inside the search when the solver ran out of time or nodes, or was cancelled.
+    """
+
+
+class SolveResult:
+    """
+        the result of a solver run.
+
+        status is one of:
+            'solved' - a solution was found (for counting, the search went over the whole tree or hit the limit).
+            'unsolvable' - the puzzle has no solution.
+            'timeout' - the time limit passed before the search ended.
+            'node_limit' - the search reached its most nodes before it ended, the same on every machine.
+            'cancelled' - the cancel event was set before the search ended.
+    """
+    __slots__ = ('status', 'solution', 'solutions', 'count', 'nodes', 'elapsed')
+
+    def __init__(self, status, solutions, nodes, elapsed, count=None):
+        self.status = status
+        self.solutions = tuple(solutions)  # every solution found, each a tuple of 81 values
+        self.solution = self.solutions[0] if solutions else None  # the first solution found, or None
+        # the number of solutions found, more than the solutions kept if some were counted from a transposition table
+        self.count = len(self.solutions) if count is None else count
+        self.nodes = nodes  # the number of search nodes
+        self.elapsed = elapsed  # seconds
+
+    def __repr__(self):
+        return f"SolveResult({self.status}, count={self.count}, nodes={self.nodes}, elapsed={self.elapsed:.4f})"
+
+
+class KillerSolver:
+    """
+        solves a killer sudoku from its cages alone.
+
+        every cell keeps a 9-bit mask of its candidates. the candidates are pruned by the rows, columns and nonets,
+        by the digit combinations each cage can still be filled with (see cage_combinations), by naked singles and by
+        hidden singles, and when nothing more can be pruned the search branches on the cell with the fewest candidates.
+
+        Methods:
+            __init__ - initializes a solver.
+            from_layout - creates a solver for a PuzzleLayout.
+            from_board - creates a solver for the cages of a Board (or a CompactBoard).
+            from_houses - creates a solver for the cages of a Houses.
+            initial_candidates - returns the candidates before any search.
+            propagate - prunes the candidates until nothing changes.
+            prune_cage - prunes the candidates of one cage's cells by its combinations.
+            solve - finds one solution.
+            count_solutions - counts the solutions, up to a limit.
+            is_solution - checks that 81 values fill every house and cage correctly.
+    """
+
+    def __init__(self, cages, givens=None, timeout=None, cancel_event=None, branching='mrv', value_order='ascending',
+                 hidden_singles=True, sum_rules=False, max_nodes=None):
+        """
+        initializes a solver.
+        :param cages: an iterable of (list of the cage's places, killer).
+        :param givens: a sequence of 81 values (0 is empty) the solution must keep, or None.
+        :param timeout: the most seconds a run may take, or None.
+        :param cancel_event: a threading.Event (or anything with is_set), the run stops when it is set.
+        :param branching: string, the cell the search branches on: 'mrv' - the first cell with the fewest candidates,
+                          'small_cage' - of the cells with the fewest candidates, the one in the smallest cage.
+        :param value_order: string, the order the candidates of that cell are tried in, 'ascending' or 'descending'.
+        :param hidden_singles: boolean, False to prune by naked singles and cages only.
+        :param sum_rules: boolean, True to also prune by the virtual cages of the 45 rule (see innies_outies).
+        :param max_nodes: the most search nodes a run may take (checked every 64 nodes, like the time), or None.
+                          unlike the timeout, where a run stops doesn't depend on the machine.
+        """
+        self.cages = []  # (tuple of indexes, killer, tuple of all the combinations)
+        cage_of = [None] * 81
+        for number, (cells, killer) in enumerate(cages):
+            indexes = tuple(topology.index_of(place) for place in cells)
+            self.cages.append((indexes, killer, cage_combinations.get_combinations(killer, len(indexes))))
+            for index in indexes:
+                cage_of[index] = number
+        self.cage_of = cage_of  # the number of the real cage of each cell, the virtual cages come after the real ones
+        self.num_real_cages = len(self.cages)
+        if sum_rules:
+            for indexes, total in innies_outies.derive((indexes, killer) for indexes, killer, _ in self.cages):
+                self.cages.append((indexes, total, cage_combinations.get_combinations(total, len(indexes))))
+        self._combo_sets = [frozenset(combos) for _, _, combos in self.cages]
+        self._support_cache = {}  # (cage number, candidates of its cells) -> the candidates that can be used
+        # the cells each cell can't share a digit with: its row, column, nonet and cage
+        self.peers = tuple(tuple(sorted(set(topology.PEERS[i]) |
+                                        (set(self.cages[cage_of[i]][0]) - {i} if cage_of[i] is not None else set())))
+                           for i in range(81))
+        self.givens = givens
+        self.timeout = timeout
+        self.max_nodes = max_nodes
+        self.cancel_event = cancel_event
+        self.branching = branching
+        self.descending = value_order == 'descending'
+        self.hidden_singles = hidden_singles
+        self.cage_size = tuple(len(self.cages[cage_of[i]][0]) if cage_of[i] is not None else 1 for i in range(81))
+        # mixed into the transposition keys, so states of different cages don't share entries
+        self._cages_key = hash(tuple((indexes, killer) for indexes, killer, _ in self.cages)) & (1 << 64) - 1
+        self._count = 0
+        self.nodes = 0
+        self._deadline = None
+
+    @classmethod
+    def from_layout(cls, layout, **kwargs):
+        """
+        creates a solver for a PuzzleLayout.
+        """
+        return cls([(cells, killer) for cells, killer, _ in layout.cages], **kwargs)
+
+    @classmethod
+    def from_board(cls, board, **kwargs):
+        """
+        creates a solver for the cages of a Board (or a CompactBoard).
+        """
+        return cls([(cage.cells, cage.killer) for cage in board.get_cages()], **kwargs)
+
+    @classmethod
+    def from_houses(cls, all_houses, **kwargs):
+        """
+        creates a solver for the cages of a Houses, after set_cages.
+        """
+        return cls([(cage.cells, cage.killer) for cage in all_houses.reverse_cages], **kwargs)
+
+    def initial_candidates(self):
+        """
+        returns the candidates before any search: each cell may hold the digits its cage's combinations have,
+        and the givens.
+        :return: a list of 81 masks.
+        """
+        cand = [ALL_DIGITS] * 81
+        for indexes, killer, _ in self.cages:
+            allowed = cage_combinations.can_contain(killer, len(indexes))
+            for index in indexes:
+                cand[index] &= allowed
+        if self.givens is not None:
+            for index, val in enumerate(self.givens):
+                if val:
+                    cand[index] &= 1 << (val - 1)
+        return cand
+
+    def propagate(self, cand, queue=None):
+        """
+        prunes the candidates until nothing changes.
+        :param cand: a list of 81 masks, changed in place.
+        :param queue: a list of the cells that became singles and weren't removed from their peers yet,
+                      or None to start from every single.
+        :return: boolean, False if a contradiction was found.
+        """
+        if queue is None:
+            queue = [i for i in range(81) if BIT_COUNT[cand[i]] == 1]
+        peers = self.peers
+        while True:
+            # naked singles: a cell with one candidate removes it from all its peers
+            while queue:
+                i = queue.pop()
+                bit = cand[i]
+                if bit == 0:
+                    return False
+                for j in peers[i]:
+                    m = cand[j]
+                    if m & bit:
+                        m &= ~bit
+                        if m == 0:
+                            return False
+                        cand[j] = m
+                        if m & (m - 1) == 0:
+                            queue.append(j)
+            changed = self._prune_cages(cand, queue)
+            if changed is None:
+                return False
+            if queue:
+                continue
+            if not self.hidden_singles:
+                return True
+            changed = self._hidden_singles(cand, queue)
+            if changed is None:
+                return False
+            if not queue and not changed:
+                return True
+
+    def _prune_cages(self, cand, queue):
+        """
+        keeps in each cell only the digits it holds in at least one complete filling of its cage,
+        a filling being distinct digits from the cells' candidates that form one of the cage's combinations.
+        :return: True if a candidate was removed, False if not, None on a contradiction.
+        """
+        changed = False
+        for number, (indexes, killer, combos) in enumerate(self.cages):
+            masks = tuple(cand[i] for i in indexes)
+            support = self._cage_support(number, masks)
+            if support is None:
+                return None
+            if support == masks:
+                continue
+            for i, m in zip(indexes, support):
+                if cand[i] != m:
+                    cand[i] = m
+                    changed = True
+                    if m & (m - 1) == 0:
+                        queue.append(i)
+        return changed
+
+    def prune_cage(self, cand, number):
+        """
+        prunes the candidates of one cage's cells by its combinations.
+        :param cand: a list of 81 masks, changed in place.
+        :param number: the number of the cage in self.cages.
+        :return: a list of the cells whose candidates changed, or None if the cage can't be filled.
+        """
+        indexes = self.cages[number][0]
+        support = self._cage_support(number, tuple(cand[i] for i in indexes))
+        if support is None:
+            return None
+        changed = [i for i, m in zip(indexes, support) if cand[i] != m]
+        for i, m in zip(indexes, support):
+            cand[i] = m
+        return changed
+
+    def _cage_support(self, number, masks):
+        """
+        returns the candidates of the cage's cells that appear in a complete filling of the cage, or None if the
+        cage can't be filled. the digits used by the first cells are walked layer by layer (at most 512 masks),
+        and then walked back from the masks that are combinations of the cage.
+        the results are cached, since the same cage candidates come back often during the search.
+        """
+        key = (number, masks)
+        cached = self._support_cache.get(key, False)
+        if cached is not False:
+            return cached
+        layers = [(0,)]
+        for m in masks:
+            reached = set()
+            for used in layers[-1]:
+                free = m & ~used
+                while free:
+                    bit = free & -free
+                    free ^= bit
+                    reached.add(used | bit)
+            if not reached:
+                break
+            layers.append(reached)
+        alive = self._combo_sets[number].intersection(layers[-1]) if len(layers) > len(masks) else None
+        if not alive:
+            result = None
+        else:
+            support = [0] * len(masks)
+            for level in range(len(masks) - 1, -1, -1):
+                m = masks[level]
+                previous = set()
+                for used in layers[level]:
+                    free = m & ~used
+                    while free:
+                        bit = free & -free
+                        free ^= bit
+                        if used | bit in alive:
+                            previous.add(used)
+                            support[level] |= bit
+                alive = previous
+            result = tuple(support)
+        if len(self._support_cache) > 200000:
+            self._support_cache.clear()
+        self._support_cache[key] = result
+        return result
+
+    def _hidden_singles(self, cand, queue):
+        """
+        places every digit that only one cell of a row, a column or a nonet can hold.
+        :return: True if a cell was placed, False if not, None on a contradiction.
+        """
+        changed = False
+        for house in topology.HOUSE_INDEXES:
+            once = 0
+            twice = 0
+            for i in house:
+                m = cand[i]
+                twice |= once & m
+                once |= m
+            if once != ALL_DIGITS:  # a digit no cell of the house can hold
+                return None
+            hidden = once & ~twice
+            while hidden:
+                bit = hidden & -hidden
+                hidden ^= bit
+                for i in house:
+                    if cand[i] & bit:
+                        if cand[i] != bit:
+                            cand[i] = bit
+                            queue.append(i)
+                            changed = True
+                        break
+        return changed
+
+    def _check_stop(self):
+        """
+        raises SolverStopped if the time limit passed, the search reached its most nodes or the run was cancelled.
+        """
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            raise SolverStopped('node_limit')
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise SolverStopped('timeout')
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise SolverStopped('cancelled')
+
+    def _choose_cell(self, cand):
+        """
+        returns the unsolved cell with the fewest candidates, or -1 if every cell is solved.
+        """
+        if self.branching == 'small_cage':
+            return self._choose_small_cage_cell(cand)
+        best = -1
+        best_count = 10
+        for i in range(81):
+            count = BIT_COUNT[cand[i]]
+            if 1 < count < best_count:
+                best = i
+                best_count = count
+                if count == 2:
+                    break
+        return best
+
+    def _choose_small_cage_cell(self, cand):
+        """
+        returns the unsolved cell with the fewest candidates, the one in the smallest cage if there are a few,
+        or -1 if every cell is solved.
+        """
+        best = -1
+        best_key = (10, 10)
+        cage_size = self.cage_size
+        for i in range(81):
+            count = BIT_COUNT[cand[i]]
+            if count > 1 and (count, cage_size[i]) < best_key:
+                best = i
+                best_key = (count, cage_size[i])
+        return best
+
+    def _search(self, cand, limit, found):
+        """
+        searches the tree under the given candidates, and adds the solutions to found until it has limit solutions.
+        """
+        self.nodes += 1
+        if self.nodes & 63 == 0:
+            self._check_stop()
+        i = self._choose_cell(cand)
+        if i == -1:
+            found.append(tuple(BIT_COUNT[m - 1 & ~m] + 1 for m in cand))
+            return
+        m = cand[i]
+        while m:
+            bit = 1 << (m.bit_length() - 1) if self.descending else m & -m
+            m ^= bit
+            new = cand[:]
+            new[i] = bit
+            if self.propagate(new, [i]):
+                self._search(new, limit, found)
+                if len(found) >= limit:
+                    return
+
+    def _state_key(self, cand):
+        """
+        returns the Zobrist key of a search state: the xor of the numbers of every cell's candidates, leaving out
+        the cells of the cages that are solved, since they don't change how many ways the rest can be filled.
+        """
+        key = self._cages_key
+        for i, m in enumerate(cand):
+            number = self.cage_of[i]
+            if number is None or any(BIT_COUNT[cand[j]] != 1 for j in self.cages[number][0]):
+                key ^= ZOBRIST[i][m]
+        return key
+
+    def _update_key(self, key, old, new):
+        """
+        returns the key of the new state from the key of the old state it was propagated from,
+        by changing only the numbers of the cells whose candidates changed.
+        """
+        solved_cages = set()
+        for i, (a, b) in enumerate(zip(old, new)):
+            if a != b:
+                key ^= ZOBRIST[i][a] ^ ZOBRIST[i][b]
+                if b & (b - 1) == 0:
+                    solved_cages.add(self.cage_of[i])
+        solved_cages.discard(None)
+        for number in solved_cages:  # the cages that may have become solved now leave the key
+            indexes = self.cages[number][0]
+            if all(new[j] & (new[j] - 1) == 0 for j in indexes):
+                for j in indexes:
+                    key ^= ZOBRIST[j][new[j]]
+        return key
+
+    def _search_cached(self, cand, key, limit, found, table):
+        """
+        counts the solutions under the given candidates like _search, looking every state up in a transposition
+        table first, and storing the count of every subtree that was searched to the end.
+        only the solutions the search reached are added to found, the ones counted from the table are in _count.
+        """
+        self.nodes += 1
+        if self.nodes & 63 == 0:
+            self._check_stop()
+        cached = table.get(key)
+        if cached is not None:
+            self._count += cached
+            return
+        i = self._choose_cell(cand)
+        if i == -1:
+            self._count += 1
+            found.append(tuple(BIT_COUNT[m - 1 & ~m] + 1 for m in cand))
+            table.put(key, 1)
+            return
+        before = self._count
+        m = cand[i]
+        while m:
+            bit = 1 << (m.bit_length() - 1) if self.descending else m & -m
+            m ^= bit
+            new = cand[:]
+            new[i] = bit
+            if self.propagate(new, [i]):
+                self._search_cached(new, self._update_key(key, cand, new), limit, found, table)
+                if self._count >= limit:
+                    return  # the subtree wasn't searched to the end, so its count isn't stored
+        table.put(key, self._count - before)
+
+    def _run(self, limit, table=None):
+        """
+        runs the search until limit solutions were found or the tree was searched.
+        :param table: TranspositionTable or None.
+        """
+        start = time.perf_counter()
+        self.nodes = 0
+        self._count = 0
+        self._deadline = start + self.timeout if self.timeout is not None else None
+        found = []
+        status = None
+        try:
+            self._check_stop()
+            cand = self.initial_candidates()
+            if self.propagate(cand):
+                if table is None:
+                    self._search(cand, limit, found)
+                    self._count = len(found)
+                else:
+                    self._search_cached(cand, self._state_key(cand), limit, found, table)
+        except SolverStopped as stop:
+            status = str(stop)
+        if status is None:
+            status = 'solved' if self._count else 'unsolvable'
+        return SolveResult(status, found, self.nodes, time.perf_counter() - start, min(self._count, limit))
+
+    def solve(self):
+        """
+        finds one solution.
+        :return: SolveResult.
+        """
+        return self._run(1)
+
+    def count_solutions(self, limit=2, table=None):
+        """
+        counts the solutions, and stops as soon as limit solutions were found.
+        :param table: TranspositionTable to cache the counts of the subtrees in, or None. with a table, the result
+                      may count solutions it doesn't have in its solutions.
+        :return: SolveResult, its count is the number of solutions (at most limit).
+        """
+        return self._run(limit, table)
+
+    def is_solution(self, values):
+        """
+        checks that 81 values fill every house and cage correctly.
+        """
+        for house in topology.HOUSE_INDEXES:
+            if {values[i] for i in house} != set(range(1, 10)):
+                return False
+        for indexes, killer, _ in self.cages:
+            digits = [values[i] for i in indexes]
+            if sum(digits) != killer or len(set(digits)) != len(digits):
+                return False
+        return True
+
+
+def benchmark(seeds=range(1, 31), levels=range(1, 11), timeout=5):
+    """
+    solves the legacy layouts of the given seeds at every level, checks every solution is valid,
+    and prints the median and the 99th percentile solve times of each level and how many runs timed out.
+    """
+    import PuzzleLayout
+    results = {}
+    for lvl in levels:
+        times = []
+        timeouts = 0
+        for seed in seeds:
+            layout = PuzzleLayout.PuzzleLayout.generate(seed, lvl)
+            solver = KillerSolver.from_layout(layout, timeout=timeout)
+            result = solver.solve()
+            if result.status == 'timeout':
+                timeouts += 1
+            else:
+                assert result.status == 'solved' and solver.is_solution(result.solution), (seed, lvl, result)
+            times.append(result.elapsed)
+        times.sort()
+        median = statistics.median(times)
+        p99 = times[min(len(times) - 1, int(len(times) * 0.99))]
+        results[lvl] = (median, p99, timeouts)
+        print(f"level {lvl}: median {median * 1000:.1f}ms, p99 {p99 * 1000:.1f}ms, {timeouts} timeouts")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -1,11 +1,15 @@
 
+import sys
 import GameSetup, Game
+import topology
 
-def main(user=''):
+def main(user='', box_shape=(3, 3)):
     setup = GameSetup.GameSetup(user)
     game_number, level, user = setup.run()
-    game = Game.Game(game_number, level, user)
+    game = Game.Game(game_number, level, user, box_shape=box_shape)
     game.run()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # the grid size can be given on the command line: 4, 6, 9, 12 or 16
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 9
+    main(box_shape=topology.BOX_SHAPES[size])
\ No newline at end of file
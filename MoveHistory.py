@@ -0,0 +1,172 @@
+from array import array
+from contextlib import contextmanager
+import cage_combinations
+
+# the fields of a delta, packed into one 64-bit number, wide enough for the 16x16 grid
+INDEX_BITS = 8  # the cell index, 0 to 255
+VALUE_BITS = 5  # a value, 0 to 16
+GUESS_BITS = 16  # a mask of the guesses
+OLD_VALUE_SHIFT = INDEX_BITS
+NEW_VALUE_SHIFT = OLD_VALUE_SHIFT + VALUE_BITS
+OLD_GUESSES_SHIFT = NEW_VALUE_SHIFT + VALUE_BITS
+NEW_GUESSES_SHIFT = OLD_GUESSES_SHIFT + GUESS_BITS
+MOVE_START = 1 << (NEW_GUESSES_SHIFT + GUESS_BITS)  # set on the first delta of every move
+
+
+def pack(index, old_value, new_value, old_guesses, new_guesses, start):
+    """
+    packs the change of one cell into a 64-bit number.
+    """
+    return (index | old_value << OLD_VALUE_SHIFT | new_value << NEW_VALUE_SHIFT | old_guesses << OLD_GUESSES_SHIFT |
+            new_guesses << NEW_GUESSES_SHIFT | (MOVE_START if start else 0))
+
+
+def unpack(delta):
+    """
+    returns the index, the old and the new values and the old and the new guesses of a packed delta.
+    """
+    value_mask, guess_mask = (1 << VALUE_BITS) - 1, (1 << GUESS_BITS) - 1
+    return (delta & (1 << INDEX_BITS) - 1, delta >> OLD_VALUE_SHIFT & value_mask, delta >> NEW_VALUE_SHIFT & value_mask,
+            delta >> OLD_GUESSES_SHIFT & guess_mask, delta >> NEW_GUESSES_SHIFT & guess_mask)
+
+
+class MoveHistory:
+    """
+        the undo and redo stacks of a game.
+
+        a move (a value, a guess, a hint or a reset) is recorded as the deltas of the cells it changed: the cell's
+        index, its old and new values and its old and new guesses, packed into 8 bytes in an array('Q'). the first
+        delta of a move is marked, so a reset that changed 40 cells is undone at once. undoing a move sets the old
+        values and guesses of its cells back inside a batch of the board, so only those cells and their peers are
+        updated, the board is never rebuilt.
+
+        Methods:
+            __init__ - initializes empty stacks.
+            record - records the cells a move changes.
+            undo - undoes the last move.
+            redo - redoes the last move that was undone.
+            can_undo - returns True if there is a move to undo.
+            can_redo - returns True if there is a move to redo.
+            memory_usage - returns the bytes the stacks use.
+    """
+
+    def __init__(self, max_deltas=100000):
+        """
+        initializes empty stacks.
+        :param max_deltas: the most deltas the undo stack keeps, the oldest moves are dropped first.
+        """
+        self.max_deltas = max_deltas
+        self.undo_stack = array('Q')
+        self.redo_stack = array('Q')
+
+    @contextmanager
+    def record(self, board, places=None):
+        """
+        records the cells a move changes, the move runs inside the with block.
+        usage:
+            with history.record(board, [place]):
+                board.set_cells_value(place, 5)
+        :param board: Board or CompactBoard.
+        :param places: the places the move may change, or None for every place (a reset).
+        """
+        shape = board.shape
+        places = shape.places if places is None else list(places)
+        before = [_cell_state(board, place) for place in places]
+        yield
+        start = True
+        for place, (old_value, old_guesses) in zip(places, before):
+            new_value, new_guesses = _cell_state(board, place)
+            if new_value != old_value or new_guesses != old_guesses:
+                self.undo_stack.append(pack(shape.index_of(place), old_value, new_value, old_guesses,
+                                            new_guesses, start))
+                start = False
+        if not start:  # the move changed something, what was undone can't be redone anymore
+            self.redo_stack = array('Q')
+            if len(self.undo_stack) > self.max_deltas:
+                self._drop_oldest()
+
+    def undo(self, board):
+        """
+        undoes the last move.
+        :return: a list of the places that changed, empty if there was nothing to undo.
+        """
+        return self._move(board, self.undo_stack, self.redo_stack, False)
+
+    def redo(self, board):
+        """
+        redoes the last move that was undone.
+        :return: a list of the places that changed, empty if there was nothing to redo.
+        """
+        return self._move(board, self.redo_stack, self.undo_stack, True)
+
+    def can_undo(self):
+        """
+        returns True if there is a move to undo.
+        """
+        return len(self.undo_stack) > 0
+
+    def can_redo(self):
+        """
+        returns True if there is a move to redo.
+        """
+        return len(self.redo_stack) > 0
+
+    def memory_usage(self):
+        """
+        returns the bytes the stacks use.
+        """
+        return (self.undo_stack.buffer_info()[1] + self.redo_stack.buffer_info()[1]) * self.undo_stack.itemsize
+
+    def _move(self, board, source, target, forward):
+        """
+        pops the last move of one stack, sets its cells to their old (or new, if forward) state, and pushes it on
+        the other stack in the same order.
+        """
+        if not source:
+            return []
+        first = len(source) - 1
+        while not source[first] & MOVE_START:
+            first -= 1
+        deltas = source[first:]
+        del source[first:]
+        target.extend(deltas)
+        places = []
+        with board.batch():
+            for delta in (deltas if forward else reversed(deltas)):
+                index, old_value, new_value, old_guesses, new_guesses = unpack(delta)
+                place = board.shape.places[index]
+                if forward:
+                    _set_cell_state(board, place, new_value, new_guesses)
+                else:
+                    _set_cell_state(board, place, old_value, old_guesses)
+                places.append(place)
+        return places
+
+    def _drop_oldest(self):
+        """
+        drops the oldest moves, a quarter of the stack at once so the array isn't moved on every move.
+        """
+        cut = len(self.undo_stack) // 4
+        while cut < len(self.undo_stack) and not self.undo_stack[cut] & MOVE_START:
+            cut += 1
+        del self.undo_stack[:cut]
+
+
+def _cell_state(board, place):
+    """
+    returns the value and the guesses mask of a cell.
+    """
+    return board.get_cell_value(place), cage_combinations.values_to_mask(board.get_cell(place).get_guesses())
+
+
+def _set_cell_state(board, place, value, guesses):
+    """
+    sets a cell's value and guesses. the board's own methods toggle a value or a guess that is already there,
+    so only the ones that differ are passed.
+    """
+    if board.get_cell_value(place) != value:
+        board.set_cells_value(place, value)
+    changed = cage_combinations.values_to_mask(board.get_cell(place).get_guesses()) ^ guesses
+    for digit in range(1, changed.bit_length() + 1):
+        if changed >> (digit - 1) & 1:
+            board.set_cells_guess(place, digit)
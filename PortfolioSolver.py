@@ -0,0 +1,244 @@
+import multiprocessing
+import multiprocessing.connection
+import os
+import sys
+import time
+import DLXSolver
+import KillerSolver
+import PuzzleLayout
+from resource_path import resource_path
+
+# name -> (solver class name, keyword arguments of the solver)
+STRATEGIES = {
+    'propagation': ('KillerSolver', {}),
+    'descending': ('KillerSolver', {'value_order': 'descending'}),
+    'small_cage': ('KillerSolver', {'branching': 'small_cage'}),
+    'naked_singles': ('KillerSolver', {'hidden_singles': False}),
+    'sum_rules': ('KillerSolver', {'sum_rules': True}),
+    'dlx': ('DLXSolver', {}),
+}
+WINS_PATH = resource_path(os.path.join("corpus", "portfolio_wins.txt"))
+
+
+def _strategy_solver(name, layout, cancel_event, timeout):
+    """
+    creates the solver of a strategy for a layout.
+    """
+    class_name, options = STRATEGIES[name]
+    solver_class = DLXSolver.DLXSolver if class_name == 'DLXSolver' else KillerSolver.KillerSolver
+    return solver_class.from_layout(layout, cancel_event=cancel_event, timeout=timeout, **options)
+
+
+def _worker(name, tasks, results, cancel_event):
+    """
+    the loop of a strategy's process: solves the layouts it gets until it gets None.
+    each answer is (task number, strategy name, status, solution, nodes, seconds, error), sent on the process's
+    own pipe. a strategy that raised answers with the status 'error' and the error's text.
+    """
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        number, data, timeout = task
+        start = time.perf_counter()
+        try:
+            layout = PuzzleLayout.PuzzleLayout.from_bytes(data)
+            result = _strategy_solver(name, layout, cancel_event, timeout).solve()
+        except Exception as error:
+            results.send((number, name, 'error', None, 0, time.perf_counter() - start, repr(error)))
+            continue
+        results.send((number, name, result.status, result.solution, result.nodes, result.elapsed, None))
+
+
+class PortfolioSolver:
+    """
+        races several solving strategies on the same puzzle, each in its own process, and returns the first answer.
+
+        the processes stay alive between puzzles. they share one cancel event: when a strategy answers, the event
+        is set and the other strategies stop at their next check (the solvers' cancel_event), so no process has to
+        be killed and started again. the winning strategy of every puzzle is counted per level.
+        every process answers on its own pipe, so a process that dies can't block the others' answers. solve waits
+        for the pipes and the processes together: a strategy that raised answers with an error, and a strategy
+        whose process died is dropped from the portfolio, so one broken strategy never hangs a batch.
+
+        Methods:
+            __init__ - initializes a portfolio and starts its processes.
+            solve - solves a layout with every strategy and returns the first answer.
+            solve_seed - solves the layout of (seed, lvl).
+            get_wins - returns how many times each strategy won, per level.
+            save_wins - writes the win counts to a text file.
+            close - stops the processes.
+    """
+
+    def __init__(self, strategies=None, timeout=None):
+        """
+        initializes a portfolio and starts its processes.
+        :param strategies: a list of names from STRATEGIES, or None for all of them.
+        :param timeout: the most seconds a strategy may take on one puzzle, or None.
+        """
+        self.strategies = list(STRATEGIES) if strategies is None else list(strategies)
+        self.timeout = timeout
+        self.wins = {}  # lvl -> {strategy name -> wins}
+        self.errors = []  # the failures of the strategies, (task number, strategy name, the error's text)
+        self._task_number = 0
+        self._cancel_event = multiprocessing.Event()
+        self._tasks = {}
+        self._results = {}  # the pipe each strategy answers on
+        self._processes = {}
+        for name in self.strategies:
+            tasks = multiprocessing.Queue()
+            results, answers = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=_worker, args=(name, tasks, answers, self._cancel_event),
+                                              daemon=True)
+            process.start()
+            answers.close()  # only the process writes, so its pipe ends when it dies
+            self._tasks[name] = tasks
+            self._results[name] = results
+            self._processes[name] = process
+
+    def solve(self, layout):
+        """
+        solves a layout with every strategy and returns the first answer.
+        an answer is a solution or a proof that there is none, a strategy that timed out or failed doesn't win.
+        :return: (SolveResult, the name of the strategy that won, or None if every strategy timed out or failed),
+                 the status is 'error' if every strategy failed.
+        """
+        start = time.perf_counter()
+        self._task_number += 1
+        self._cancel_event.clear()
+        data = layout.to_bytes()
+        for tasks in self._tasks.values():
+            tasks.put((self._task_number, data, self.timeout))
+        winner = None
+        best = None
+        waiting = set(self.strategies)  # every strategy answers once, even the ones that were cancelled
+        asked = len(waiting)
+        failed = 0
+        while waiting:
+            handles = {self._results[name]: name for name in waiting}
+            handles.update({self._processes[name].sentinel: name for name in waiting})
+            for handle in multiprocessing.connection.wait(list(handles)):
+                name = handles[handle]
+                if name not in waiting:
+                    continue
+                try:
+                    number, name, status, solution, nodes, elapsed, error = self._results[name].recv()
+                except EOFError:  # the process died before it answered
+                    number, status, error = self._task_number, 'error', "the process died"
+                    self._drop(name)
+                if number != self._task_number:  # an answer of an earlier puzzle
+                    continue
+                waiting.discard(name)
+                if status == 'error':
+                    self.errors.append((number, name, error))
+                    failed += 1
+                elif winner is None and status in ('solved', 'unsolvable'):
+                    winner = name
+                    best = (status, [solution] if solution is not None else [], nodes)
+                    self._cancel_event.set()
+        if winner is None:
+            best = ('error' if failed == asked else 'timeout', [], 0)
+        else:
+            level_wins = self.wins.setdefault(layout.lvl, {})
+            level_wins[winner] = level_wins.get(winner, 0) + 1
+        status, solutions, nodes = best
+        return KillerSolver.SolveResult(status, solutions, nodes, time.perf_counter() - start), winner
+
+    def solve_seed(self, seed, lvl):
+        """
+        solves the layout of (seed, lvl).
+        :return: see solve.
+        """
+        return self.solve(PuzzleLayout.PuzzleLayout.generate(seed, lvl))
+
+    def get_wins(self):
+        """
+        returns how many times each strategy won, per level.
+        :return: a dictionary from the level to a dictionary from the strategy name to its wins.
+        """
+        return {lvl: dict(level_wins) for lvl, level_wins in self.wins.items()}
+
+    def save_wins(self, path=WINS_PATH):
+        """
+        writes the win counts to a text file, one "level strategy wins" line each, adding to the counts already in it.
+        """
+        totals = {}
+        if os.path.exists(path):
+            with open(path) as file:
+                for line in file:
+                    if line.startswith("#") or not line.strip():
+                        continue
+                    lvl, name, wins = line.split()
+                    totals[(int(lvl), name)] = int(wins)
+        for lvl, level_wins in self.wins.items():
+            for name, wins in level_wins.items():
+                totals[(lvl, name)] = totals.get((lvl, name), 0) + wins
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write("# level strategy wins\n")
+            for (lvl, name), wins in sorted(totals.items()):
+                file.write(f"{lvl} {name} {wins}\n")
+        self.wins = {}
+
+    def _drop(self, name):
+        """
+        removes a strategy whose process died from the portfolio.
+        """
+        self.strategies.remove(name)
+        self._tasks.pop(name)
+        self._results.pop(name).close()
+        self._processes.pop(name).join()
+
+    def close(self):
+        """
+        stops the processes.
+        """
+        self._cancel_event.set()
+        for tasks in self._tasks.values():
+            tasks.put(None)
+        for process in self._processes.values():
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+        for results in self._results.values():
+            results.close()
+        self._processes = {}
+        self._results = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def run_batch(seeds=range(1, 21), levels=range(1, 11), timeout=10, save=False):
+    """
+    solves the legacy layouts of the given seeds at every level with the portfolio, checks every solution,
+    and prints the winning strategies and the median seconds of each level.
+    :param save: boolean, True to add the win counts to the wins file.
+    """
+    with PortfolioSolver(timeout=timeout) as portfolio:
+        for lvl in levels:
+            times = []
+            for seed in seeds:
+                layout = PuzzleLayout.PuzzleLayout.generate(seed, lvl)
+                result, winner = portfolio.solve(layout)
+                if winner is not None:
+                    assert KillerSolver.KillerSolver.from_layout(layout).is_solution(result.solution), (seed, lvl)
+                times.append(result.elapsed)
+            times.sort()
+            wins = sorted(portfolio.wins.get(lvl, {}).items(), key=lambda item: -item[1])
+            print(f"level {lvl}: median {times[len(times) // 2] * 1000:.1f}ms, max {times[-1] * 1000:.1f}ms, "
+                  f"wins {', '.join(f'{name} {count}' for name, count in wins)}")
+        for number, name, error in portfolio.errors:
+            print(f"puzzle {number}: {name} failed: {error}")
+        if save:
+            portfolio.save_wins()
+        return portfolio.get_wins()
+
+
+if __name__ == "__main__":
+    # python PortfolioSolver.py [first_seed last_seed] [save]
+    seed_range = range(int(sys.argv[1]), int(sys.argv[2]) + 1) if len(sys.argv) > 2 else range(1, 21)
+    run_batch(seed_range, save="save" in sys.argv)
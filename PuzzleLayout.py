@@ -0,0 +1,130 @@
+import math
+import BoardSolutionCreator
+import Houses
+import topology
+
+
+class PuzzleLayout:
+    """
+        the immutable puzzle of a board: its solution and its cages.
+        it holds only tuples, so it can be shared between boards, snapshots and threads.
+
+        Methods:
+            __init__ - initializes a layout.
+            from_houses - creates the layout of a generated solution and its cages.
+            generate - generates the layout of (seed, lvl) without creating a board.
+            to_bytes - returns the layout as bytes.
+            from_bytes - creates a layout from the bytes to_bytes returned.
+            get_cage_number - returns the number of the cage of the given cell.
+            get_known_cells - returns the places of the cells that belong to a cage with only 1 cell.
+    """
+    __slots__ = ('seed', 'lvl', 'solution', 'cages', 'cage_of', 'size')
+
+    def __init__(self, seed, lvl, solution, cages):
+        """
+        initializes a layout.
+        :param solution: tuple of the solution values, row by row (81 of them on the 9x9 grid).
+        :param cages: tuple of the cages in the order they were created,
+                      each cage is a tuple of (tuple of its cells' places, killer, color).
+        """
+        self.seed = seed
+        self.lvl = lvl
+        self.solution = tuple(solution)
+        self.cages = tuple((tuple(cells), killer, tuple(color)) for cells, killer, color in cages)
+        self.size = size = math.isqrt(len(self.solution))  # the size of the grid
+        cage_of = [0] * len(self.solution)
+        for number, (cells, _, _) in enumerate(self.cages):
+            for row, col in cells:
+                cage_of[row * size + col] = number
+        self.cage_of = tuple(cage_of)  # the number of the cage of each cell, by index
+
+    @classmethod
+    def from_houses(cls, seed, lvl, solution, all_houses):
+        """
+        creates the layout of a generated solution and its cages.
+        :param solution: BoardSolutionCreator, a filled solution.
+        :param all_houses: Houses, after set_cages.
+        """
+        values = [solution.get_cell(place) for place in all_houses.shape.places]
+        cages = [(cage.cells, cage.killer, cage.color) for cage in all_houses.reverse_cages]
+        return cls(seed, lvl, values, cages)
+
+    @classmethod
+    def generate(cls, seed, lvl, cage_mode='legacy', unique=False):
+        """
+        generates the layout of (seed, lvl) without creating a board: only the solution and the cages are made,
+        the same way Board makes them, so the layout is the same as Board(seed, lvl).get_layout().
+        :param cage_mode: string, how the cages are generated, see Houses.set_cages.
+        :param unique: boolean, if True the cages are repaired until the layout has one solution, within the node
+                       budget of UniquePuzzleGenerator. it is opt in: the repaired cages differ from the golden
+                       corpus, and the game plays the legacy layouts so every game number keeps its puzzle.
+        """
+        solution = BoardSolutionCreator.BoardSolutionCreator(seed)
+        solution.fill_board()
+        all_houses = Houses.Houses(seed)
+        all_houses.set_cages(lvl, solution, cage_mode)
+        layout = cls.from_houses(seed, lvl, solution, all_houses)
+        if unique:
+            import UniquePuzzleGenerator  # it generates its layouts with this class
+            layout, _ = UniquePuzzleGenerator.UniquePuzzleGenerator(cage_mode=cage_mode).make_unique(layout)
+        return layout
+
+    def to_bytes(self):
+        """
+        returns the layout as bytes: a "seed lvl" text line, the 81 solution values, and for every cage
+        its size, its cells' indexes, its killer and its color.
+        the layout of another grid size has "seed lvl size" in its first line, and the killers take two bytes.
+        """
+        size = self.size
+        header = f"{self.seed} {self.lvl}" if size == 9 else f"{self.seed} {self.lvl} {size}"
+        data = bytearray(f"{header}\n".encode())
+        data += bytes(self.solution)
+        for cells, killer, color in self.cages:
+            data.append(len(cells))
+            data += bytes(row * size + col for row, col in cells)
+            data += killer.to_bytes(1 if size == 9 else 2, "little")
+            data += bytes(color)
+        return bytes(data)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        creates a layout from the bytes to_bytes returned.
+        """
+        header_end = data.index(b"\n")
+        seed, lvl, *grid_size = (int(num) for num in data[:header_end].split())
+        grid_size = grid_size[0] if grid_size else 9
+        killer_bytes = 1 if grid_size == 9 else 2
+        places = topology.get_shape(*topology.BOX_SHAPES[grid_size]).places
+        pos = header_end + 1
+        solution = data[pos:pos + grid_size * grid_size]
+        pos += grid_size * grid_size
+        cages = []
+        while pos < len(data):
+            size = data[pos]
+            cells = [places[i] for i in data[pos + 1:pos + 1 + size]]
+            pos += 1 + size
+            killer = int.from_bytes(data[pos:pos + killer_bytes], "little")
+            color = tuple(data[pos + killer_bytes:pos + killer_bytes + 3])
+            pos += killer_bytes + 3
+            cages.append((cells, killer, color))
+        return cls(seed, lvl, solution, cages)
+
+    def get_cage_number(self, place):
+        """
+        returns the number of the cage of the given cell.
+        """
+        return self.cage_of[place[0] * self.size + place[1]]
+
+    def get_known_cells(self):
+        """
+        returns the places of the cells that belong to a cage with only 1 cell, in the order the cages were created.
+        """
+        return [cells[0] for cells, _, _ in self.cages if len(cells) == 1]
+
+    def __eq__(self, other):
+        return (isinstance(other, PuzzleLayout) and (self.seed, self.lvl, self.solution, self.cages) ==
+                (other.seed, other.lvl, other.solution, other.cages))
+
+    def __hash__(self):
+        return hash((self.seed, self.lvl, self.solution, self.cages))
@@ -12,11 +12,12 @@ class Row(House):
                         the first one is the row and the second one if the column of the selected cell.
                         all the house's cells places.
         get_all_values - returns a list of integers between 1 and 9, that are the house's cell values.
+        values_mask - returns a mask of the digits in the house.
         """
-    def __init__(self):
-        super().__init__()
-        self.size = 9
-        self.sum = 45
+    def __init__(self, size=9):
+        super().__init__(size, size)
+        self.size = size
+        self.sum = size * (size + 1) // 2  # 45 on a 9x9 grid
 
 
 
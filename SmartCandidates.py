@@ -0,0 +1,283 @@
+import random
+import statistics
+import time
+import KillerSolver
+import cage_combinations
+import topology
+
+BIT_COUNT = cage_combinations.BIT_COUNT
+LATENCY_BUDGET = 0.008  # the most seconds one keystroke (or one frame) may spend on propagation, half a frame at 60fps
+# no new work starts after this part of the budget, the rest is left for the house or the cage that is running
+TIME_SLICE = LATENCY_BUDGET / 2
+NUM_HOUSES = len(topology.HOUSE_INDEXES)
+
+
+class SmartCandidates:
+    """
+        the candidates of the cells by stronger rules than the cells' options, kept up to date move by move.
+
+        besides the digits of the houses and the cage combinations, the candidates are pruned by:
+            cage_combination - each cell keeps only the digits it holds in a complete filling of its cage (and of the
+                               45 rule's virtual cages), from the candidates of the cage's other cells.
+            naked singles - a cell with one candidate removes it from its peers.
+            hidden singles - a digit only one cell of a house can hold leaves that cell with it alone.
+            naked pairs - two cells of a house with the same two candidates remove them from the rest of the house.
+            hidden pairs - two digits only the same two cells of a house can hold leave those cells with them alone.
+
+        the work is a queue of the new singles and the houses and cages whose cells changed, so a move only examines
+        what it touched. a value the player adds only removes candidates, so the candidates so far stay true and
+        only the new value is propagated. erasing or changing a value can bring candidates back, so then they are
+        computed again from the values. the propagation stops when it used TIME_SLICE, and the rest of the queue
+        waits for the next call (the game calls step every frame), the candidates are true at every moment,
+        only weaker until the queue is empty.
+
+        Methods:
+            __init__ - initializes the candidates of a puzzle with no values.
+            update - sets the player's values and propagates them within the budget.
+            step - continues the propagation within the budget.
+            is_settled - returns True if nothing is left to propagate.
+            get_mask - returns the candidates mask of a cell.
+            get_options - returns the candidates of a cell.
+    """
+
+    def __init__(self, layout, time_slice=TIME_SLICE):
+        """
+        initializes the candidates of a puzzle with no values.
+        :param layout: PuzzleLayout, the puzzle.
+        :param time_slice: the seconds after which update and step don't start new work.
+        """
+        self.time_slice = time_slice
+        self.solver = KillerSolver.KillerSolver.from_layout(layout, sum_rules=True)
+        self.cages_of = [[] for _ in range(81)]  # the numbers of the real and the virtual cages of each cell
+        for number, (indexes, _, _) in enumerate(self.solver.cages):
+            for index in indexes:
+                self.cages_of[index].append(number)
+        self._initial = tuple(self.solver.initial_candidates())
+        self.values = [0] * 81
+        self.contradiction = False  # True if the player's values leave a cell or a cage with no candidates
+        self.resets = 0  # the number of times the candidates were computed again from the values
+        self._reset()
+
+    def update(self, values):
+        """
+        sets the player's values and propagates them within the budget.
+        :param values: a sequence of 81 values, row by row, 0 is an empty cell.
+        :return: boolean, True if the propagation ended, False if some of it waits for the next step.
+        """
+        old_values = self.values
+        added = []
+        for index, val in enumerate(values):
+            old = old_values[index]
+            if val != old:
+                if old:  # a value was erased or changed, the candidates it removed may come back
+                    self.values = list(values)
+                    self._reset()
+                    return self.step()
+                added.append(index)
+        for index in added:
+            old_values[index] = values[index]
+            bit = 1 << (values[index] - 1)
+            if self.cand[index] != bit:
+                self.cand[index] = bit
+                self._touch(index)
+        return self.step()
+
+    def step(self):
+        """
+        continues the propagation within the budget.
+        :return: boolean, True if the propagation ended.
+        """
+        deadline = time.perf_counter() + self.time_slice
+        singles = self._singles
+        units = self._units
+        while singles or units:
+            if time.perf_counter() > deadline:
+                return False
+            if singles:
+                self._remove_single(singles.pop())
+            else:
+                unit = units.pop()
+                if unit < NUM_HOUSES:
+                    self._prune_house(topology.HOUSE_INDEXES[unit])
+                else:
+                    self._prune_cage(unit - NUM_HOUSES)
+        return True
+
+    def is_settled(self):
+        """
+        returns True if nothing is left to propagate.
+        """
+        return not self._singles and not self._units
+
+    def get_mask(self, index):
+        """
+        returns the candidates mask of a cell, by its index. a cell with a value has its value's bit.
+        """
+        return self.cand[index]
+
+    def get_options(self, place):
+        """
+        returns the candidates of a cell, an empty list if the cell has a value.
+        :param place: tuple of two integers, the row and the column of the cell.
+        """
+        index = topology.index_of(place)
+        if self.values[index]:
+            return []
+        return cage_combinations.mask_to_list(self.cand[index])
+
+    def _reset(self):
+        """
+        computes the candidates again from the values: the cage combinations and the values, and queues every
+        house, cage and single.
+        """
+        self.resets += 1
+        self.contradiction = False
+        self.cand = list(self._initial)
+        for index, val in enumerate(self.values):
+            if val:
+                self.cand[index] = 1 << (val - 1)
+        self._singles = [index for index in range(81) if BIT_COUNT[self.cand[index]] == 1]
+        self._units = set(range(NUM_HOUSES + len(self.solver.cages)))
+
+    def _touch(self, index):
+        """
+        queues the work a change of the cell's candidates calls for: the cell itself if it became a single,
+        and its houses and cages.
+        """
+        m = self.cand[index]
+        if m == 0:
+            self.contradiction = True
+            return
+        if m & (m - 1) == 0:
+            self._singles.append(index)
+        self._units.update(topology.HOUSES_OF[index])
+        self._units.update(NUM_HOUSES + number for number in self.cages_of[index])
+
+    def _restrict(self, index, mask):
+        """
+        keeps only the given digits in an empty cell's candidates.
+        """
+        m = self.cand[index]
+        if m & ~mask and not self.values[index]:
+            self.cand[index] = m & mask
+            self._touch(index)
+
+    def _remove_single(self, index):
+        """
+        removes the digit of a cell with one candidate from its peers.
+        """
+        bit = self.cand[index]
+        if bit & (bit - 1):  # the cell got more candidates back since it was queued
+            return
+        for peer in self.solver.peers[index]:
+            if self.cand[peer] & bit:
+                self._restrict(peer, ~bit)
+
+    def _prune_cage(self, number):
+        """
+        keeps in each cell of a cage only the digits it holds in a complete filling of the cage.
+        """
+        indexes = self.solver.cages[number][0]
+        support = self.solver._cage_support(number, tuple(self.cand[i] for i in indexes))
+        if support is None:
+            self.contradiction = True
+            return
+        for index, mask in zip(indexes, support):
+            self._restrict(index, mask)
+
+    def _prune_house(self, house):
+        """
+        applies the hidden singles, the naked pairs and the hidden pairs of a house.
+        """
+        cand = self.cand
+        values = self.values
+        empty = []
+        placed = 0  # the digits that already have a value in the house
+        for i in house:
+            if values[i]:
+                placed |= 1 << (values[i] - 1)
+            else:
+                empty.append(i)
+        # the cells (as a mask of their positions in empty) that can hold each digit
+        spots = [0] * 9
+        for position, i in enumerate(empty):
+            m = cand[i]
+            while m:
+                bit = m & -m
+                m ^= bit
+                spots[bit.bit_length() - 1] |= 1 << position
+        pairs = {}
+        for digit, where in enumerate(spots):
+            if where == 0 or placed >> digit & 1:
+                continue
+            bit = 1 << digit
+            if where & (where - 1) == 0:  # hidden single
+                self._restrict(empty[where.bit_length() - 1], bit)
+            elif BIT_COUNT[where] == 2:
+                pairs[where] = pairs.get(where, 0) | bit
+        for where, digits in pairs.items():
+            if BIT_COUNT[digits] == 2:  # hidden pair: the two digits can only go in the same two cells
+                for position, i in enumerate(empty):
+                    if where >> position & 1:
+                        self._restrict(i, digits)
+        seen = {}
+        for i in empty:
+            m = cand[i]
+            if BIT_COUNT[m] != 2:
+                continue
+            if seen.get(m) is not None:  # naked pair: the two digits are in these two cells
+                first = seen[m]
+                for j in empty:
+                    if j != i and j != first:
+                        self._restrict(j, ~m)
+            else:
+                seen[m] = i
+
+
+def benchmark(seeds=range(1, 11), levels=(3, 6, 9), erase_every=7):
+    """
+    plays the solutions of boards in a random order, sometimes erasing a value, and measures how long each keystroke
+    spends on the propagation, how many keystrokes left work for the next frames, and how many candidates are left
+    compared with the cells' options. checks the true value of every cell is always one of its candidates.
+    """
+    import Board
+    for lvl in levels:
+        latencies, left_over, smart_total, base_total, resets = [], 0, 0, 0, 0
+        for seed in seeds:
+            board = Board.Board(seed, lvl)
+            layout = board.get_layout()
+            smart = SmartCandidates(layout)
+            smart.update(board.snapshot().get_values())
+            while not smart.step():
+                pass
+            rng = random.Random(seed)
+            order = [place for place in topology.PLACES if place not in board.known_cells]
+            rng.shuffle(order)
+            for move, place in enumerate(order):
+                if move % erase_every == erase_every - 1:
+                    board.set_cells_value(order[rng.randrange(move)], 0)
+                board.set_cells_value(place, board.get_cell(place).true_value)
+                start = time.perf_counter()
+                settled = smart.update(board.snapshot().get_values())
+                latencies.append(time.perf_counter() - start)
+                left_over += not settled
+                while not smart.step():  # the frames that follow finish the work
+                    pass
+                for index, place_ in enumerate(topology.PLACES):
+                    if board.get_cell_value(place_):
+                        continue
+                    mask = smart.get_mask(index)
+                    assert mask >> (layout.solution[index] - 1) & 1, (seed, lvl, place_)
+                    smart_total += BIT_COUNT[mask]
+                    base_total += len(board.get_cell(place_).get_options())
+            resets += smart.resets
+        latencies.sort()
+        print(f"level {lvl}: keystroke propagation median {statistics.median(latencies) * 1000:.2f}ms, "
+              f"99th percentile {latencies[len(latencies) * 99 // 100] * 1000:.2f}ms, "
+              f"max {latencies[-1] * 1000:.2f}ms (budget {LATENCY_BUDGET * 1000:.0f}ms), "
+              f"{left_over} of {len(latencies)} keystrokes left work for the next frames, {resets} resets, "
+              f"candidates {base_total} -> {smart_total}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,127 @@
+import random
+import sys
+
+_rng = random.Random(81)
+# a random 64-bit number for every (cell index, candidates mask), the key of a state is the xor of its cells' numbers
+ZOBRIST = tuple(tuple(_rng.getrandbits(64) for _ in range(512)) for _ in range(81))
+ENTRY_BYTES = 104  # about what one entry costs: its share of the dictionary, and the key (a 64-bit int object)
+
+
+class TranspositionTable:
+    """
+        a bounded cache of search results, by the Zobrist key of the search state.
+
+        the solver stores how many solutions the subtree under a state has once it searched all of it (0 is a dead
+        end), and when the same state comes back through another branch order it adds the count instead of
+        searching again. the solver mixes its cages into the keys, so one table can be shared by many layouts.
+        the table holds at most max_bytes / ENTRY_BYTES entries: when it's full, the oldest quarter of the entries
+        is dropped (a dictionary keeps the order the entries were added in).
+
+        Methods:
+            __init__ - initializes a table.
+            get - returns the stored count of a key, or None.
+            put - stores the count of a key.
+            clear - removes every entry and resets the statistics.
+            hit_rate - returns the fraction of the lookups that found an entry.
+            memory_usage - returns the bytes the table uses.
+            report - returns a line of the table's statistics.
+    """
+
+    def __init__(self, max_bytes=8 * 1024 * 1024):
+        """
+        initializes a table.
+        :param max_bytes: the memory cap of the table.
+        """
+        self.max_bytes = max_bytes
+        self.max_entries = max(max_bytes // ENTRY_BYTES, 16)
+        self.entries = {}  # key -> solution count of the subtree
+        self.hits = 0
+        self.dead_end_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        returns the stored count of a key, or None.
+        """
+        count = self.entries.get(key)
+        if count is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            if count == 0:
+                self.dead_end_hits += 1
+        return count
+
+    def put(self, key, count):
+        """
+        stores the count of a key, and drops the oldest quarter of the entries if the table is full.
+        """
+        entries = self.entries
+        if len(entries) >= self.max_entries:
+            drop = len(entries) // 4
+            for old in list(entries)[:drop]:  # the oldest keys come first
+                del entries[old]
+            self.evictions += drop
+        entries[key] = count
+        self.stores += 1
+
+    def clear(self):
+        """
+        removes every entry and resets the statistics.
+        """
+        self.entries = {}
+        self.hits = self.dead_end_hits = self.misses = self.stores = self.evictions = 0
+
+    def hit_rate(self):
+        """
+        returns the fraction of the lookups that found an entry.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def memory_usage(self):
+        """
+        returns the bytes the table uses: the dictionary and its keys (the counts are small cached ints).
+        """
+        return sys.getsizeof(self.entries) + sum(sys.getsizeof(key) for key in self.entries)
+
+    def report(self):
+        """
+        returns a line of the table's statistics.
+        """
+        return (f"{len(self.entries)} entries, {self.memory_usage() / 1024:.0f}KB of {self.max_bytes / 1024:.0f}KB, "
+                f"hit rate {self.hit_rate() * 100:.1f}% ({self.dead_end_hits} dead ends), "
+                f"{self.stores} stored, {self.evictions} evicted")
+
+
+def benchmark(seeds=range(1, 11), levels=range(6, 11), timeout=10, max_bytes=8 * 1024 * 1024):
+    """
+    counts the solutions (up to two) of the legacy layouts of the given seeds with and without a table, checks
+    both counts are the same, and prints the search nodes, the times and the table's statistics of each level.
+    """
+    import KillerSolver
+    import PuzzleLayout
+    for lvl in levels:
+        table = TranspositionTable(max_bytes)
+        plain_nodes = cached_nodes = 0
+        plain_time = cached_time = 0.0
+        peak = 0
+        for seed in seeds:
+            layout = PuzzleLayout.PuzzleLayout.generate(seed, lvl)
+            plain = KillerSolver.KillerSolver.from_layout(layout, timeout=timeout).count_solutions(2)
+            cached = KillerSolver.KillerSolver.from_layout(layout, timeout=timeout).count_solutions(2, table)
+            if 'timeout' not in (plain.status, cached.status):
+                assert plain.count == cached.count, (seed, lvl)
+            plain_nodes += plain.nodes
+            cached_nodes += cached.nodes
+            plain_time += plain.elapsed
+            cached_time += cached.elapsed
+            peak = max(peak, table.memory_usage())
+        print(f"level {lvl}: nodes {plain_nodes} -> {cached_nodes}, {plain_time:.1f}s -> {cached_time:.1f}s, "
+              f"peak {peak / 1024:.0f}KB, {table.report()}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,260 @@
+import statistics
+import time
+import Houses
+import KillerSolver
+import PuzzleLayout
+import topology
+
+NODE_BUDGET = 512  # the search nodes counting one puzzle may take, about 2 seconds
+MIN_COUNT_NODES = 64  # below this many nodes left, the last count gets all of them
+
+
+class UniquePuzzleGenerator:
+    """
+        generates puzzles that have exactly one solution.
+
+        the cages are generated as usual, and then the solutions are counted, stopping at two. while there is a
+        second solution, the cages are repaired so the second solution breaks one of them, and the layout's
+        solution still fits them all:
+            split - a cage holding a cell where the two solutions differ is split in two connected parts, each
+                    with its own killer, if the second solution doesn't fill a part with its killer.
+            merge - two adjacent cages become one, if the second solution repeats a digit in them.
+            single - a cell where the two solutions differ is split off its cage, its killer is its digit.
+        the first one that rules the second solution out is made, the last one always does, so every repair
+        removes the solution it was made for. the counts of a puzzle share a budget of search nodes, and a count gets
+        half of the nodes that are left: if it runs out, the largest cage is split, which makes the next count
+        faster. the budget is counted in nodes and not in seconds, so a (seed, lvl) gets the same puzzle on every
+        machine.
+
+        Methods:
+            __init__ - initializes a generator.
+            generate - generates a unique puzzle for (seed, lvl).
+            make_unique - repairs a layout until it has one solution or the node budget runs out.
+            split_cage - splits a cage of a layout in two connected parts.
+            merge_cages - merges two adjacent cages of a layout.
+            rules_out - returns True if a solution breaks one of a layout's cages.
+    """
+
+    def __init__(self, node_budget=NODE_BUDGET, cage_mode='legacy'):
+        """
+        initializes a generator.
+        :param node_budget: the most search nodes counting the solutions of one puzzle may take.
+        :param cage_mode: string, how the cages are generated first, see Houses.set_cages.
+        """
+        self.node_budget = node_budget
+        self.cage_mode = cage_mode
+
+    def generate(self, seed, lvl):
+        """
+        generates a unique puzzle for (seed, lvl).
+        :return: (PuzzleLayout, dictionary of statistics), the statistics are 'unique' (True, or False if the
+                 budget ran out first), 'repairs' (the number of repairs, and of the cages split because a count
+                 ran out of nodes), 'merges' (how many of the repairs were merges), 'was_unique', 'nodes' and
+                 'seconds' (measured only, it doesn't change the puzzle).
+        """
+        layout = PuzzleLayout.PuzzleLayout.generate(seed, lvl, self.cage_mode)
+        return self.make_unique(layout)
+
+    def make_unique(self, layout):
+        """
+        repairs a layout until it has one solution or the node budget runs out.
+        :return: (PuzzleLayout, dictionary of statistics), see generate.
+        """
+        start = time.perf_counter()
+        nodes = repairs = merges = 0
+        was_unique = None
+        unique = False
+        while True:
+            remaining = self.node_budget - nodes
+            if remaining <= 0:
+                break
+            # a count gets half of the nodes that are left, so a layout that is too slow to count can still be narrowed
+            max_nodes = remaining // 2 if remaining > MIN_COUNT_NODES else remaining
+            solver = KillerSolver.KillerSolver.from_layout(layout, max_nodes=max_nodes, sum_rules=True)
+            result = solver.count_solutions(2)
+            nodes += max(result.nodes, 1)
+            if result.status == 'node_limit':
+                # smaller cages cut the search, the largest cage is split and the count starts again
+                layout = self._narrow(layout)
+                repairs += 1
+                continue
+            if was_unique is None:
+                was_unique = result.count == 1
+            if result.count == 1:
+                unique = True
+                break
+            # the layout's own solution is always one of the two, the repair rules out the other one
+            other = next(solution for solution in result.solutions if solution != layout.solution)
+            layout, kind = self._repair(layout, other)
+            repairs += 1
+            merges += kind == 'merge'
+        return layout, {'unique': unique, 'was_unique': was_unique, 'repairs': repairs, 'merges': merges,
+                        'nodes': nodes, 'seconds': time.perf_counter() - start}
+
+    def _narrow(self, layout):
+        """
+        splits the largest cage of a layout in two, when the solutions couldn't be counted within the nodes.
+        """
+        number = max(range(len(layout.cages)), key=lambda n: (len(layout.cages[n][0]), -n))
+        cells = layout.cages[number][0]
+        return self.split_cage(layout, number, min(cells)) if len(cells) > 1 else layout
+
+    def _repair(self, layout, other):
+        """
+        repairs the cages so the other solution breaks one of them: a split of the largest cages first, then the
+        merge into the smallest cage, and at last a single cell split off its cage.
+        :param other: tuple of the values of a solution of the layout that isn't the layout's solution.
+        :return: (a new PuzzleLayout, 'split', 'merge' or 'single').
+        """
+        solution = layout.solution
+        differing = {topology.PLACES[i] for i in range(81) if other[i] != solution[i]}
+        # the givens are the same in both solutions, so every differing cell is in a cage of two cells or more
+        numbers = sorted((number for number, (cells, _, _) in enumerate(layout.cages) if differing.intersection(cells)),
+                         key=lambda number: -len(layout.cages[number][0]))
+        for number in numbers:
+            for cell in sorted(differing.intersection(layout.cages[number][0])):
+                repaired = self.split_cage(layout, number, cell)
+                if self.rules_out(repaired, other):
+                    return repaired, 'split'
+        merges = []
+        for number in numbers:
+            cells = layout.cages[number][0]
+            neighbors = {layout.cage_of[neighbor] for place in cells
+                         for neighbor in topology.ORTHOGONAL_NEIGHBORS[topology.index_of(place)]}
+            for neighbor in neighbors - {number}:
+                merged = cells + layout.cages[neighbor][0]
+                if len(merged) > 9:
+                    continue
+                values = [solution[topology.index_of(place)] for place in merged]
+                other_values = {other[topology.index_of(place)] for place in merged}
+                if len(set(values)) == len(merged) and len(other_values) < len(merged):
+                    merges.append((len(merged), number, neighbor))
+        if merges:
+            _, number, neighbor = min(merges)
+            return self.merge_cages(layout, number, neighbor), 'merge'
+        number = numbers[0]
+        return self.split_cage(layout, number, min(differing.intersection(layout.cages[number][0])), 1), 'single'
+
+    @staticmethod
+    def rules_out(layout, other):
+        """
+        returns True if a solution breaks one of a layout's cages: a cage's cells don't sum to its killer,
+        or repeat a digit.
+        :param other: tuple of the values of all the cells, row by row.
+        """
+        for cells, killer, _ in layout.cages:
+            values = [other[topology.index_of(place)] for place in cells]
+            if sum(values) != killer or len(set(values)) != len(values):
+                return True
+        return False
+
+    def split_cage(self, layout, number, cell, part_size=None):
+        """
+        splits a cage of a layout in two connected parts: one grown from the given cell to part_size cells,
+        and the rest (which becomes several cages if it isn't connected).
+        the first part keeps the cage's place in the order and its color, the other parts are added at the end.
+        :param part_size: the number of cells of the part grown from the cell, None for half the cage's size.
+        :return: a new PuzzleLayout.
+        """
+        cells, _, color = layout.cages[number]
+        if part_size is None:
+            part_size = len(cells) // 2
+        cage_cells = set(cells)
+        part = [cell]
+        for current in part:  # grow the part breadth first inside the cage
+            if len(part) >= part_size:
+                break
+            for neighbor in topology.ORTHOGONAL_NEIGHBORS[topology.index_of(current)]:
+                place = topology.PLACES[neighbor]
+                if place in cage_cells and place not in part and len(part) < part_size:
+                    part.append(place)
+        rest = cage_cells - set(part)
+        pieces = [part] + self._connected_pieces(rest)
+        solution = layout.solution
+        used_colors = {cage_color for _, _, cage_color in layout.cages}
+        free_colors = [c for c in Houses.ALL_COLORS if c not in used_colors] or list(Houses.ALL_COLORS)
+        cages = list(layout.cages)
+        for i, piece in enumerate(pieces):
+            killer = sum(solution[topology.index_of(place)] for place in piece)
+            if len(piece) == 1:
+                piece_color = (255, 255, 255)
+            elif i == 0:
+                piece_color = color
+            else:
+                piece_color = free_colors[(number + i) % len(free_colors)]
+            piece = sorted(piece)
+            if i == 0:
+                cages[number] = (piece, killer, piece_color)
+            else:
+                cages.append((piece, killer, piece_color))
+        return PuzzleLayout.PuzzleLayout(layout.seed, layout.lvl, layout.solution, cages)
+
+    def merge_cages(self, layout, first, second):
+        """
+        merges two adjacent cages of a layout into one, its killer is the sum of their killers.
+        the merged cage keeps the first cage's place in the order and its color (a color if the first was a single
+        cell), the second cage is removed.
+        :return: a new PuzzleLayout.
+        """
+        first_cells, first_killer, color = layout.cages[first]
+        second_cells, second_killer, second_color = layout.cages[second]
+        if len(first_cells) == 1:
+            color = second_color
+        if color == (255, 255, 255):  # two single cells, a cage of two needs a color
+            used_colors = {cage_color for _, _, cage_color in layout.cages}
+            color = next((c for c in Houses.ALL_COLORS if c not in used_colors), Houses.ALL_COLORS[first % len(Houses.ALL_COLORS)])
+        cages = list(layout.cages)
+        cages[first] = (sorted(first_cells + second_cells), first_killer + second_killer, color)
+        del cages[second]
+        return PuzzleLayout.PuzzleLayout(layout.seed, layout.lvl, layout.solution, cages)
+
+    @staticmethod
+    def _connected_pieces(cells):
+        """
+        returns the orthogonally connected groups of the given places.
+        """
+        left = set(cells)
+        pieces = []
+        while left:
+            start = min(left)
+            piece = [start]
+            left.discard(start)
+            for current in piece:
+                for neighbor in topology.ORTHOGONAL_NEIGHBORS[topology.index_of(current)]:
+                    place = topology.PLACES[neighbor]
+                    if place in left:
+                        left.discard(place)
+                        piece.append(place)
+            pieces.append(piece)
+        return pieces
+
+
+def report(seeds=range(1, 21), levels=range(1, 11), node_budget=NODE_BUDGET):
+    """
+    prints, for each level, how many legacy puzzles were already unique, how many are unique after the repairs,
+    the mean number of repairs and the median and maximum seconds the uniqueness check and repairs added.
+    """
+    generator = UniquePuzzleGenerator(node_budget)
+    results = {}
+    for lvl in levels:
+        before = after = repairs = merges = 0
+        times = []
+        for seed in seeds:
+            layout, stats = generator.generate(seed, lvl)
+            before += bool(stats['was_unique'])
+            after += stats['unique']
+            repairs += stats['repairs']
+            merges += stats['merges']
+            times.append(stats['seconds'])
+            if stats['unique']:
+                assert KillerSolver.KillerSolver.from_layout(layout).solve().solution == layout.solution, (seed, lvl)
+        results[lvl] = (before / len(seeds), after / len(seeds), statistics.median(times), max(times))
+        print(f"level {lvl}: unique before {before}/{len(seeds)}, after {after}/{len(seeds)}, "
+              f"{repairs / len(seeds):.1f} repairs ({merges} merges), "
+              f"added median {statistics.median(times) * 1000:.0f}ms, "
+              f"max {max(times) * 1000:.0f}ms")
+    return results
+
+
+if __name__ == "__main__":
+    report()
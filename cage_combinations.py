@@ -0,0 +1,398 @@
+"""
+precomputed killer cage combinations.
+
+every group of distinct digits between 1 and 9 is stored once as a 9-bit mask, where bit (d - 1) stands for digit d,
+and grouped by its (sum, size). the tables are built once at import, so finding the options of a cage and filtering
+them by the digits that were already placed in it are a few integer operations instead of a recursion and list scans.
+
+Functions:
+    digit_bit - returns the mask of a single digit.
+    values_to_mask - returns the mask of a list of digits, zeros (empty cells) are ignored.
+    mask_to_digits - returns the sorted digits of a mask as a tuple.
+    mask_to_list - returns the sorted digits of a mask as a shared, read only list.
+    get_combinations - returns all the combination masks of the given sum and size.
+    must_contain - returns the mask of the digits that appear in every combination of the given sum and size.
+    can_contain - returns the mask of the digits that appear in at least one combination of the given sum and size.
+    filter_combinations - returns the combination masks that contain all the placed digits.
+    options_mask - returns the union of the combinations that contain all the placed digits.
+    get_options - returns the combinations that contain all the placed digits as lists of digits.
+    get_table - returns the CombinationTable of the digits 1 to max_digit, for the grids of other sizes.
+    benchmark - compares the table lookups against the recursive cage options.
+"""
+from itertools import combinations
+import time
+
+ALL_DIGITS = 0b111111111
+
+# DIGITS_OF_MASK[mask] is the tuple of the digits in the mask, BIT_COUNT[mask] is the number of digits in it
+DIGITS_OF_MASK = tuple(tuple(d for d in range(1, 10) if mask >> (d - 1) & 1) for mask in range(ALL_DIGITS + 1))
+BIT_COUNT = tuple(len(digits) for digits in DIGITS_OF_MASK)
+# the same digits as shared lists, for callers that show them (the lists must not be changed)
+DIGIT_LISTS = tuple(list(digits) for digits in DIGITS_OF_MASK)
+
+COMBINATIONS = {}  # (sum, size) -> tuple of masks, in the same lexicographic order the cage options are shown in
+MUST_CONTAIN = {}  # (sum, size) -> the digits every combination has
+CAN_CONTAIN = {}  # (sum, size) -> the digits at least one combination has
+
+
+def _build_tables():
+    """
+    fills the combination tables for every size between 1 and 9.
+    """
+    for size in range(1, 10):
+        for digits in combinations(range(1, 10), size):
+            mask = 0
+            for d in digits:
+                mask |= 1 << (d - 1)
+            COMBINATIONS.setdefault((sum(digits), size), []).append(mask)
+    for key, masks in COMBINATIONS.items():
+        COMBINATIONS[key] = tuple(masks)
+        must, can = ALL_DIGITS, 0
+        for mask in masks:
+            must &= mask
+            can |= mask
+        MUST_CONTAIN[key] = must
+        CAN_CONTAIN[key] = can
+
+
+_build_tables()
+
+# (sum, size, placed mask) -> the filtered options as lists, shared between all the cages with the same key.
+# the lists are read only, callers should copy them before changing them.
+_options_cache = {}
+
+
+def digit_bit(digit):
+    """
+    returns the mask of a single digit.
+    :param digit: integer between 1 and 9.
+    """
+    return 1 << (digit - 1)
+
+
+def values_to_mask(values):
+    """
+    returns the mask of a list of digits, zeros (empty cells) are ignored.
+    :param values: list of integers between 0 and 9.
+    """
+    mask = 0
+    for val in values:
+        if val:
+            mask |= 1 << (val - 1)
+    return mask
+
+
+def mask_to_digits(mask):
+    """
+    returns the sorted digits of a mask as a tuple.
+    """
+    return DIGITS_OF_MASK[mask]
+
+
+def mask_to_list(mask):
+    """
+    returns the sorted digits of a mask as a shared, read only list.
+    """
+    return DIGIT_LISTS[mask]
+
+
+def get_combinations(total, size):
+    """
+    returns all the combination masks of the given sum and size.
+    :param total: integer, the killer number of the cage.
+    :param size: integer, the number of cells in the cage.
+    :return: tuple of integers, empty if there isn't any combination.
+    """
+    return COMBINATIONS.get((total, size), ())
+
+
+def must_contain(total, size):
+    """
+    returns the mask of the digits that appear in every combination of the given sum and size.
+    """
+    return MUST_CONTAIN.get((total, size), 0)
+
+
+def can_contain(total, size):
+    """
+    returns the mask of the digits that appear in at least one combination of the given sum and size.
+    """
+    return CAN_CONTAIN.get((total, size), 0)
+
+
+def filter_combinations(total, size, placed_mask):
+    """
+    returns the combination masks that contain all the placed digits.
+    :param placed_mask: integer, the mask of the digits already placed in the cage.
+    """
+    combos = COMBINATIONS.get((total, size), ())
+    if not placed_mask:
+        return combos
+    return tuple(mask for mask in combos if mask & placed_mask == placed_mask)
+
+
+def options_mask(total, size, placed_mask=0):
+    """
+    returns the union of the combinations that contain all the placed digits.
+    """
+    if not placed_mask:
+        return CAN_CONTAIN.get((total, size), 0)
+    result = 0
+    for mask in COMBINATIONS.get((total, size), ()):
+        if mask & placed_mask == placed_mask:
+            result |= mask
+    return result
+
+
+def get_options(total, size, placed_mask=0):
+    """
+    returns the combinations that contain all the placed digits as lists of digits.
+    the returned lists are shared and must not be changed.
+    """
+    key = (total, size, placed_mask)
+    options = _options_cache.get(key)
+    if options is None:
+        options = [list(DIGITS_OF_MASK[mask]) for mask in filter_combinations(total, size, placed_mask)]
+        _options_cache[key] = options
+    return options
+
+
+class CombinationTable:
+    """
+        the same tables and lookups as the module functions, for the digits 1 to max_digit (16 on a 16x16 grid).
+        the masks have max_digit bits. there are 2 ** max_digit groups of digits, so the combinations of each cage
+        size are built the first time a cage of that size asks for them, and the digits of a mask are cached.
+        the table of 9 digits uses the module tables.
+
+        Methods:
+            __init__ - initializes a table.
+            get_combinations - returns all the combination masks of the given sum and size.
+            must_contain - returns the mask of the digits every combination of the given sum and size has.
+            can_contain - returns the mask of the digits at least one combination of the given sum and size has.
+            filter_combinations - returns the combination masks that contain all the placed digits.
+            options_mask - returns the union of the combinations that contain all the placed digits.
+            get_options - returns the combinations that contain all the placed digits as lists of digits.
+            mask_to_digits - returns the sorted digits of a mask as a tuple.
+            mask_to_list - returns the sorted digits of a mask as a shared, read only list.
+    """
+
+    def __init__(self, max_digit):
+        """
+        initializes a table.
+        :param max_digit: the largest digit, the size of the grid.
+        """
+        self.max_digit = max_digit
+        self.all_digits = (1 << max_digit) - 1
+        if max_digit == 9:
+            self.combinations, self.must, self.can = COMBINATIONS, MUST_CONTAIN, CAN_CONTAIN
+            self.built_sizes = set(range(1, 10))
+        else:
+            self.combinations, self.must, self.can = {}, {}, {}
+            self.built_sizes = set()
+        self._options_cache = {}
+        self._lists = {}
+
+    def _build_size(self, size):
+        """
+        adds the combinations of one cage size to the tables.
+        """
+        self.built_sizes.add(size)
+        if not 1 <= size <= self.max_digit:
+            return
+        added = {}
+        for digits in combinations(range(1, self.max_digit + 1), size):
+            mask = 0
+            for d in digits:
+                mask |= 1 << (d - 1)
+            added.setdefault(sum(digits), []).append(mask)
+        for total, masks in added.items():
+            must, can = self.all_digits, 0
+            for mask in masks:
+                must &= mask
+                can |= mask
+            self.combinations[(total, size)] = tuple(masks)
+            self.must[(total, size)] = must
+            self.can[(total, size)] = can
+
+    def get_combinations(self, total, size):
+        """
+        returns all the combination masks of the given sum and size, an empty tuple if there isn't any.
+        """
+        if size not in self.built_sizes:
+            self._build_size(size)
+        return self.combinations.get((total, size), ())
+
+    def must_contain(self, total, size):
+        """
+        returns the mask of the digits every combination of the given sum and size has.
+        """
+        if size not in self.built_sizes:
+            self._build_size(size)
+        return self.must.get((total, size), 0)
+
+    def can_contain(self, total, size):
+        """
+        returns the mask of the digits at least one combination of the given sum and size has.
+        """
+        if size not in self.built_sizes:
+            self._build_size(size)
+        return self.can.get((total, size), 0)
+
+    def filter_combinations(self, total, size, placed_mask):
+        """
+        returns the combination masks that contain all the placed digits.
+        """
+        combos = self.get_combinations(total, size)
+        if not placed_mask:
+            return combos
+        return tuple(mask for mask in combos if mask & placed_mask == placed_mask)
+
+    def options_mask(self, total, size, placed_mask=0):
+        """
+        returns the union of the combinations that contain all the placed digits.
+        """
+        if not placed_mask:
+            return self.can_contain(total, size)
+        result = 0
+        for mask in self.get_combinations(total, size):
+            if mask & placed_mask == placed_mask:
+                result |= mask
+        return result
+
+    def get_options(self, total, size, placed_mask=0):
+        """
+        returns the combinations that contain all the placed digits as lists of digits.
+        the returned lists are shared and must not be changed.
+        """
+        key = (total, size, placed_mask)
+        options = self._options_cache.get(key)
+        if options is None:
+            options = [list(self.mask_to_digits(mask)) for mask in self.filter_combinations(total, size, placed_mask)]
+            self._options_cache[key] = options
+        return options
+
+    def mask_to_digits(self, mask):
+        """
+        returns the sorted digits of a mask as a tuple.
+        """
+        return tuple(self.mask_to_list(mask))
+
+    def mask_to_list(self, mask):
+        """
+        returns the sorted digits of a mask as a shared, read only list.
+        """
+        digits = self._lists.get(mask)
+        if digits is None:
+            digits = self._lists[mask] = [d for d in range(1, self.max_digit + 1) if mask >> (d - 1) & 1]
+        return digits
+
+
+_tables = {}
+
+
+def get_table(max_digit=9):
+    """
+    returns the CombinationTable of the digits 1 to max_digit, each table is created once and shared.
+    """
+    table = _tables.get(max_digit)
+    if table is None:
+        table = _tables[max_digit] = CombinationTable(max_digit)
+    return table
+
+
+def _legacy_options(killer, size):
+    """
+    the recursive search the cages used to run to find their options, kept for the benchmark.
+    """
+    cage_options = []
+
+    def rec_helper(temp_result, i):
+        if sum(temp_result) == killer and len(temp_result) == size:
+            cage_options.append(temp_result)
+            return
+        if sum(temp_result) > killer or len(temp_result) > size:
+            return
+        if len(temp_result) == size:
+            return
+        if i == 10:
+            return
+        rec_helper(temp_result + [i], i + 1)
+        rec_helper(temp_result, i + 1)
+
+    rec_helper([], 1)
+    return cage_options
+
+
+def _legacy_filter(all_options, values):
+    """
+    the list scan the cages used to run to filter their options by the placed values, kept for the benchmark.
+    """
+    new_options = []
+    for option in all_options:
+        all_values = True
+        for val in values:
+            if val not in option:
+                all_values = False
+                break
+        if all_values:
+            new_options.append(option)
+    return new_options
+
+
+def benchmark(repeats=3):
+    """
+    compares the table lookups against the recursive cage options and the list scan filter,
+    and checks both return the same options.
+    """
+    keys = sorted(COMBINATIONS)
+    placed = [[], [1], [5], [9], [2, 7], [1, 2, 3]]
+
+    for key in keys:
+        total, size = key
+        legacy = _legacy_options(total, size)
+        assert legacy == get_options(total, size), key
+        for values in placed:
+            assert _legacy_filter(legacy, values) == get_options(total, size, values_to_mask(values)), (key, values)
+
+    def timed(func):
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def legacy_build():
+        for total, size in keys:
+            _legacy_options(total, size)
+
+    def table_build():
+        for total, size in keys:
+            get_options(total, size)
+
+    legacy_all = {key: _legacy_options(*key) for key in keys}
+
+    def legacy_filter():
+        for key in keys:
+            for values in placed:
+                _legacy_filter(legacy_all[key], values)
+
+    placed_masks = [values_to_mask(values) for values in placed]
+
+    def table_filter():
+        for total, size in keys:
+            for mask in placed_masks:
+                get_options(total, size, mask)
+
+    results = {
+        'build': (timed(legacy_build), timed(table_build)),
+        'filter': (timed(legacy_filter), timed(table_filter)),
+    }
+    for name, (legacy_time, table_time) in results.items():
+        print(f"{name}: recursion/scan {legacy_time * 1000:.2f}ms, table {table_time * 1000:.3f}ms, "
+              f"x{legacy_time / max(table_time, 1e-9):.0f}")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,143 @@
+"""
+a scan of the generator over a range of game numbers and levels, to find the seeds that generate slowly and to see
+how the cages the levels get compare with the sizes Houses.LVL_CAGES_DICT draws them from.
+
+every board is generated the way PuzzleLayout.generate makes it (the solution and the cages), and the scan records
+for each (seed, level): the seconds it took, the backtracks of BoardSolutionCreator.fill_board, the number of cages
+of each size, the cages Houses.set_cages closed before they reached the size it drew (truncated), and the single
+cell cages (the known cells). the seeds are split between processes.
+
+the report is a plain text table, one line per level, and the seeds that backtrack the most, so the reports of two
+releases can be compared with diff: it is the same on every run. the times are different on every run, so they are
+kept out of the report, in a timings section of their own (the generation times of every level and the slowest boards).
+
+usage:
+    python corpus_scan.py [first_seed last_seed [processes]]  - scans the seeds with levels 1 to 10 and prints
+                                                               the report (the menu's seeds by default), the
+                                                               timings are printed to stderr.
+
+Functions:
+    scan_board - generates one board and returns what the scan records about it.
+    scan - scans seeds and levels in parallel processes.
+    format_report - returns the report of a scan as text.
+    format_timings - returns the generation times of a scan as text.
+"""
+import multiprocessing
+import statistics
+import sys
+import time
+import BoardSolutionCreator
+import Houses
+
+SEEDS = range(1, 1001)  # the game numbers the menu picks from
+LEVELS = range(1, 11)
+MAX_CAGE_SIZE = len(Houses.LVL_CAGES_DICT[1])
+
+
+def scan_board(seed, lvl):
+    """
+    generates one board and returns what the scan records about it.
+    :return: tuple of the seed, the level, the seconds the generation took, the backtracks of the solution's fill,
+             a tuple of the number of cages of each size (1 to MAX_CAGE_SIZE), and the number of truncated cages.
+    """
+    start = time.perf_counter()
+    solution = BoardSolutionCreator.BoardSolutionCreator(seed)
+    solution.fill_board()
+    all_houses = Houses.Houses(seed)
+    all_houses.set_cages(lvl, solution)
+    seconds = time.perf_counter() - start
+    sizes = [0] * MAX_CAGE_SIZE
+    for cells in all_houses.reverse_cages.values():
+        sizes[len(cells) - 1] += 1
+    return seed, lvl, seconds, solution.backtracks, tuple(sizes), all_houses.truncated_cages
+
+
+def _scan_seed(task):
+    """
+    scans one seed with every level, the work of one process.
+    :param task: tuple of the seed and the levels.
+    """
+    seed, levels = task
+    return [scan_board(seed, lvl) for lvl in levels]
+
+
+def scan(seeds=SEEDS, levels=LEVELS, processes=None):
+    """
+    scans seeds and levels in parallel processes.
+    :param processes: the number of processes, None for one per cpu.
+    :return: a list of the records of scan_board, sorted by seed and level.
+    """
+    levels = list(levels)
+    tasks = [(seed, levels) for seed in seeds]
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.imap_unordered(_scan_seed, tasks, chunksize=max(1, len(tasks) // (8 * (processes or 4))))
+        records = [record for result in results for record in result]
+    records.sort(key=lambda record: (record[0], record[1]))
+    return records
+
+
+def format_report(records, slowest=10):
+    """
+    returns the report of a scan as text: a line per level, the cage sizes of every level against their target and
+    the seeds that backtrack the most. it has no times, so it is the same on every run.
+    :param records: the list scan returned.
+    :param slowest: the number of seeds that backtrack the most to list.
+    """
+    by_level = {}
+    for record in records:
+        by_level.setdefault(record[1], []).append(record)
+    seeds = sorted({record[0] for record in records})
+    lines = [f"# corpus scan: seeds {seeds[0]}-{seeds[-1]}, levels {min(by_level)}-{max(by_level)}, "
+             f"{len(records)} boards",
+             "# lvl boards backtracks(avg max) cages(avg) truncated(avg max) singles(avg max)"]
+    for lvl, level_records in sorted(by_level.items()):
+        backtracks = [record[3] for record in level_records]
+        cages = [sum(record[4]) for record in level_records]
+        truncated = [record[5] for record in level_records]
+        singles = [record[4][0] for record in level_records]
+        lines.append(f"{lvl:5} {len(level_records):6} {statistics.mean(backtracks):10.1f} {max(backtracks):4} "
+                     f"{statistics.mean(cages):10.1f} {statistics.mean(truncated):14.1f} {max(truncated):4} "
+                     f"{statistics.mean(singles):12.1f} {max(singles):4}")
+
+    lines.append("# cage sizes 1-9, percent of the cages: the target is the weights of LVL_CAGES_DICT")
+    for lvl, level_records in sorted(by_level.items()):
+        weights = Houses.LVL_CAGES_DICT[lvl]
+        totals = [sum(record[4][i] for record in level_records) for i in range(MAX_CAGE_SIZE)]
+        lines.append(f"{lvl:5} target " + " ".join(f"{weight * 100 / sum(weights):3.0f}" for weight in weights))
+        lines.append(f"{lvl:5} actual " + " ".join(f"{total * 100 / sum(totals):3.0f}" for total in totals))
+
+    # the backtracks don't depend on the level
+    seed_backtracks = {record[0]: record[3] for record in records}
+    lines.append(f"# the {slowest} seeds whose solution backtracks the most: seed backtracks")
+    for seed, backtracks in sorted(seed_backtracks.items(), key=lambda item: (-item[1], item[0]))[:slowest]:
+        lines.append(f"{seed:6} {backtracks:10}")
+    return "\n".join(lines)
+
+
+def format_timings(records, slowest=10):
+    """
+    returns the generation times of a scan as text: the median and the slowest time of every level, and the slowest
+    boards. the times are different on every run, so they aren't part of the report.
+    :param records: the list scan returned.
+    :param slowest: the number of slowest boards to list.
+    """
+    by_level = {}
+    for record in records:
+        by_level.setdefault(record[1], []).append(record[2])
+    lines = ["# timings, different on every run: lvl gen_ms(median max)"]
+    for lvl, seconds in sorted(by_level.items()):
+        lines.append(f"{lvl:5} {statistics.median(seconds) * 1000:6.2f} {max(seconds) * 1000:6.2f}")
+    lines.append(f"# the {slowest} slowest boards: seed lvl gen_ms backtracks truncated singles")
+    for seed, lvl, seconds, backtracks, sizes, truncated in sorted(records, key=lambda record: -record[2])[:slowest]:
+        lines.append(f"{seed:6} {lvl:3} {seconds * 1000:6.2f} {backtracks:10} {truncated:9} {sizes[0]:7}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    seed_range = range(int(sys.argv[1]), int(sys.argv[2]) + 1) if len(sys.argv) > 2 else SEEDS
+    process_count = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    start_time = time.perf_counter()
+    scan_records = scan(seed_range, processes=process_count)
+    print(format_report(scan_records))
+    print(format_timings(scan_records), file=sys.stderr)
+    print(f"scanned in {time.perf_counter() - start_time:.1f}s", file=sys.stderr)
@@ -0,0 +1,114 @@
+"""
+the golden corpus of the puzzles the menu hands out.
+
+players compare their scores per game number, so every (seed, level) must keep the exact same solution, cages,
+colors and killers whenever the generator changes. the corpus stores one line per (seed, level): the seed, the level
+and a digest of the layout's bytes (PuzzleLayout.to_bytes), and it was created from the original Board and
+Houses.set_cages. any generation path must reproduce every digest before it is used.
+
+usage:
+    python golden_corpus.py verify [first_seed last_seed]  - checks the fast generation path against the corpus.
+    python golden_corpus.py build                          - rewrites the corpus from Board (only if the
+                                                             original layouts are meant to change).
+
+Functions:
+    layout_digest - returns the digest of a layout.
+    board_layout - generates a layout through a full Board.
+    fast_layout - generates a layout without creating a board.
+    build_corpus - generates the corpus file.
+    load_corpus - reads the corpus file.
+    verify_corpus - checks a generation function against the corpus.
+"""
+import hashlib
+import os
+import sys
+import time
+import Board
+import PuzzleLayout
+from resource_path import resource_path
+
+CORPUS_PATH = resource_path(os.path.join("corpus", "golden_layouts.txt"))
+SEEDS = range(1, 1001)  # the game numbers the menu picks from
+LEVELS = range(1, 11)
+
+
+def layout_digest(layout):
+    """
+    returns the digest of a layout, 16 hex characters of the sha256 of its bytes.
+    """
+    return hashlib.sha256(layout.to_bytes()).hexdigest()[:16]
+
+
+def board_layout(seed, lvl):
+    """
+    generates a layout through a full Board, the way the game does.
+    """
+    board = Board.Board(seed, lvl)
+    return PuzzleLayout.PuzzleLayout.from_houses(seed, lvl, board.get_solution(), board.all_houses)
+
+
+def fast_layout(seed, lvl):
+    """
+    generates a layout without creating a board.
+    """
+    return PuzzleLayout.PuzzleLayout.generate(seed, lvl)
+
+
+def build_corpus(path=CORPUS_PATH, seeds=SEEDS, levels=LEVELS, generate=board_layout):
+    """
+    generates the corpus file.
+    :param generate: function that gets (seed, lvl) and returns a PuzzleLayout.
+    """
+    lines = ["# seed level layout-digest (sha256 of PuzzleLayout.to_bytes, first 16 hex characters)\n"]
+    for seed in seeds:
+        for lvl in levels:
+            lines.append(f"{seed} {lvl} {layout_digest(generate(seed, lvl))}\n")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.writelines(lines)
+
+
+def load_corpus(path=CORPUS_PATH):
+    """
+    reads the corpus file.
+    :return: a dictionary from (seed, lvl) to the layout's digest.
+    """
+    corpus = {}
+    with open(path) as file:
+        for line in file:
+            if line.startswith("#") or not line.strip():
+                continue
+            seed, lvl, digest = line.split()
+            corpus[(int(seed), int(lvl))] = digest
+    return corpus
+
+
+def verify_corpus(generate=fast_layout, path=CORPUS_PATH, seeds=None):
+    """
+    checks a generation function against the corpus.
+    :param generate: function that gets (seed, lvl) and returns a PuzzleLayout.
+    :param seeds: a range of seeds to check, or None to check the whole corpus.
+    :return: a list of the (seed, lvl) pairs whose layout is different.
+    """
+    corpus = load_corpus(path)
+    mismatches = []
+    start = time.perf_counter()
+    checked = 0
+    for (seed, lvl), digest in corpus.items():
+        if seeds is not None and seed not in seeds:
+            continue
+        checked += 1
+        if layout_digest(generate(seed, lvl)) != digest:
+            mismatches.append((seed, lvl))
+    elapsed = time.perf_counter() - start
+    print(f"checked {checked} layouts in {elapsed:.1f}s ({elapsed / max(checked, 1) * 1000:.2f}ms each), "
+          f"{len(mismatches)} different")
+    return mismatches
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "build":
+        build_corpus()
+    else:
+        seed_range = range(int(sys.argv[2]), int(sys.argv[3]) + 1) if len(sys.argv) > 3 else None
+        sys.exit(1 if verify_corpus(seeds=seed_range) else 0)
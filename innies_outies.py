@@ -0,0 +1,134 @@
+"""
+the 45 rule: sum constraints derived from the cage layout.
+
+every row, column and nonet holds the digits 1 to 9 once, so it sums to 45, and a region made of k houses that don't
+overlap sums to 45 * k. for such a region:
+    innies - the cells of the region that are not in a cage entirely inside it. they sum to 45 * k minus the killers
+             of the cages entirely inside it.
+    outies - the cells outside the region of the cages that cross into it. they sum to the killers of all the cages
+             that have a cell in the region, minus 45 * k.
+the regions are the rows, the columns and every band of adjacent rows or columns, the nonets, the pairs of adjacent
+nonets and the squares of 2x2 nonets. a derived group is kept as a virtual cage if its cells can't repeat a digit
+(every two of them share a row, a column, a nonet or a cage), so it works like a cage with the combinations of
+cage_combinations.
+
+Functions:
+    derive - returns the virtual cages of a cage layout.
+    benchmark - measures how much the virtual cages shrink the solver's search tree per level.
+"""
+import statistics
+import cage_combinations
+import topology
+
+
+def _build_regions():
+    """
+    returns the regions as a tuple of (number of houses, frozenset of the cells' indexes), without repeats.
+    """
+    regions = {}
+    for lines in (topology.ROW_INDEXES, topology.COL_INDEXES):
+        for first in range(9):
+            for last in range(first, 9):
+                cells = frozenset(i for line in lines[first:last + 1] for i in line)
+                regions.setdefault(cells, last - first + 1)
+    nonet_groups = [(n,) for n in range(9)]
+    nonet_groups += [(n, n + 1) for n in range(9) if n % 3 != 2]  # side by side
+    nonet_groups += [(n, n + 3) for n in range(6)]  # one above the other
+    nonet_groups += [(n, n + 1, n + 3, n + 4) for n in (0, 1, 3, 4)]
+    for group in nonet_groups:
+        cells = frozenset(i for n in group for i in topology.NONET_INDEXES[n])
+        regions.setdefault(cells, len(group))
+    return tuple((houses, cells) for cells, houses in regions.items())
+
+
+REGIONS = _build_regions()
+PEER_SETS = tuple(frozenset(peers) for peers in topology.PEERS)
+
+
+def _all_distinct(cells, cage_of):
+    """
+    returns True if every two of the given cells share a row, a column, a nonet or a cage.
+    """
+    cells = list(cells)
+    for a, first in enumerate(cells):
+        for second in cells[a + 1:]:
+            if second not in PEER_SETS[first] and cage_of[first] != cage_of[second]:
+                return False
+    return True
+
+
+def derive(cages):
+    """
+    returns the virtual cages of a cage layout.
+    :param cages: an iterable of (iterable of the cage's cell indexes, killer).
+    :return: a list of (tuple of the cells' indexes, sorted, total), without the groups that are real cages
+             and without repeats.
+    """
+    cages = [(tuple(indexes), killer) for indexes, killer in cages]
+    cage_of = [None] * 81
+    for number, (indexes, _) in enumerate(cages):
+        for index in indexes:
+            cage_of[index] = number
+    seen = {frozenset(indexes) for indexes, _ in cages}
+    virtual = []
+    for houses, region in REGIONS:
+        innies = set(region)
+        innies_total = 45 * houses
+        outies = set()
+        outies_total = -45 * houses
+        for number in {cage_of[i] for i in region}:
+            indexes, killer = cages[number]
+            outies_total += killer
+            outside = [i for i in indexes if i not in region]
+            if outside:
+                outies.update(outside)
+            else:
+                innies.difference_update(indexes)
+                innies_total -= killer
+        for cells, total in ((innies, innies_total), (outies, outies_total)):
+            if not cells or len(cells) > 9 or frozenset(cells) in seen:
+                continue
+            if not _all_distinct(cells, cage_of) or not cage_combinations.get_combinations(total, len(cells)):
+                continue
+            seen.add(frozenset(cells))
+            virtual.append((tuple(sorted(cells)), total))
+    return virtual
+
+
+def benchmark(seeds=range(1, 21), levels=range(1, 11), timeout=5):
+    """
+    counts the solutions (up to two) of the legacy layouts of the given seeds with and without the virtual cages,
+    checks both counts are the same, and prints the number of virtual cages and the median search nodes and times
+    of each level.
+    """
+    import KillerSolver
+    import PuzzleLayout
+    results = {}
+    for lvl in levels:
+        plain_nodes, rule_nodes, plain_times, rule_times, virtual_counts = [], [], [], [], []
+        timeouts = [0, 0]
+        for seed in seeds:
+            layout = PuzzleLayout.PuzzleLayout.generate(seed, lvl)
+            plain = KillerSolver.KillerSolver.from_layout(layout, timeout=timeout)
+            rule = KillerSolver.KillerSolver.from_layout(layout, timeout=timeout, sum_rules=True)
+            plain_result = plain.count_solutions(2)
+            rule_result = rule.count_solutions(2)
+            if 'timeout' not in (plain_result.status, rule_result.status):
+                assert plain_result.count == rule_result.count, (seed, lvl)
+            timeouts[0] += plain_result.status == 'timeout'
+            timeouts[1] += rule_result.status == 'timeout'
+            plain_nodes.append(plain_result.nodes)
+            rule_nodes.append(rule_result.nodes)
+            plain_times.append(plain_result.elapsed)
+            rule_times.append(rule_result.elapsed)
+            virtual_counts.append(len(rule.cages) - len(layout.cages))
+        results[lvl] = (statistics.median(plain_nodes), statistics.median(rule_nodes))
+        print(f"level {lvl}: {statistics.mean(virtual_counts):.0f} virtual cages, median nodes "
+              f"{statistics.median(plain_nodes):.0f} -> {statistics.median(rule_nodes):.0f}, median time "
+              f"{statistics.median(plain_times) * 1000:.1f}ms -> {statistics.median(rule_times) * 1000:.1f}ms, "
+              f"timeouts {timeouts[0]} -> {timeouts[1]}")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark()
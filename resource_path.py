@@ -7,4 +7,18 @@ def resource_path(relative_path):
     except Exception:
         base_path = os.path.abspath(".")
 
-    return os.path.join(base_path, relative_path)
\ No newline at end of file
+    return os.path.join(base_path, relative_path)
+
+
+def user_data_path(relative_path):
+    """
+    returns the path of a file the game writes, like the saves. resource_path points into the bundle of the frozen
+    build, that is replaced on every update and may be read-only, so these files are kept in a directory of the user:
+    %APPDATA%\\KillerSudoku on windows, and $XDG_DATA_HOME/KillerSudoku (~/.local/share/KillerSudoku) elsewhere.
+    """
+    if sys.platform == "win32":
+        base_path = os.environ.get("APPDATA") or os.path.expanduser("~")
+    else:
+        base_path = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+
+    return os.path.join(base_path, "KillerSudoku", relative_path)
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""
+saving an unfinished game to a small binary file and resuming it.
+
+a save is a header packed with struct, the player's values (two to a byte), the guesses (9 bits each), the layout
+(see PuzzleLayout.to_bytes) and a crc32 of all of it:
+    header - the format's magic and version, the seed, the requested seed, the level, the seconds played, the moves,
+             hints, board checks and mistakes of Game.log, and the length of the layout.
+the requested seed is the game number the player asked for. it is the seed, unless the game is a substitute that was
+served because the requested game took too long to generate (see DeadlineGenerator), so the save is found by either.
+the layout is kept so the puzzle isn't generated again when the game is resumed, and the values are loaded into the
+board in one batch instead of replaying the moves.
+
+Functions:
+    encode - returns the save of a board and its game's counters as bytes.
+    decode - returns the contents of a save.
+    save_path - returns the path of a user's save file.
+    write - writes a save to a file, replacing the old one at once.
+    read - returns the contents of a save file, or None.
+    delete - deletes a save file.
+    restore - creates a board in the state of a save.
+    benchmark - measures how long saving and resuming take.
+"""
+import os
+import re
+import struct
+import time
+import zlib
+import Board
+import CompactBoard
+import PuzzleLayout
+import cage_combinations
+import topology
+from resource_path import user_data_path
+
+MAGIC = b"KSAV"
+VERSION = 2
+HEADER = struct.Struct("<4sBQQBd4HH")  # magic, version, seed, requested seed, lvl, seconds, 4 counters, layout length
+CRC = struct.Struct("<I")
+VALUES_BYTES = 41  # 81 values, 4 bits each
+GUESSES_BYTES = 92  # 81 guess masks, 9 bits each
+COUNTERS = ('Moves', 'Hints', 'Check Board', 'Mistakes')  # the counters of Game.log that are saved
+SAVES_DIR = user_data_path("saves")  # a directory of the user, the frozen build's own directory may be read-only
+
+
+def encode(board, log, elapsed, requested=None):
+    """
+    returns the save of a board and its game's counters as bytes.
+    :param board: Board or CompactBoard.
+    :param log: the game's log dictionary, the counters in COUNTERS are saved.
+    :param elapsed: the seconds the game was played, not counting pauses.
+    :param requested: the game number the player asked for, if the board is a substitute. None for the board's seed.
+    """
+    snapshot = board.snapshot()
+    values = snapshot.get_values()
+    packed_values = bytes(values[i] | values[i + 1] << 4 if i + 1 < 81 else values[i] for i in range(0, 81, 2))
+    guesses = 0
+    for index, place in enumerate(topology.PLACES):
+        guesses |= snapshot.get_guesses_mask(place) << (9 * index)
+    layout = board.get_layout().to_bytes()
+    requested = board.seed if requested is None else requested
+    header = HEADER.pack(MAGIC, VERSION, int(board.seed), int(requested), int(board.lvl), elapsed,
+                         *(min(int(log[name]), 0xFFFF) for name in COUNTERS), len(layout))
+    data = header + packed_values + guesses.to_bytes(GUESSES_BYTES, "little") + layout
+    return data + CRC.pack(zlib.crc32(data))
+
+
+def decode(data):
+    """
+    returns the contents of a save.
+    :return: a dictionary of the seed, the requested seed, the level, the layout (PuzzleLayout), the values
+             (81 values, row by row), the guesses (81 masks), the log (the counters in COUNTERS) and the elapsed
+             seconds.
+    :raise ValueError: if the data isn't a save of this version, or it was damaged.
+    """
+    if len(data) < HEADER.size + CRC.size or data[:4] != MAGIC:
+        raise ValueError("not a saved game")
+    if CRC.unpack_from(data, len(data) - CRC.size)[0] != zlib.crc32(data[:-CRC.size]):
+        raise ValueError("the saved game is damaged")
+    magic, version, seed, requested, lvl, elapsed, *counters, layout_length = HEADER.unpack_from(data)
+    if version != VERSION:
+        raise ValueError(f"saved game version {version} isn't supported")
+    pos = HEADER.size
+    packed_values = data[pos:pos + VALUES_BYTES]
+    values = tuple(packed_values[i // 2] >> (4 * (i % 2)) & 0xF for i in range(81))
+    pos += VALUES_BYTES
+    guesses = int.from_bytes(data[pos:pos + GUESSES_BYTES], "little")
+    pos += GUESSES_BYTES
+    layout = PuzzleLayout.PuzzleLayout.from_bytes(data[pos:pos + layout_length])
+    return {'seed': seed, 'requested': requested, 'lvl': lvl, 'layout': layout, 'values': values,
+            'guesses': tuple(guesses >> (9 * i) & 0x1FF for i in range(81)),
+            'log': dict(zip(COUNTERS, counters)), 'elapsed': elapsed}
+
+
+def save_path(user):
+    """
+    returns the path of a user's save file, every user has one.
+    """
+    name = re.sub(r"[^A-Za-z0-9_-]", "_", str(user or "player"))
+    return os.path.join(SAVES_DIR, f"{name}.sav")
+
+
+def write(path, data):
+    """
+    writes a save to a file. it's written to a temporary file first and then replaces the old save at once,
+    so a crash in the middle leaves the old save.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(data)
+    os.replace(temp_path, path)
+
+
+def read(path):
+    """
+    returns the contents of a save file (see decode), or None if there is no save or it can't be read.
+    """
+    try:
+        with open(path, "rb") as file:
+            return decode(file.read())
+    except (OSError, ValueError):
+        return None
+
+
+def delete(path):
+    """
+    deletes a save file, if there is one.
+    """
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def restore(saved, compact=False):
+    """
+    creates a board in the state of a save: the board is created from the saved layout, and the values are loaded
+    in one batch.
+    :param saved: the dictionary decode returned.
+    :param compact: boolean, if True a CompactBoard is created.
+    """
+    if compact:
+        board = CompactBoard.CompactBoard(saved['seed'], saved['lvl'], layout=saved['layout'])
+    else:
+        board = Board.Board(saved['seed'], saved['lvl'], layout=saved['layout'])
+    values = saved['values']
+    board.load_values([values[row * 9:row * 9 + 9] for row in range(9)])
+    for place, mask in zip(topology.PLACES, saved['guesses']):
+        for digit in cage_combinations.mask_to_digits(mask):
+            board.set_cells_guess(place, digit)
+    return board
+
+
+def benchmark(seeds=range(1, 21), lvl=6, repeats=20):
+    """
+    plays half of each board with some guesses, and measures how long saving (encoding and writing) takes against
+    generating the board, and how long resuming takes, and checks the resumed board is the same.
+    """
+    import random
+    import tempfile
+    path = os.path.join(tempfile.mkdtemp(), "benchmark.sav")
+    save_times, resume_times, generate_times, sizes = [], [], [], []
+    log = {name: 0 for name in COUNTERS}
+    for seed in seeds:
+        start = time.perf_counter()
+        board = Board.Board(seed, lvl)
+        generate_times.append(time.perf_counter() - start)
+        rng = random.Random(seed)
+        for place in rng.sample(topology.PLACES, 40):
+            if place not in board.known_cells:
+                board.set_cells_value(place, rng.choice((-1, -1, rng.randint(1, 9))))
+                board.set_cells_guess(place, rng.randint(1, 9))
+        for _ in range(repeats):
+            start = time.perf_counter()
+            write(path, encode(board, log, 123.5))
+            save_times.append(time.perf_counter() - start)
+        sizes.append(os.path.getsize(path))
+        start = time.perf_counter()
+        resumed = restore(read(path))
+        resume_times.append(time.perf_counter() - start)
+        assert resumed.snapshot().rows == board.snapshot().rows, seed
+        assert resumed.snapshot().guess_rows == board.snapshot().guess_rows, seed
+        assert all(resumed.get_cell(place).get_options() == board.get_cell(place).get_options()
+                   for place in topology.PLACES), seed
+    delete(path)
+    print(f"save: {max(sizes)} bytes at most, encoded and written in {sum(save_times) / len(save_times) * 1e6:.0f}us "
+          f"on average, {max(save_times) * 1e6:.0f}us at most")
+    print(f"resume: {sum(resume_times) / len(resume_times) * 1000:.2f}ms on average, generating the board "
+          f"takes {sum(generate_times) / len(generate_times) * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    benchmark()
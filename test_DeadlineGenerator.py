@@ -0,0 +1,117 @@
+"""
+the fallbacks of DeadlineGenerator, with slow seeds simulated by slow_generate and a cache in a temporary directory.
+the slow seeds take much longer than the deadline, so no test depends on how fast the machine is.
+"""
+import time
+import pytest
+import DeadlineGenerator
+import PuzzleLayout
+
+LVL = 6
+DEADLINE = 0.05
+DELAY = 1.0  # the seconds a slow seed takes more than a fast one
+SLOW_SEEDS = {2, 3, 4}
+
+
+def make_generator(cache_dir, deadline=DEADLINE, fallbacks=DeadlineGenerator.FALLBACKS):
+    """
+    returns a generator whose seeds 2, 3 and 4 are slow.
+    """
+    generate = DeadlineGenerator.slow_generate(SLOW_SEEDS, DELAY)
+    return DeadlineGenerator.DeadlineGenerator(deadline, fallbacks=fallbacks, cache_dir=str(cache_dir),
+                                               generate=generate)
+
+
+def wait_cached(generator, seed, lvl=LVL, timeout=DELAY * 10):
+    """
+    waits for the background generation of a slow seed to write it to the cache, and returns the cached layout.
+    """
+    end = time.perf_counter() + timeout
+    while time.perf_counter() < end:
+        layout = generator.read_cached(seed, lvl)
+        if layout is not None:
+            return layout
+        time.sleep(0.02)
+    raise AssertionError(f"game {seed}-{lvl} wasn't cached")
+
+
+def test_fresh(tmp_path):
+    generator = make_generator(tmp_path, deadline=DELAY * 5)  # a fast seed is served fresh even on a slow machine
+    puzzle = generator.get(1, LVL)
+    assert puzzle.source == 'fresh' and not puzzle.is_substitute()
+    assert puzzle.layout == PuzzleLayout.PuzzleLayout.generate(1, LVL)
+    assert generator.read_cached(1, LVL) == puzzle.layout
+    assert generator.misses == []
+
+
+def test_cache(tmp_path):
+    make_generator(tmp_path).write_cached(PuzzleLayout.PuzzleLayout.generate(2, LVL))
+    generator = make_generator(tmp_path)
+    puzzle = generator.get(2, LVL)
+    assert puzzle.source == 'cache' and not puzzle.is_substitute()
+    assert puzzle.layout == PuzzleLayout.PuzzleLayout.generate(2, LVL)
+
+
+def test_substitute_is_flagged(tmp_path):
+    generator = make_generator(tmp_path)
+    generator.write_cached(PuzzleLayout.PuzzleLayout.generate(1, LVL))
+    puzzle = generator.get(3, LVL)
+    assert puzzle.source == 'substitute' and puzzle.is_substitute()
+    assert puzzle.seed == 3 and puzzle.layout.seed == 1
+    # the slow seed is still generated, and cached for the next time
+    assert wait_cached(generator, 3) == PuzzleLayout.PuzzleLayout.generate(3, LVL)
+    assert generator.get(3, LVL).source == 'cache'
+
+
+def test_substitute_of_another_level_isnt_served(tmp_path):
+    generator = make_generator(tmp_path, fallbacks=('substitute',))
+    generator.write_cached(PuzzleLayout.PuzzleLayout.generate(1, LVL + 1))
+    with pytest.raises(TimeoutError):
+        generator.get(3, LVL)
+
+
+def test_timeout(tmp_path):
+    generator = make_generator(tmp_path, fallbacks=('cache',))
+    with pytest.raises(TimeoutError):
+        generator.get(4, LVL)
+
+
+def test_late(tmp_path):
+    generator = make_generator(tmp_path, fallbacks=('cache', 'wait'))
+    puzzle = generator.get(4, LVL)
+    assert puzzle.source == 'late' and not puzzle.is_substitute()
+    assert puzzle.layout == PuzzleLayout.PuzzleLayout.generate(4, LVL)
+    assert puzzle.seconds >= DELAY
+
+
+def test_misses_are_recorded(tmp_path):
+    generator = make_generator(tmp_path)
+    generator.write_cached(PuzzleLayout.PuzzleLayout.generate(1, LVL))
+    generator.get(2, LVL)
+    wait_cached(generator, 2)
+    generator.get(2, LVL)
+    strict = make_generator(tmp_path, fallbacks=('cache',))
+    with pytest.raises(TimeoutError):
+        strict.get(3, LVL)
+    assert generator.misses == [(2, LVL, 'substitute'), (2, LVL, 'cache')]
+    assert strict.misses == [(3, LVL, 'timeout')]
+    lines = (tmp_path / "misses.txt").read_text().splitlines()
+    assert [line.split()[:3] for line in lines] == [['2', str(LVL), 'substitute'], ['2', str(LVL), 'cache'],
+                                                    ['3', str(LVL), 'timeout']]
+
+
+def test_unknown_fallback():
+    with pytest.raises(ValueError):
+        DeadlineGenerator.DeadlineGenerator(fallbacks=('retry',))
+
+
+def test_damaged_cache_is_ignored(tmp_path):
+    generator = make_generator(tmp_path, fallbacks=('cache',))
+    generator.write_cached(PuzzleLayout.PuzzleLayout.generate(4, LVL))
+    path = tmp_path / f"4_{LVL}.layout"
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+    assert generator.read_cached(4, LVL) is None
+    with pytest.raises(TimeoutError):
+        generator.get(4, LVL)
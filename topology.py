@@ -0,0 +1,150 @@
+"""
+the immutable topology of the grid, computed once at import and shared by every board.
+
+cells are numbered row by row, the index of the place (row, col) is row * size + col. the module tables are the ones
+of the 9x9 grid, GridShape holds the same tables (in lowercase) for any box shape: 2x2 boxes make a 4x4 grid,
+2x3 a 6x6, 3x3 a 9x9, 3x4 a 12x12 and 4x4 a 16x16. the boxes of the 9x9 grid are called nonets.
+
+Tables:
+    PLACES - the places of the cells by index.
+    INDEX_OF - a dictionary from a place to its index.
+    ROW_OF, COL_OF, NONET_OF - the row, column and nonet numbers of each cell by index.
+    ROW_INDEXES, COL_INDEXES, NONET_INDEXES - the indexes of the cells in each row, column and nonet.
+    ROW_PLACES, COL_PLACES, NONET_PLACES - the places of the cells in each row, column and nonet.
+    HOUSE_INDEXES - the indexes of the cells in all 27 houses, rows first, then columns, then nonets.
+    HOUSES_OF - the numbers of the houses (in HOUSE_INDEXES) each cell belongs to, by index.
+    PEERS - the indexes of the 20 cells that share a row, a column or a nonet with each cell.
+    PEER_PLACES - the same peers as places.
+    ORTHOGONAL_NEIGHBORS - the indexes of the cells above, below, to the right and to the left of each cell,
+                           in that order, the cells outside the grid are left out.
+    BOX_SHAPES - the box shapes (rows, columns) of the grid sizes the game supports, by size.
+
+Functions:
+    index_of - returns the index of a place.
+    nonet_of - returns the nonet number of a place.
+    get_shape - returns the GridShape of a box shape, built once.
+"""
+
+
+class GridShape:
+    """
+        the topology tables of a grid with boxes of box_rows x box_cols cells, the grid is
+        (box_rows * box_cols) x (box_rows * box_cols) and holds the digits 1 to box_rows * box_cols.
+        the tables have the same meaning as the module tables, the boxes take the place of the nonets.
+
+        Methods:
+            __init__ - builds the tables.
+            index_of - returns the index of a place.
+            box_of - returns the box number of a place.
+    """
+
+    def __init__(self, box_rows, box_cols):
+        """
+        builds the tables.
+        :param box_rows: the number of rows of a box.
+        :param box_cols: the number of columns of a box.
+        """
+        size = box_rows * box_cols
+        num_cells = size * size
+        self.box_rows = box_rows
+        self.box_cols = box_cols
+        self.size = size
+        self.num_cells = num_cells
+        self.places = tuple((i // size, i % size) for i in range(num_cells))
+        self.index = {place: i for i, place in enumerate(self.places)}
+        self.row_of = tuple(i // size for i in range(num_cells))
+        self.col_of = tuple(i % size for i in range(num_cells))
+        # the boxes are numbered row by row, there are box_cols boxes in each band of box_rows rows
+        self.box_of_index = tuple((self.row_of[i] // box_rows) * box_rows + self.col_of[i] // box_cols
+                                  for i in range(num_cells))
+        self.row_indexes = tuple(tuple(range(row * size, row * size + size)) for row in range(size))
+        self.col_indexes = tuple(tuple(range(col, num_cells, size)) for col in range(size))
+        boxes = [[] for _ in range(size)]
+        for i in range(num_cells):
+            boxes[self.box_of_index[i]].append(i)
+        self.box_indexes = tuple(tuple(box) for box in boxes)
+        self.row_places = tuple(tuple(self.places[i] for i in indexes) for indexes in self.row_indexes)
+        self.col_places = tuple(tuple(self.places[i] for i in indexes) for indexes in self.col_indexes)
+        self.box_places = tuple(tuple(self.places[i] for i in indexes) for indexes in self.box_indexes)
+        self.house_indexes = self.row_indexes + self.col_indexes + self.box_indexes
+        self.houses_of = tuple((self.row_of[i], size + self.col_of[i], 2 * size + self.box_of_index[i])
+                               for i in range(num_cells))
+        self.peers = tuple(tuple(sorted(set(self.row_indexes[self.row_of[i]] + self.col_indexes[self.col_of[i]] +
+                                            self.box_indexes[self.box_of_index[i]]) - {i}))
+                           for i in range(num_cells))
+        self.peer_places = tuple(tuple(self.places[j] for j in peers) for peers in self.peers)
+        self.orthogonal_neighbors = tuple(tuple((row + i) * size + col + j
+                                                for i, j in ((-1, 0), (1, 0), (0, 1), (0, -1))
+                                                if 0 <= row + i < size and 0 <= col + j < size)
+                                          for row, col in self.places)
+
+    def index_of(self, place):
+        """
+        returns the index of a place.
+        """
+        return place[0] * self.size + place[1]
+
+    def box_of(self, place):
+        """
+        returns the box number of a place, the boxes are numbered row by row.
+        """
+        return (place[0] // self.box_rows) * self.box_rows + place[1] // self.box_cols
+
+
+BOX_SHAPES = {4: (2, 2), 6: (2, 3), 9: (3, 3), 12: (3, 4), 16: (4, 4)}
+_shapes = {}
+
+
+def get_shape(box_rows=3, box_cols=3):
+    """
+    returns the GridShape of a box shape, the tables of each shape are built once and shared.
+    """
+    shape = _shapes.get((box_rows, box_cols))
+    if shape is None:
+        shape = _shapes[(box_rows, box_cols)] = GridShape(box_rows, box_cols)
+    return shape
+
+
+NINE = get_shape(3, 3)  # the 9x9 grid, the module tables are its tables
+
+SIZE = NINE.size
+BOX_SIZE = NINE.box_rows
+NUM_CELLS = NINE.num_cells
+
+PLACES = NINE.places
+INDEX_OF = NINE.index
+
+ROW_OF = NINE.row_of
+COL_OF = NINE.col_of
+NONET_OF = NINE.box_of_index
+
+ROW_INDEXES = NINE.row_indexes
+COL_INDEXES = NINE.col_indexes
+NONET_INDEXES = NINE.box_indexes
+
+ROW_PLACES = NINE.row_places
+COL_PLACES = NINE.col_places
+NONET_PLACES = NINE.box_places
+
+HOUSE_INDEXES = NINE.house_indexes
+HOUSES_OF = NINE.houses_of
+
+PEERS = NINE.peers
+PEER_PLACES = NINE.peer_places
+
+ORTHOGONAL_NEIGHBORS = NINE.orthogonal_neighbors
+
+
+def index_of(place):
+    """
+    returns the index of a place.
+    :param place: tuple of two integers between 0 and 8, the first one is the row and the second one is the column.
+    """
+    return place[0] * SIZE + place[1]
+
+
+def nonet_of(place):
+    """
+    returns the nonet number of a place, the nonets are numbered row by row.
+    """
+    return (place[0] // BOX_SIZE) * BOX_SIZE + place[1] // BOX_SIZE